@@ -1,11 +1,11 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime as dt
-from urllib3.exceptions import HTTPError
+from urllib3.exceptions import HTTPError, MaxRetryError
 from dateutil import parser
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
-from datetime import timedelta
 
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
@@ -14,6 +14,49 @@ from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.exceptions import InvalidSignature
 import time 
 import base64
+import contextvars
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from fast_json import dumps_bytes, loads
+from rate_limiter import default_limiter, retry_after_seconds
+from request_timing import DeadlineExceeded, LatencyTracker, call_timeout, endpoint_key, remaining
+from response_cache import ResponseCache, cache_key
+
+
+_private_keys = {}
+_private_keys_lock = threading.Lock()
+
+def load_private_key(file_path: str) -> rsa.RSAPrivateKey:
+    """Loads a PEM private key, cached until the file changes on disk."""
+    key = (os.path.abspath(file_path), os.stat(file_path).st_mtime_ns)
+    with _private_keys_lock:
+        private_key = _private_keys.get(key)
+        if private_key is None:
+            with open(file_path, "rb") as key_file:
+                private_key = serialization.load_pem_private_key(
+                    key_file.read(),
+                    password=None,
+                    backend=default_backend()
+                )
+            _private_keys[key] = private_key
+        return private_key
+
+
+class DeadlineRetry(Retry):
+    """Retry policy that gives up once the current request_deadline has passed,
+    and never backs off past it."""
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        left = remaining()
+        if left is not None and left <= 0:
+            raise MaxRetryError(_pool, url, error) from error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        left = remaining()
+        return backoff if left is None else max(min(backoff, left), 0)
 
 
 class KalshiClient:
@@ -24,9 +67,36 @@ class KalshiClient:
         key_id: str,
         private_key: rsa.RSAPrivateKey,
         user_id: Optional[str] = None,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.2,
+        timeout: Optional[float] = 10,
+        rate_limiter=None,
+        cache_responses: bool = True,
+        hedge_reads: bool = False,
     ):
         """Initializes the client and logs in the specified user.
         Raises an HttpError if the user could not be authenticated.
+
+        Requests share one keep-alive connection pool of up to pool_size connections.
+        Idempotent requests (GET, DELETE) are retried up to max_retries times on
+        connection errors only, as in AsyncKalshiClient; POSTs are never retried, so
+        an order is not placed twice. Error responses, 429 included, are raised
+        rather than resent by urllib3, which would bypass rate_limiter.
+
+        Requests wait for a token from rate_limiter, by default the limiter shared
+        by every client in the process.
+
+        With cache_responses, event, market, series and orderbook reads go through
+        a short-lived ResponseCache (see response_cache), and every write clears the
+        cached reads it may have changed. Cached responses are shared between
+        callers and must not be modified.
+
+        Every request attempt times out after timeout seconds, or sooner inside a
+        request_deadline block (see request_timing), which also bounds the wait for
+        a rate-limit token. With hedge_reads, a GET still unanswered at its
+        endpoint's p95 latency is sent a second time if the rate limiter has a
+        token to spare; the first response wins.
         """
 
         self.host = host
@@ -34,54 +104,139 @@ class KalshiClient:
         self.private_key: private_key
         self.user_id = user_id
         self.last_api_call = datetime.now()
+        self.timeout = timeout
+        self.rate_limiter = default_limiter if rate_limiter is None else rate_limiter
+        self.session = requests.Session()
+        retry = DeadlineRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            allowed_methods=frozenset({"GET", "DELETE"}),
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.adapter = adapter
+        self.request_count = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.response_cache = ResponseCache() if cache_responses else None
+        self.hedge_reads = hedge_reads
+        self.latency = LatencyTracker()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+        self.deadlines_exceeded = 0
+        self._hedge_executor = None
 
     """Built in rate-limiter. We STRONGLY encourage you to keep 
     some sort of rate limiting, just in case there is a bug in your 
-    code. Feel free to adjust the threshold"""
-    def rate_limit(self) -> None:
-        # Adjust time between each api call
-        THRESHOLD_IN_MILLISECONDS = 100
-
-        now = datetime.now()
-        threshold_in_microseconds = 1000 * THRESHOLD_IN_MILLISECONDS
-        threshold_in_seconds = THRESHOLD_IN_MILLISECONDS / 1000
-        if now - self.last_api_call < timedelta(microseconds=threshold_in_microseconds): 
-            time.sleep(threshold_in_seconds)
+    code. Limits and priority lanes are configured in rate_limiter"""
+    def rate_limit(self, method: str = "GET") -> None:
+        try:
+            self.rate_limiter.acquire(method, timeout=remaining())
+        except DeadlineExceeded:
+            self.deadlines_exceeded += 1
+            raise
         self.last_api_call = datetime.now()
 
+    def call_timeout(self) -> Optional[float]:
+        """Timeout for the next request: the client timeout, or less under a request_deadline."""
+        try:
+            return call_timeout(self.timeout)
+        except DeadlineExceeded:
+            self.deadlines_exceeded += 1
+            raise
+
+    def _send(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Sends a signed request, timing out at the client timeout or the current deadline."""
+        try:
+            return self.session.request(
+                method, self.host + path, headers=self.request_headers(method, path), timeout=self.call_timeout(),
+                **kwargs
+            )
+        except requests.RequestException as e:
+            left = remaining()
+            if left is not None and left <= 0:
+                self.deadlines_exceeded += 1
+                raise DeadlineExceeded("Request deadline exceeded") from e
+            raise
+
     def post(self, path: str, body: dict) -> Any:
         """POSTs to an authenticated Kalshi HTTP endpoint.
         Returns the response body. Raises an HttpError on non-2XX results.
         """
-        self.rate_limit()
+        self.rate_limit("POST")
 
-        response = requests.post(
-            self.host + path, data=body, headers=self.request_headers("POST", path)
-        )
+        try:
+            response = self._send("POST", path, data=body)
+        finally:
+            self.invalidate_cached(body)
         self.raise_if_bad_response(response)
-        return response.json()
+        return loads(response.content)
 
     def get(self, path: str, params: Dict[str, Any] = {}) -> Any:
         """GETs from an authenticated Kalshi HTTP endpoint.
         Returns the response body. Raises an HttpError on non-2XX results."""
-        self.rate_limit()
-        
-        response = requests.get(
-            self.host + path, headers=self.request_headers("GET", path), params=params
-        )
+        ttl = self.response_cache.ttl_for(path) if self.response_cache is not None else None
+        if ttl is None:
+            return self._get(path, params)
+        return self.response_cache.get_or_fetch(cache_key(path, params), ttl, lambda: self._get(path, params),
+                                                timeout=self.call_timeout())
+
+    def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        self.rate_limit("GET")
+        if self.hedge_reads:
+            return self._hedged_get(path, params)
+        return self._send_get(path, params)
+
+    def _send_get(self, path: str, params: Dict[str, Any]) -> Any:
+        started = time.monotonic()
+        response = self._send("GET", path, params=params)
+        self.latency.record(endpoint_key(path), time.monotonic() - started)
         self.raise_if_bad_response(response)
-        return response.json()
-
-    def delete(self, path: str, params: Dict[str, Any] = {}) -> Any:
-        """Posts from an authenticated Kalshi HTTP endpoint.
+        return loads(response.content)
+
+    def _hedged_get(self, path: str, params: Dict[str, Any]) -> Any:
+        """Sends a GET, and a second copy if the first is slower than the endpoint's p95; first answer wins.
+        A losing request cannot be interrupted and finishes in the background."""
+        delay = self.latency.hedge_delay(endpoint_key(path))
+        if delay is None:
+            return self._send_get(path, params)
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kalshi-hedge")
+        first = self._hedge_executor.submit(contextvars.copy_context().run, self._send_get, path, params)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        if not self.rate_limiter.try_acquire("GET"):
+            self.hedges_skipped += 1
+            return first.result()
+        self.hedges_fired += 1
+        second = self._hedge_executor.submit(contextvars.copy_context().run, self._send_get, path, params)
+        done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = first if first in done else second
+        if winner.exception() is not None and pending:
+            # The other copy may still succeed
+            winner = pending.pop()
+            winner.exception()
+        if winner is second:
+            self.hedges_won += 1
+        return winner.result()
+
+    def delete(self, path: str, params: Dict[str, Any] = {}, body: Optional[str] = None) -> Any:
+        """DELETEs an authenticated Kalshi HTTP endpoint, with an optional JSON body
+        (batch_cancel_orders sends the order ids in it).
         Returns the response body. Raises an HttpError on non-2XX results."""
-        self.rate_limit()
-        
-        response = requests.delete(
-            self.host + path, headers=self.request_headers("DELETE", path), params=params
-        )
+        self.rate_limit("DELETE")
+
+        try:
+            response = self._send("DELETE", path, data=body, params=params)
+        finally:
+            self.invalidate_cached(body)
         self.raise_if_bad_response(response)
-        return response.json()
+        return loads(response.content)
 
     def request_headers(self, method: str, path: str) -> Dict[str, Any]:
         # Get the current time
@@ -127,17 +282,96 @@ class KalshiClient:
             raise ValueError("RSA sign PSS failed") from e
 
     def raise_if_bad_response(self, response: requests.Response) -> None:
+        self.request_count += 1
+        self.last_latency = response.elapsed.total_seconds()
+        self.total_latency += self.last_latency
+        if response.status_code == 429:
+            self.rate_limiter.record_server_throttle(response.request.method,
+                                                     retry_after_seconds(response.headers.get('Retry-After')))
         if response.status_code not in range(200, 299):
             raise HttpError(response.reason, response.status_code)
     
+    def warm_up(self, path: str = "/exchange/status") -> bool:
+        """Opens the pooled connection (TCP + TLS) ahead of the first real request.
+        Returns False if the request failed."""
+        try:
+            self.get(path)
+            return True
+        except (requests.RequestException, HttpError):
+            return False
+
+    def connection_stats(self) -> Dict[str, Any]:
+        """Connections opened versus requests sent through the pool, and mean latency."""
+        pool_manager = self.adapter.poolmanager
+        pools = [pool_manager.pools[key] for key in pool_manager.pools.keys()]
+        connections = sum(pool.num_connections for pool in pools)
+        requests_sent = sum(pool.num_requests for pool in pools)
+        return {
+            "connections_opened": connections,
+            "requests_sent": requests_sent,
+            "connections_reused": max(requests_sent - connections, 0),
+            "responses": self.request_count,
+            "mean_latency_ms": 1000 * self.total_latency / self.request_count if self.request_count else None,
+            "last_latency_ms": 1000 * self.last_latency if self.last_latency is not None else None,
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            **self.hedge_stats(),
+        }
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        """How often hedged reads fired, won, or were skipped for lack of rate budget, and deadlines missed."""
+        return {
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedges_skipped": self.hedges_skipped,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "hedge_after_ms": self.latency.summary(),
+        }
+
+    def invalidate_cached(self, body: Any) -> None:
+        """Drops cached reads a write may have changed: those of the tickers in its body, or all of them."""
+        if self.response_cache is not None:
+            self.response_cache.invalidate_write(body)
+
+    def close(self) -> None:
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
     def query_generation(self, params:dict) -> str:
-        relevant_params = {k:v for k,v in params.items() if v != None}
+        # Callers pass locals(), which also holds self and any *_url built before the call
+        relevant_params = {k:v for k,v in params.items() if v != None and k != 'self' and not k.endswith('_url')}
         if len(relevant_params):
             query = '?'+''.join("&"+str(k)+"="+str(v) for k,v in relevant_params.items())[1:]
         else:
             query = ''
         return query
 
+def page_rows(page: dict, items_key: str, remaining: Optional[int], batches: Optional[str]):
+    """Rows of one page, cut to the remaining item budget and converted to a batch if requested.
+    Returns (rows, number of rows)."""
+    items = page.get(items_key) or []
+    if remaining is not None:
+        items = items[:remaining]
+    if batches is None:
+        return items, len(items)
+    return to_batch(items, batches), len(items)
+
+
+def to_batch(items: List[dict], batches: str):
+    """Converts a list of row dicts to a pandas DataFrame ('pandas') or a dict of NumPy columns ('numpy')."""
+    if batches == 'pandas':
+        import pandas as pd
+        return pd.DataFrame.from_records(items)
+    if batches == 'numpy':
+        import numpy as np
+        columns = {}
+        for item in items:
+            for key in item:
+                columns.setdefault(key, None)
+        return {key: np.asarray([item.get(key) for item in items]) for key in columns}
+    raise ValueError(f"Unknown batch format '{batches}', expected 'pandas' or 'numpy'")
+
+
 class HttpError(Exception):
     """Represents an HTTP error with reason and status code."""
     def __init__(self, reason: str, status: int):
@@ -152,11 +386,13 @@ class ExchangeClient(KalshiClient):
     def __init__(self, 
                     exchange_api_base: str,
                     key_id: str, 
-                    private_key: rsa.RSAPrivateKey):
+                    private_key: rsa.RSAPrivateKey,
+                    **session_options):
         super().__init__(
             exchange_api_base,
             key_id,
             private_key,
+            **session_options,
         )
         self.key_id = key_id
         self.private_key = private_key
@@ -174,6 +410,86 @@ class ExchangeClient(KalshiClient):
         result = self.get(self.exchange_url + "/status")
         return result
 
+    # paginated iterators!
+
+    def paginate(self,
+                    method: str,
+                    items_key: str,
+                    page_size: int = 100,
+                    max_items: Optional[int] = None,
+                    prefetch: bool = True,
+                    batches: Optional[str] = None,
+                    **filters):
+        """Iterates over every item of a cursor-paginated endpoint, fetching pages lazily.
+
+        While the caller works through one page, the next is fetched on a background
+        thread (prefetch). Stops after max_items items, or as soon as the caller stops
+        iterating. With batches='pandas' or 'numpy', yields one DataFrame or dict of
+        column arrays per page instead of single rows.
+        """
+        fetch = getattr(self, method)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kalshi-prefetch') if prefetch else None
+        remaining = max_items
+        pending = None
+
+        def request(cursor):
+            return fetch(limit=page_size, cursor=cursor, **filters)
+
+        try:
+            page = request(None)
+            while True:
+                cursor = page.get('cursor') or None
+                rows, count = page_rows(page, items_key, remaining, batches)
+                if remaining is not None:
+                    remaining -= count
+                more = cursor is not None and remaining != 0
+                if more and executor is not None:
+                    # The request runs with this thread's context, e.g. its request priority
+                    pending = executor.submit(contextvars.copy_context().run, request, cursor)
+                if count:
+                    if batches is None:
+                        yield from rows
+                    else:
+                        yield rows
+                if not more:
+                    break
+                page = pending.result() if pending is not None else request(cursor)
+                pending = None
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_markets(self, page_size: int = 100, max_items: Optional[int] = None, prefetch: bool = True,
+                        batches: Optional[str] = None, **filters):
+        return self.paginate('get_markets', 'markets', page_size, max_items, prefetch, batches, **filters)
+
+    def iter_trades(self, page_size: int = 100, max_items: Optional[int] = None, prefetch: bool = True,
+                        batches: Optional[str] = None, **filters):
+        return self.paginate('get_trades', 'trades', page_size, max_items, prefetch, batches, **filters)
+
+    def iter_market_history(self, ticker: str, page_size: int = 100, max_items: Optional[int] = None,
+                        prefetch: bool = True, batches: Optional[str] = None, **filters):
+        return self.paginate('get_market_history', 'history', page_size, max_items, prefetch, batches,
+                             ticker=ticker, **filters)
+
+    def iter_fills(self, page_size: int = 100, max_items: Optional[int] = None, prefetch: bool = True,
+                        batches: Optional[str] = None, **filters):
+        return self.paginate('get_fills', 'fills', page_size, max_items, prefetch, batches, **filters)
+
+    def iter_orders(self, page_size: int = 100, max_items: Optional[int] = None, prefetch: bool = True,
+                        batches: Optional[str] = None, **filters):
+        return self.paginate('get_orders', 'orders', page_size, max_items, prefetch, batches, **filters)
+
+    def iter_positions(self, page_size: int = 100, max_items: Optional[int] = None, prefetch: bool = True,
+                        batches: Optional[str] = None, **filters):
+        return self.paginate('get_positions', 'market_positions', page_size, max_items, prefetch, batches,
+                             **filters)
+
+    def iter_portfolio_settlements(self, page_size: int = 100, max_items: Optional[int] = None,
+                        prefetch: bool = True, batches: Optional[str] = None, **filters):
+        return self.paginate('get_portfolio_settlements', 'settlements', page_size, max_items, prefetch, batches,
+                             **filters)
+
     # market endpoints!
 
     def get_markets(self,
@@ -275,7 +591,7 @@ class ExchangeClient(KalshiClient):
         relevant_params = {k: v for k,v in locals().items() if k != 'self' and v != None}   
 
         print(relevant_params)                         
-        order_json = json.dumps(relevant_params)
+        order_json = dumps_bytes(relevant_params)
         orders_url = self.portfolio_url + '/orders'
         result = self.post(path = orders_url, body = order_json)
         return result
@@ -283,7 +599,7 @@ class ExchangeClient(KalshiClient):
     def batch_create_orders(self, 
                                 orders:list
         ):
-        orders_json = json.dumps({'orders': orders})
+        orders_json = dumps_bytes({'orders': orders})
         batched_orders_url = self.portfolio_url + '/orders/batched'
         result = self.post(path = batched_orders_url, body = orders_json)
         return result
@@ -293,7 +609,7 @@ class ExchangeClient(KalshiClient):
                         reduce_by:int,
                         ):
         order_url = self.portfolio_url + '/orders/' + order_id
-        decrease_json = json.dumps({'reduce_by': reduce_by})
+        decrease_json = dumps_bytes({'reduce_by': reduce_by})
         result = self.post(path = order_url + '/decrease', body = decrease_json)
         return result
 
@@ -306,7 +622,7 @@ class ExchangeClient(KalshiClient):
     def batch_cancel_orders(self, 
                                 order_ids:list
         ):
-        order_ids_json = json.dumps({"ids":order_ids})
+        order_ids_json = dumps_bytes({"ids":order_ids})
         batched_orders_url = self.portfolio_url + '/orders/batched'
         result = self.delete(path = batched_orders_url, body = order_ids_json)
         return result
@@ -0,0 +1,173 @@
+"""
+Precomputed buy/sell decision surface over every game state.
+
+For a given table and Kelly parameters, the decision in a state depends only on
+the quoted prices. The surface stores, per state, the yes/no price thresholds at
+which we enter or exit, and, per state and price cent (0-100), the fractional
+Kelly contract count per dollar of bankroll at full model confidence. The hot
+path is then one array index and a comparison:
+
+    surface = DecisionSurface(table)
+    actions = surface.decide(surface.index(*state), quote, balance, confidence, yes_contracts, no_contracts)
+
+The two sides mirror each other, with p the model's home win % in cents:
+
+    buy yes   if 2 * yes_ask - yes_bid < p - entry_buffer
+    sell yes  if yes_bid > p                      (only contracts held)
+    buy no    if 2 * no_ask - no_bid < (100 - p) - entry_buffer
+    sell no   if no_bid > 100 - p                 (only contracts held)
+
+The yes rules are the ones main2.x() applied before the surface. Its no-side entry
+test was reversed (it bought no when 1 - winPer was *below* the effective no ask,
+i.e. at negative edge) and it never sold no contracts; both rules here are new
+behaviour, not a port.
+
+States whose win % is only the neutral default (FALLBACK_DEFAULT_WIN: no
+populated state anywhere near them) are never traded: their entry thresholds are
+-inf and their exit thresholds +inf.
+
+Thresholds are built up front. Contract rows are filled the first time a state is
+decided, into zero-initialised arrays whose pages are not touched until then.
+Prices are in cents as Kalshi quotes them. Costs and bankroll are in dollars.
+
+Given an OrderBook, buys are sized against depth rather than the top of book:
+the count is the largest whose marginal fill price still clears the entry
+threshold and whose Kelly size at that price is still at least the count, and
+sells only go as deep into the bids as the exit threshold allows.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from getExpectedStats import FALLBACK_DEFAULT_WIN, TABLE_SHAPE, WinExpectancyTable, dynamic_kelly_fraction
+
+# Dollars added to each contract's price to cover fees and slippage
+SLIPPAGE = 0.02
+# Cents the effective ask (ask plus the spread) must clear our probability by before we enter
+ENTRY_BUFFER = 4
+N_PRICES = 101
+
+# price is the limit in cents; amount is the dollars paid (buy) or received (sell) when filled
+Action = namedtuple('Action', ['action', 'side', 'count', 'price', 'amount'])
+KellyParameters = namedtuple('KellyParameters', ['slippage', 'entry_buffer', 'fraction'])
+
+
+class DecisionSurface:
+    """
+    Parameters:
+    - table (WinExpectancyTable): Table whose filled win % and leverage drive the decisions
+    - slippage (float): Dollars added to each contract's price
+    - entry_buffer (int): Cents of edge required over the effective ask
+    - fraction (callable): Kelly fraction for (win_prob, inning, leverage, model_confidence)
+    """
+
+    def __init__(self, table, slippage=SLIPPAGE, entry_buffer=ENTRY_BUFFER, fraction=dynamic_kelly_fraction):
+        self.table = table
+        self.parameters = KellyParameters(slippage, entry_buffer, fraction)
+        win = table.win_filled.reshape(-1).astype(np.float64)
+        self.win = win
+        self.yes_enter = (win * 100 - entry_buffer).astype(np.float32)
+        self.yes_exit = (win * 100).astype(np.float32)
+        self.no_enter = ((1 - win) * 100 - entry_buffer).astype(np.float32)
+        self.no_exit = ((1 - win) * 100).astype(np.float32)
+        no_data = (table.fallback.reshape(-1) & FALLBACK_DEFAULT_WIN) != 0
+        for enter, exit in ((self.yes_enter, self.yes_exit), (self.no_enter, self.no_exit)):
+            enter[no_data] = -np.inf
+            exit[no_data] = np.inf
+        self._prices = np.arange(N_PRICES) / 100 + slippage
+        self._yes_rows = np.zeros((win.size, N_PRICES), dtype=np.float32)
+        self._no_rows = np.zeros((win.size, N_PRICES), dtype=np.float32)
+        self._ready = np.zeros(win.size, dtype=bool)
+
+    def matches(self, table, slippage=SLIPPAGE, entry_buffer=ENTRY_BUFFER, fraction=dynamic_kelly_fraction):
+        """Whether this surface was built for the given table and parameters."""
+        return table is self.table and self.parameters == (slippage, entry_buffer, fraction)
+
+    index = staticmethod(WinExpectancyTable.state_index)
+
+    def _fill(self, index):
+        inning = np.unravel_index(index, TABLE_SHAPE)[0] + 1
+        leverage = float(self.table._leverage_filled_flat[index])
+        win = self.win[index]
+        for p, rows in ((win, self._yes_rows), (1 - win, self._no_rows)):
+            # Kelly fraction for a contract costing x and paying 1 is (p - x) / (1 - x)
+            fraction = self.parameters.fraction(p, inning, leverage, 1.0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                kelly = np.where(self._prices < 1, (p - self._prices) / (1 - self._prices), 0)
+            rows[index] = np.maximum(kelly, 0) * fraction / self._prices
+        self._ready[index] = True
+
+    def contracts(self, index, side, price, bankroll, confidence):
+        """Contracts to buy on one side at a price in cents, for a bankroll and model confidence (0-1)."""
+        if not self._ready[index]:
+            self._fill(index)
+        rows = self._yes_rows if side == 'yes' else self._no_rows
+        return int(round(rows[index, price] * bankroll * confidence))
+
+    def depth_contracts(self, index, side, book, limit, bankroll, confidence):
+        """
+        Contracts to buy on one side by walking the book's asks up to limit cents.
+
+        The Kelly size falls as the marginal fill price rises, so the answer is the
+        largest n for which some price a <= limit has n <= contracts offered at a or
+        better and n <= the Kelly size at a.
+        """
+        if not self._ready[index]:
+            self._fill(index)
+        limit = min(int(limit), N_PRICES - 2)
+        if limit < 1:
+            return 0
+        rows = self._yes_rows if side == 'yes' else self._no_rows
+        wanted = np.rint(rows[index, 1:limit + 1] * bankroll * confidence)
+        offered = book.ask_depth(side)[1:limit + 1]
+        return int(np.minimum(wanted, offered).max())
+
+    def cost(self, price):
+        """Dollars paid per contract bought at a price in cents."""
+        return price / 100 + self.parameters.slippage
+
+    def decide(self, index, quote, bankroll, confidence, yes_contracts, no_contracts, book=None):
+        """
+        Parameters:
+        - index (int): Flat state index from index()
+        - quote (dict): Home market with yes_bid/yes_ask/no_bid/no_ask in cents
+        - bankroll (float): Dollars available
+        - confidence (float): Model confidence (0-1)
+        - yes_contracts (int), no_contracts (int): Current position
+        - book (OrderBook): Depth of the same market; without it orders are sized at the top of book
+
+        Returns:
+        - list[Action]: Orders to place, yes side first
+        """
+        actions = []
+        slippage = self.parameters.slippage
+        for side, enter, exit, held in (('yes', self.yes_enter, self.yes_exit, yes_contracts),
+                                        ('no', self.no_enter, self.no_exit, no_contracts)):
+            ask, bid = quote[side + '_ask'], quote[side + '_bid']
+            if 2 * ask - bid < enter[index]:
+                if book is None:
+                    count = self.contracts(index, side, ask, bankroll, confidence)
+                    price, amount = ask, count * self.cost(ask)
+                else:
+                    # Deepest price whose fill, plus the spread, still clears the entry threshold
+                    limit = int(np.ceil(enter[index] - (ask - bid))) - 1
+                    count = self.depth_contracts(index, side, book, limit, bankroll, confidence)
+                    if count <= 0:
+                        continue
+                    price, amount = book.marginal_ask(side, count), book.buy_cost(side, count) / 100 + count * slippage
+                if count > 0 and amount <= bankroll:
+                    bankroll -= amount
+                    actions.append(Action('buy', side, count, price, amount))
+            elif held > 0 and bid > exit[index]:
+                if book is None:
+                    actions.append(Action('sell', side, held, bid, held * bid / 100))
+                    continue
+                # Only the contracts that can be sold above the exit threshold
+                count = min(held, book.available_to_sell(side, int(np.floor(exit[index])) + 1))
+                if count > 0:
+                    actions.append(Action('sell', side, count, book.marginal_bid(side, count),
+                                          book.sell_proceeds(side, count) / 100))
+        return actions
+
+    def rows_filled(self):
+        return int(self._ready.sum())
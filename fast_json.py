@@ -0,0 +1,140 @@
+"""
+JSON encoding and decoding for the hot paths: Kalshi responses and request
+bodies, websocket frames and order payloads.
+
+Uses orjson if installed, else msgspec, else the standard library, so callers
+never depend on either package:
+
+    from fast_json import dumps, dumps_bytes, loads
+    body = dumps_bytes({'ticker': ticker, 'count': 10})
+    event = loads(response.content)
+
+loads raises one of the DecodeError exceptions on malformed input. They are not
+all ValueErrors (msgspec's is not), so catch DecodeError rather than ValueError.
+
+Output matches json.dumps(obj, separators=(',', ':'), ensure_ascii=False), which
+is what Starlette's send_json sends. send_json/receive_json are drop-in
+replacements for the websocket methods of the same name.
+
+Run this module for a microbenchmark over a realistic get_event response:
+    python fast_json.py
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _stdlib_dumps_bytes(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+_stdlib_loads = json.loads
+
+
+def _orjson_dumps_bytes(obj):
+    # Numpy scalars and arrays (table lookups) and non-string keys are encoded like json.dumps would
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+if orjson is not None:
+    BACKEND = 'orjson'
+    dumps_bytes = _orjson_dumps_bytes
+    loads = orjson.loads
+    DecodeError = (orjson.JSONDecodeError, ValueError)
+elif msgspec is not None:
+    BACKEND = 'msgspec'
+    _encoder = msgspec.json.Encoder()
+    dumps_bytes = _encoder.encode
+    loads = msgspec.json.Decoder().decode
+    DecodeError = (msgspec.DecodeError, ValueError)
+else:
+    BACKEND = 'json'
+    dumps_bytes = _stdlib_dumps_bytes
+    loads = _stdlib_loads
+    DecodeError = (json.JSONDecodeError, ValueError)
+
+
+def dumps(obj):
+    """Encodes obj as a JSON str."""
+    return dumps_bytes(obj).decode('utf-8')
+
+
+async def send_json(websocket, data):
+    """Sends data as a JSON text frame on a Starlette/FastAPI websocket."""
+    await websocket.send_text(dumps(data))
+
+
+async def receive_json(websocket):
+    """Receives a JSON text frame from a Starlette/FastAPI websocket."""
+    return loads(await websocket.receive_text())
+
+
+def _sample_event(n_markets=2):
+    """A get_event response shaped like Kalshi's for an MLB game."""
+    event_ticker = 'KXMLBGAME-25JUL04BOSNYY'
+    market = {
+        'ticker': '', 'event_ticker': event_ticker, 'market_type': 'binary',
+        'title': 'Boston vs New York Y Winner?', 'subtitle': '', 'yes_sub_title': '', 'no_sub_title': '',
+        'open_time': '2025-07-03T14:00:00Z', 'close_time': '2025-07-05T03:00:00Z',
+        'expected_expiration_time': '2025-07-05T02:00:00Z', 'expiration_time': '2025-07-18T23:00:00Z',
+        'latest_expiration_time': '2025-07-18T23:00:00Z', 'settlement_timer_seconds': 300, 'status': 'active',
+        'response_price_units': 'usd_cent', 'notional_value': 100, 'tick_size': 1,
+        'yes_bid': 55, 'yes_ask': 57, 'no_bid': 43, 'no_ask': 45, 'last_price': 56,
+        'previous_yes_bid': 52, 'previous_yes_ask': 54, 'previous_price': 53,
+        'volume': 482113, 'volume_24h': 190554, 'liquidity': 38227541, 'open_interest': 301876,
+        'result': '', 'can_close_early': True, 'expiration_value': '', 'category': '', 'risk_limit_cents': 0,
+        'strike_type': 'structured', 'custom_strike': {'baseball_team': 'c4a7f3d2-8d1e-4a1b-9a76-b8a3fa6a9a11'},
+        'rules_primary': 'If New York Y wins the Boston vs New York Y professional baseball game originally '
+                         'scheduled for Jul 4, 2025, then the market resolves to Yes.',
+        'rules_secondary': 'If the game is postponed, the market will close 48 hours after the original date.',
+    }
+    markets = []
+    for i, team in enumerate(('NYY', 'BOS', 'TIE', 'X', 'Y', 'Z')[:n_markets]):
+        markets.append(dict(market, ticker=f'{event_ticker}-{team}', yes_sub_title=team,
+                            yes_bid=55 - 10 * i, yes_ask=57 - 10 * i))
+    return {
+        'event': {'event_ticker': event_ticker, 'series_ticker': 'KXMLBGAME',
+                  'sub_title': 'BOS vs NYY (Jul 4)', 'title': 'Boston vs New York Y',
+                  'mutually_exclusive': True, 'category': 'Sports', 'collateral_return_type': '',
+                  'strike_date': '2025-07-04T23:05:00Z', 'strike_period': ''},
+        'markets': markets,
+    }
+
+
+def benchmark(iterations=20000):
+    """Times decoding a get_event response and encoding an order and a quote push, per backend."""
+    import timeit
+
+    event = _sample_event()
+    body = _stdlib_dumps_bytes(event)
+    order = {'ticker': 'KXMLBGAME-25JUL04BOSNYY-NYY', 'client_order_id': '0f8e2a52-55f8-4d8a-9c56-5a3c2b8f0d11',
+             'type': 'limit', 'action': 'buy', 'side': 'yes', 'count': 42, 'yes_price': 57}
+    push = {'home': {'yes_ask': 57, 'yes_bid': 55}, 'away': {'yes_ask': 47, 'yes_bid': 45}}
+    backends = {'json': (_stdlib_dumps_bytes, _stdlib_loads)}
+    if orjson is not None:
+        backends['orjson'] = (_orjson_dumps_bytes, orjson.loads)
+    if msgspec is not None:
+        backends['msgspec'] = (msgspec.json.Encoder().encode, msgspec.json.Decoder().decode)
+
+    print(f"get_event response: {len(body)} bytes; {iterations} iterations; active backend: {BACKEND}")
+    print(f"{'backend':<8} {'decode event':>14} {'encode order':>14} {'encode push':>13}")
+    baseline = None
+    for name, (encode, decode) in backends.items():
+        assert decode(encode(event)) == event
+        times = [1e6 * min(timeit.repeat(call, number=iterations, repeat=3)) / iterations
+                 for call in (lambda: decode(body), lambda: encode(order), lambda: encode(push))]
+        baseline = baseline or times
+        speedups = ', '.join(f'{b / t:.1f}x' for b, t in zip(baseline, times))
+        print(f"{name:<8} {times[0]:>11.2f} us {times[1]:>11.2f} us {times[2]:>10.2f} us   ({speedups} vs json)")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,177 @@
+"""
+Monte Carlo simulation of the rest of a game from a given state.
+
+Half-inning run totals are drawn from the run distributions in
+runsperinningballsstrikesstats, thousands of paths at a time as NumPy array
+operations. Large batches of states are sharded across a ProcessPoolExecutor.
+The spread of the simulated outcomes feeds the model_confidence argument of
+dynamic_kelly_fraction. Score diffs are home minus away, as in main2.x().
+"""
+import argparse
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from getExpectedStats import MAX_INNING, RUNS_PATH
+from markov_engine import GHOST_RUNNER_BASES, REGULATION_INNINGS, load_run_distributions
+
+SimulationResult = namedtuple('SimulationResult', ['mean', 'stderr', 'paths'])
+
+DEFAULT_PATHS = 5000
+# Paths still tied after this many extra innings are scored as a coin flip
+MAX_EXTRA_INNINGS = 20
+
+
+class GameSimulator:
+    """
+    Simulates remaining games by sampling half-inning run totals.
+
+    Parameters:
+    - distributions (ndarray): Run pmfs of shape (3, 8, N_COUNTS, MAX_RUNS), as from load_run_distributions
+    - ghost_runner (bool): Start extra innings with a runner on second
+    - seed (int or SeedSequence): Seed for the random generator
+    """
+
+    def __init__(self, distributions, ghost_runner=True, seed=None):
+        self.distributions = distributions
+        self.ghost_runner = ghost_runner
+        self.rng = np.random.default_rng(seed)
+        self._cdfs = np.cumsum(distributions, axis=-1)
+        self._fresh_cdf = self._cdfs[0, 0, 0]
+        self._extra_cdf = self._cdfs[0, GHOST_RUNNER_BASES, 0] if ghost_runner else self._fresh_cdf
+
+    @classmethod
+    def from_file(cls, file_path=RUNS_PATH, **kwargs):
+        return cls(load_run_distributions(file_path), **kwargs)
+
+    def _draw(self, cdf, size):
+        # Inverse-CDF sampling; min() guards against the last cdf entry rounding below 1
+        return np.minimum(np.searchsorted(cdf, self.rng.random(size), side='right'), len(cdf) - 1)
+
+    def simulate(self, inning, home_away, outs, bases, score_diff, balls, strikes, paths=DEFAULT_PATHS):
+        """
+        Plays out the rest of the game from one state.
+
+        Returns:
+        - SimulationResult: Home win rate, its standard error, and the number of paths
+        """
+        inning = min(inning, MAX_INNING)
+        margin = np.full(paths, score_diff, dtype=np.int64)
+        current = self._draw(self._cdfs[outs, bases, balls * 3 + strikes], paths)
+        margin += current if home_away == 1 else -current
+        if inning <= REGULATION_INNINGS:
+            away_halves = REGULATION_INNINGS - inning
+            home_halves = away_halves + (1 if home_away == 0 else 0)
+            if home_halves:
+                margin += self._draw(self._fresh_cdf, (paths, home_halves)).sum(axis=1)
+            if away_halves:
+                margin -= self._draw(self._fresh_cdf, (paths, away_halves)).sum(axis=1)
+        elif home_away == 0:
+            margin += self._draw(self._extra_cdf, paths)
+
+        tied = np.flatnonzero(margin == 0)
+        for _ in range(MAX_EXTRA_INNINGS):
+            if not len(tied):
+                break
+            margin[tied] += self._draw(self._extra_cdf, len(tied)) - self._draw(self._extra_cdf, len(tied))
+            tied = tied[margin[tied] == 0]
+
+        wins = (margin > 0).astype(np.float64)
+        wins[tied] = 0.5
+        return SimulationResult(wins.mean(), wins.std(ddof=1) / np.sqrt(paths), paths)
+
+    def simulate_many(self, states, paths=DEFAULT_PATHS):
+        """
+        Simulates each row of an (n, 7) array of (inning, home_away, outs, bases,
+        score_diff, balls, strikes) states in this process.
+
+        Returns:
+        - means (ndarray), stderrs (ndarray): One entry per state
+        """
+        states = np.asarray(states, dtype=np.int64).reshape(-1, 7)
+        means = np.empty(len(states))
+        stderrs = np.empty(len(states))
+        for row, state in enumerate(states.tolist()):
+            means[row], stderrs[row], _ = self.simulate(*state, paths=paths)
+        return means, stderrs
+
+
+def _simulate_shard(distributions, ghost_runner, seed, states, paths):
+    return GameSimulator(distributions, ghost_runner, seed).simulate_many(states, paths)
+
+
+def simulate_states(states, paths=DEFAULT_PATHS, workers=None, shard_size=256, distributions=None,
+                    ghost_runner=True, seed=None):
+    """
+    Simulates a large batch of states across a process pool.
+
+    Parameters:
+    - states (array-like): (n, 7) array of (inning, home_away, outs, bases, score_diff, balls, strikes)
+    - paths (int): Paths per state
+    - workers (int): Worker processes (default: one per CPU); 1 runs in this process
+    - shard_size (int): States per task
+    - distributions (ndarray): Run pmfs (default: loaded from RUNS_PATH)
+    - ghost_runner (bool): Start extra innings with a runner on second
+    - seed (int): Seed; each shard gets an independent child stream
+
+    Returns:
+    - means (ndarray), stderrs (ndarray): One entry per state
+    """
+    if distributions is None:
+        distributions = load_run_distributions()
+    states = np.asarray(states, dtype=np.int64).reshape(-1, 7)
+    shards = [states[start:start + shard_size] for start in range(0, len(states), shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shards))
+    if workers == 1 or len(shards) <= 1:
+        results = [_simulate_shard(distributions, ghost_runner, shard_seed, shard, paths)
+                   for shard_seed, shard in zip(seeds, shards)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_shard, [distributions] * len(shards), [ghost_runner] * len(shards),
+                                    seeds, shards, [paths] * len(shards)))
+    if not results:
+        return np.empty(0), np.empty(0)
+    return np.concatenate([means for means, _ in results]), np.concatenate([stderrs for _, stderrs in results])
+
+
+def model_confidence(win_prob, result, tolerance=0.10):
+    """
+    Confidence (0-1) in a table win probability given a simulation of the same state.
+    Falls linearly to zero as the disagreement between the two, plus two standard
+    errors of simulation noise, approaches the tolerance.
+
+    Parameters:
+    - win_prob (float): Win probability from the table
+    - result (SimulationResult): Simulation of the same state
+    - tolerance (float): Disagreement at which confidence reaches zero
+    """
+    disagreement = abs(win_prob - result.mean) + 2 * result.stderr
+    return max(0.0, 1.0 - disagreement / tolerance)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m game_simulator', description="Monte Carlo game simulator")
+    parser.add_argument('--states', type=int, default=2000, help="Random states to simulate")
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    states = np.column_stack([rng.integers(1, MAX_INNING + 1, args.states), rng.integers(0, 2, args.states),
+                              rng.integers(0, 3, args.states), rng.integers(0, 8, args.states),
+                              rng.integers(-5, 6, args.states), rng.integers(0, 4, args.states),
+                              rng.integers(0, 3, args.states)])
+    for workers in (1, args.workers):
+        start = time.perf_counter()
+        means, stderrs = simulate_states(states, args.paths, workers=workers, seed=args.seed)
+        print(f"workers={workers or 'all'}: {len(states)} states x {args.paths} paths in "
+              f"{time.perf_counter() - start:.2f}s (mean stderr {stderrs.mean():.4f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
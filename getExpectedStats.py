@@ -1,5 +1,60 @@
-import scipy.stats as stats
+import argparse
 import ast
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from statistics import NormalDist
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: the delta log is used unlocked
+    fcntl = None
+
+STATS_PATH = './statswithballsstrikes'
+LEVERAGE_PATH = './leverage'
+RUNS_PATH = './runsperinningballsstrikesstats'
+ARTIFACT_PATH = './model_tables.bin'
+# Append-only log of count increments not yet compacted into the artifact
+DELTA_SUFFIX = '.delta'
+LOCK_SUFFIX = '.lock'
+DELTA_DTYPE = np.dtype([('index', '<i4'), ('won', '<i4'), ('total', '<i4')])
+
+# Dense table layout: inning (1-10), home_away, outs, bases mask, score diff, count
+MAX_INNING = 10
+MAX_SCORE_DIFF = 30
+N_DIFFS = 2 * MAX_SCORE_DIFF + 1
+N_COUNTS = 12
+TABLE_SHAPE = (MAX_INNING, 2, 3, 8, N_DIFFS, N_COUNTS)
+
+# Fallback flags, and the neutral values used when no populated neighbour exists at all.
+# The FALLBACK_DEFAULT_* flags mark values that are that made-up default, not a neighbour's.
+FALLBACK_WIN = 1
+FALLBACK_LEVERAGE = 2
+FALLBACK_RUNS = 4
+FALLBACK_DEFAULT_WIN = 8
+FALLBACK_DEFAULT_LEVERAGE = 16
+FALLBACK_DEFAULT_RUNS = 32
+DEFAULT_WIN = 0.5
+DEFAULT_LEVERAGE = 1.0
+DEFAULT_RUNS = 0.5
+
+# Compiled artifact: magic, uint32 header length and JSON header padded to ARTIFACT_HEADER_SIZE,
+# then the raw arrays at 64-byte aligned offsets.
+# Bump ARTIFACT_VERSION whenever the layout or the table encoding changes.
+ARTIFACT_MAGIC = b'MLBWET\x00\x00'
+ARTIFACT_VERSION = 4
+ARTIFACT_HEADER_SIZE = 4096
+ARTIFACT_ALIGN = 64
 
 
 def set_nested_dict(d, keys, value):
@@ -131,43 +186,860 @@ def parse_key(key_str):
     # Example key_str: "(14, 1, 2, (1, 0, 1), -3, (2, 2))"
     return ast.literal_eval(key_str)
 
+ParseStats = namedtuple('ParseStats', ['rows_read', 'rows_rejected', 'seconds'])
+LookupResult = namedtuple('LookupResult', ['win', 'leverage', 'runs', 'missing', 'fallback', 'invalid'],
+                          defaults=(None, None))
+
+STATS_DTYPE = np.dtype([
+    ('inning', np.int16), ('home_away', np.int8), ('outs', np.int8), ('bases', np.int8),
+    ('score_diff', np.int16), ('balls', np.int8), ('strikes', np.int8),
+    ('won', np.int64), ('total', np.int64), ('win', np.float64),
+])
+LEVERAGE_DTYPE = np.dtype([
+    ('inning', np.int16), ('home_away', np.int8), ('outs', np.int8), ('bases', np.int8),
+    ('score_diff', np.int16), ('leverage', np.float64),
+])
+MAX_RUNS = 15
+RUNS_DTYPE = np.dtype([
+    ('outs', np.int8), ('bases', np.int8), ('balls', np.int8), ('strikes', np.int8),
+    ('runs', np.int64, (MAX_RUNS,)), ('expected_runs', np.float64),
+])
+
+_INT = r'\s*(-?\d+)\s*'
+# (inning, home_away, outs, (b1, b2, b3), score_diff, (balls, strikes)): (won, total)
+_STATS_LINE = re.compile(
+    rf'^\s*\({_INT},{_INT},{_INT},\s*\({_INT},{_INT},{_INT}\)\s*,{_INT},\s*\({_INT},{_INT}\)\s*\)\s*:'
+    rf'\s*[(\[]{_INT},{_INT}[)\]]\s*$', re.MULTILINE)
+# (outs, (b1, b2, b3), (balls, strikes)): [runs_0, runs_1, ...]
+_RUNS_LINE = re.compile(
+    rf'^\s*\({_INT},\s*\({_INT},{_INT},{_INT}\)\s*,\s*\({_INT},{_INT}\)\s*\)\s*:\s*\[([\d,\s]*)\]\s*$',
+    re.MULTILINE)
+_NON_BLANK_LINE = re.compile(r'^[ \t]*\S', re.MULTILINE)
+
+
+def _tokenize(file_path, pattern):
+    """Reads a whole file and returns its regex matches, the parse stats and the start time."""
+    start = time.perf_counter()
+    try:
+        with open(file_path, 'r') as file:
+            text = file.read()
+    except FileNotFoundError:
+        print(f"Error: The file '{file_path}' was not found.")
+        return [], 0, start
+    matches = pattern.findall(text)
+    rejected = len(_NON_BLANK_LINE.findall(text)) - len(matches)
+    if rejected:
+        print(f"Warning: rejected {rejected} malformed lines in '{file_path}'")
+    return matches, rejected, start
+
+
+def parse_stats_with_balls_strikes(file_path):
+    """
+    Vectorized reader for statswithballsstrikes.
+    Applies the same inning cap and win % convention as read_stats_with_balls_strikes.
+
+    Returns:
+    - records (ndarray): Structured array with STATS_DTYPE
+    - stats (ParseStats): Rows read, rows rejected and seconds taken
+    """
+    matches, rejected, start = _tokenize(file_path, _STATS_LINE)
+    columns = np.array(matches, dtype=np.int64).reshape(-1, 11).T
+    records = np.empty(len(matches), dtype=STATS_DTYPE)
+    records['inning'] = np.minimum(columns[0], MAX_INNING)
+    records['home_away'] = columns[1]
+    records['outs'] = columns[2]
+    records['bases'] = columns[3] | (columns[4] << 1) | (columns[5] << 2)
+    records['score_diff'] = columns[6]
+    records['balls'] = columns[7]
+    records['strikes'] = columns[8]
+    records['won'] = columns[9]
+    records['total'] = columns[10]
+    win = np.zeros(len(matches), dtype=np.float64)
+    np.divide(columns[9], columns[10], out=win, where=columns[10] != 0)
+    records['win'] = np.where(columns[1] == 0, 1 - win, win)
+    return records, ParseStats(len(records), rejected, time.perf_counter() - start)
+
+
+def parse_leverage_index(file_path):
+    """
+    Vectorized reader for the leverage file, using pandas' C CSV parser.
+    Score diffs are flipped for the visiting team, as in read_leverage_index.
+
+    Returns:
+    - records (ndarray): Structured array with LEVERAGE_DTYPE
+    - stats (ParseStats): Rows read, rows rejected and seconds taken
+    """
+    # pandas is only needed when compiling tables, so keep it off the import path
+    import pandas as pd
+
+    start = time.perf_counter()
+    try:
+        with open(file_path, 'r') as file:
+            text = file.read()
+    except FileNotFoundError:
+        print(f"Error: The file '{file_path}' was not found.")
+        return np.empty(0, dtype=LEVERAGE_DTYPE), ParseStats(0, 0, time.perf_counter() - start)
+    names = ['team', 'inning', 'outs', 'bases', 'score_diff', 'leverage']
+    frame = pd.read_csv(io.StringIO(text), header=None, names=names, skipinitialspace=True, on_bad_lines='skip')
+    # Columns only come back as strings when a malformed value is present; coerce those to NaN
+    numeric = frame[names[1:]].apply(pd.to_numeric, errors='coerce')
+    valid = (numeric.notna().all(axis=1) & numeric['bases'].between(1, 8) & frame['team'].notna()).to_numpy()
+    numeric = numeric[valid]
+    home_away = (frame['team'][valid] == 'H').to_numpy().astype(np.int8)
+    score_diff = numeric['score_diff'].to_numpy(dtype=np.int64)
+    records = np.empty(len(numeric), dtype=LEVERAGE_DTYPE)
+    records['inning'] = numeric['inning'].to_numpy(dtype=np.int64)
+    records['home_away'] = home_away
+    records['outs'] = numeric['outs'].to_numpy(dtype=np.int64)
+    # Bases codes 1-8 enumerate the occupancy masks 0-7
+    records['bases'] = numeric['bases'].to_numpy(dtype=np.int64) - 1
+    records['score_diff'] = np.where(home_away == 0, -score_diff, score_diff)
+    records['leverage'] = numeric['leverage'].to_numpy(dtype=np.float64)
+    rejected = len(_NON_BLANK_LINE.findall(text)) - len(records)
+    if rejected:
+        print(f"Warning: rejected {rejected} malformed lines in '{file_path}'")
+    return records, ParseStats(len(records), rejected, time.perf_counter() - start)
+
+
+def parse_runs_per_inning_balls_strikes_stats(file_path):
+    """
+    Vectorized reader for runsperinningballsstrikesstats.
+    Keeps the run distribution, zero-padded to MAX_RUNS with longer rows' tail folded
+    into the last bucket (MAX_RUNS - 1 or more runs), alongside the mean of the full
+    row, as read_runs_per_inning_balls_strikes_stats computes it.
+
+    Returns:
+    - records (ndarray): Structured array with RUNS_DTYPE
+    - stats (ParseStats): Rows read, rows rejected and seconds taken
+    """
+    matches, rejected, start = _tokenize(file_path, _RUNS_LINE)
+    records = np.zeros(len(matches), dtype=RUNS_DTYPE)
+    if matches:
+        columns = np.array([match[:6] for match in matches], dtype=np.int64).T
+        records['outs'] = columns[0]
+        records['bases'] = columns[1] | (columns[2] << 1) | (columns[3] << 2)
+        records['balls'] = columns[4]
+        records['strikes'] = columns[5]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for row, match in enumerate(matches):
+                counts = np.array(match[6].split(','), dtype=np.int64)
+                records['expected_runs'][row] = (counts * np.arange(len(counts))).sum() / counts.sum()
+                records['runs'][row, :min(len(counts), MAX_RUNS)] = counts[:MAX_RUNS]
+                records['runs'][row, MAX_RUNS - 1] += counts[MAX_RUNS:].sum()
+    return records, ParseStats(len(records), rejected, time.perf_counter() - start)
+
+
+def _last_occurrence(indices):
+    """Positions of the last occurrence of each index, matching dict overwrite semantics."""
+    _, reversed_positions = np.unique(indices[::-1], return_index=True)
+    return len(indices) - 1 - reversed_positions
+
+
+class InvalidStateError(KeyError):
+    """A game state with a field outside the table, e.g. 3 outs or 4 balls. A KeyError, as the nested dicts raised."""
+
+
+def valid_states(home_away, outs, bases, balls, strikes):
+    """Mask of states whose half, outs, bases, balls and strikes are all in range (innings and diffs are clamped)."""
+    home_away, outs, bases, balls, strikes = (np.asarray(field) for field in (home_away, outs, bases, balls, strikes))
+    return (((home_away == 0) | (home_away == 1)) & (outs >= 0) & (outs < 3) & (bases >= 0) & (bases < 8)
+            & (balls >= 0) & (balls < 4) & (strikes >= 0) & (strikes < 3))
+
+
+def encode_bases(first, second, third):
+    """Packs base occupancy into a 3-bit mask (first base is the low bit)."""
+    return first | (second << 1) | (third << 2)
+
+
+def decode_bases(mask):
+    """Unpacks a 3-bit base mask into the (first, second, third) tuple used by the nested dicts."""
+    return (mask & 1, (mask >> 1) & 1, (mask >> 2) & 1)
+
+
+class WinExpectancyTable:
+    """
+    Dense win-expectancy table.
+
+    Win %, leverage and expected runs are stored as contiguous float32 arrays of
+    shape TABLE_SHAPE, indexed by (inning - 1, home_away, outs, bases mask,
+    score_diff + MAX_SCORE_DIFF, balls * 3 + strikes). Missing cells are NaN.
+    Innings above MAX_INNING and score diffs beyond +/-MAX_SCORE_DIFF are clamped; other
+    fields out of range (3 outs, 4 balls, 3 strikes) raise InvalidStateError.
+
+    The *_filled arrays hold the same values with every missing cell replaced by
+    its nearest populated neighbour (see build_fallback), and fallback records
+    which values were filled (FALLBACK_WIN | FALLBACK_LEVERAGE | FALLBACK_RUNS) and
+    which of those had no populated neighbour and hold a default (FALLBACK_DEFAULT_*).
+
+    won and total keep the raw (won_games, total_games) counts from the stats file,
+    from the batting team's point of view, so completed games can be added in place.
+    """
+
+    ARRAY_NAMES = ('win', 'leverage', 'runs', 'win_filled', 'leverage_filled', 'runs_filled', 'fallback',
+                   'won', 'total')
+
+    def __init__(self, win=None, leverage=None, runs=None, win_filled=None, leverage_filled=None,
+                 runs_filled=None, fallback=None, won=None, total=None, metadata=None):
+        self.metadata = metadata or {}
+        self.win = _empty_table() if win is None else win
+        self.leverage = _empty_table() if leverage is None else leverage
+        self.runs = _empty_table() if runs is None else runs
+        self.win_filled = _empty_table() if win_filled is None else win_filled
+        self.leverage_filled = _empty_table() if leverage_filled is None else leverage_filled
+        self.runs_filled = _empty_table() if runs_filled is None else runs_filled
+        self.fallback = np.zeros(TABLE_SHAPE, dtype=np.uint8) if fallback is None else fallback
+        self.won = np.zeros(TABLE_SHAPE, dtype=np.int32) if won is None else won
+        self.total = np.zeros(TABLE_SHAPE, dtype=np.int32) if total is None else total
+        self._win_flat = self.win.reshape(-1)
+        self._leverage_flat = self.leverage.reshape(-1)
+        self._runs_flat = self.runs.reshape(-1)
+        self._win_filled_flat = self.win_filled.reshape(-1)
+        self._leverage_filled_flat = self.leverage_filled.reshape(-1)
+        self._runs_filled_flat = self.runs_filled.reshape(-1)
+        self._fallback_flat = self.fallback.reshape(-1)
+
+    @classmethod
+    def from_dicts(cls, stats_dict, leverage_dict, runs_dict):
+        """
+        Builds the table from the nested dicts returned by the read_* functions.
+        Leverage and expected runs are filled from their own tables, so they are
+        available even for states missing from stats_dict.
+        """
+        table = cls()
+        for inning, halves in stats_dict.items():
+            for home_away, outs_dict in halves.items():
+                for outs, bases_dict in outs_dict.items():
+                    for base_positions, diffs in bases_dict.items():
+                        for score_diff, counts in diffs.items():
+                            for (balls, strikes), percentage in counts.items():
+                                index = table.state_index(inning, home_away, outs, encode_bases(*base_positions),
+                                                          score_diff, balls, strikes)
+                                table._win_flat[index] = percentage
+        for inning, halves in leverage_dict.items():
+            # Leverage innings run past the table's last inning; keep only the ones the stats use
+            if inning > MAX_INNING:
+                continue
+            for home_away, outs_dict in halves.items():
+                for outs, bases_dict in outs_dict.items():
+                    for base_positions, diffs in bases_dict.items():
+                        for score_diff, leverage in diffs.items():
+                            if abs(score_diff) > MAX_SCORE_DIFF:
+                                continue
+                            table.leverage[inning - 1, home_away, outs, encode_bases(*base_positions),
+                                           score_diff + MAX_SCORE_DIFF, :] = leverage
+        for outs, bases_dict in runs_dict.items():
+            for base_positions, counts in bases_dict.items():
+                for (balls, strikes), expected_runs in counts.items():
+                    table.runs[:, :, outs, encode_bases(*base_positions), :, balls * 3 + strikes] = expected_runs
+        table.build_fallback()
+        return table
+
+    @classmethod
+    def from_records(cls, stats_records, leverage_records, runs_records):
+        """Builds the table from the structured arrays returned by the parse_* functions."""
+        table = cls()
+        stats_index = np.ravel_multi_index((
+            np.clip(stats_records['inning'], 1, MAX_INNING) - 1, stats_records['home_away'], stats_records['outs'],
+            stats_records['bases'], np.clip(stats_records['score_diff'], -MAX_SCORE_DIFF, MAX_SCORE_DIFF) + MAX_SCORE_DIFF,
+            stats_records['balls'] * 3 + stats_records['strikes'],
+        ), TABLE_SHAPE)
+        # Innings past MAX_INNING share a cell with it, so the games of every row mapping to a cell are pooled
+        won, total = table.won.reshape(-1), table.total.reshape(-1)
+        np.add.at(won, stats_index, stats_records['won'])
+        np.add.at(total, stats_index, stats_records['total'])
+        indices = np.unique(stats_index)
+        win = np.zeros(len(indices), dtype=np.float64)
+        np.divide(won[indices], total[indices], out=win, where=total[indices] != 0)
+        home_away = np.unravel_index(indices, TABLE_SHAPE)[1]
+        table._win_flat[indices] = np.where(home_away == 0, 1 - win, win)
+
+        leverage_records = leverage_records[(leverage_records['inning'] <= MAX_INNING)
+                                            & (np.abs(leverage_records['score_diff']) <= MAX_SCORE_DIFF)]
+        leverage_keys = (leverage_records['inning'] - 1, leverage_records['home_away'], leverage_records['outs'],
+                         leverage_records['bases'], leverage_records['score_diff'] + MAX_SCORE_DIFF)
+        keep = _last_occurrence(np.ravel_multi_index(leverage_keys, TABLE_SHAPE[:5]))
+        table.leverage[tuple(key[keep] for key in leverage_keys)] = leverage_records['leverage'][keep, None]
+
+        runs_keys = (runs_records['outs'], runs_records['bases'], runs_records['balls'] * 3 + runs_records['strikes'])
+        keep = _last_occurrence(np.ravel_multi_index(runs_keys, (3, 8, N_COUNTS)))
+        outs, bases, count = (key[keep] for key in runs_keys)
+        table.runs[:, :, outs, bases, :, count] = runs_records['expected_runs'][keep, None, None, None]
+        table.build_fallback()
+        return table
+
+    def build_fallback(self):
+        """
+        Fills the *_filled arrays so that every state has a value. Each missing cell takes
+        the nearest populated cell, searching in order: the nearest count (strikes, then
+        balls), the nearest score diff, the nearest inning, then outs, bases and half.
+        Anything still missing (e.g. a source file is absent) gets a neutral default and
+        is flagged FALLBACK_DEFAULT_*, so it is not mistaken for data.
+        """
+        self.fallback[...] = 0
+        for name, flag, default_flag, default in (
+                ('win', FALLBACK_WIN, FALLBACK_DEFAULT_WIN, DEFAULT_WIN),
+                ('leverage', FALLBACK_LEVERAGE, FALLBACK_DEFAULT_LEVERAGE, DEFAULT_LEVERAGE),
+                ('runs', FALLBACK_RUNS, FALLBACK_DEFAULT_RUNS, DEFAULT_RUNS)):
+            source = getattr(self, name)
+            filled = getattr(self, name + '_filled')
+            filled[...] = source
+            # Split the count axis into (balls, strikes) so counts merge with their neighbours
+            by_count = filled.reshape(TABLE_SHAPE[:5] + (4, 3))
+            for axis in (6, 5, 4, 0, 2, 3, 1):
+                _fill_nearest(by_count, axis)
+            missing = np.isnan(source)
+            defaulted = np.isnan(filled)
+            filled[defaulted] = default
+            self.fallback[missing] |= flag
+            self.fallback[defaulted] |= default_flag
+
+    @staticmethod
+    def state_index(inning, home_away, outs, bases, score_diff, balls, strikes):
+        """
+        Returns the flat array index of a game state.
+
+        Parameters:
+        - inning (int): Inning (1+); innings above MAX_INNING use the last inning
+        - home_away (int): 0 for the top of the inning, 1 for the bottom
+        - outs (int): Outs (0-2)
+        - bases (int): Base occupancy mask from encode_bases
+        - score_diff (int): Score difference, clamped to +/-MAX_SCORE_DIFF
+        - balls (int): Balls (0-3)
+        - strikes (int): Strikes (0-2)
+
+        Raises:
+        - InvalidStateError: If home_away, outs, bases, balls or strikes is out of range
+        """
+        if not (home_away in (0, 1) and 0 <= outs < 3 and 0 <= bases < 8 and 0 <= balls < 4 and 0 <= strikes < 3):
+            raise InvalidStateError((inning, home_away, outs, bases, score_diff, balls, strikes))
+        if inning > MAX_INNING:
+            inning = MAX_INNING
+        elif inning < 1:
+            inning = 1
+        if score_diff > MAX_SCORE_DIFF:
+            score_diff = MAX_SCORE_DIFF
+        elif score_diff < -MAX_SCORE_DIFF:
+            score_diff = -MAX_SCORE_DIFF
+        return ((((((inning - 1) * 2 + home_away) * 3 + outs) * 8 + bases) * N_DIFFS
+                 + score_diff + MAX_SCORE_DIFF) * N_COUNTS + balls * 3 + strikes)
+
+    def lookup(self, inning, home_away, outs, bases, score_diff, balls, strikes):
+        """
+        Returns (win %, leverage, expected runs) for a game state; missing values are NaN.
+        Takes the same arguments as state_index.
+        """
+        index = self.state_index(inning, home_away, outs, bases, score_diff, balls, strikes)
+        return self._win_flat.item(index), self._leverage_flat.item(index), self._runs_flat.item(index)
+
+    def lookup_with_fallback(self, inning, home_away, outs, bases, score_diff, balls, strikes):
+        """
+        Returns (win %, leverage, expected runs, fallback flags) for a game state. Never
+        returns NaN: missing values come from the nearest populated state, and the flags
+        say which ones did. Takes the same arguments as state_index.
+        """
+        index = self.state_index(inning, home_away, outs, bases, score_diff, balls, strikes)
+        return (self._win_filled_flat.item(index), self._leverage_filled_flat.item(index),
+                self._runs_filled_flat.item(index), self._fallback_flat.item(index))
+
+    @staticmethod
+    def state_indices(innings, home_away, outs, bases, score_diffs, balls, strikes):
+        """
+        Vectorized state_index. Takes array-likes of equal length; bases may be masks
+        or an (n, 3) array of (first, second, third) occupancy.
+
+        Raises:
+        - InvalidStateError: If any state is out of range (see valid_states)
+        """
+        bases = np.asarray(bases, dtype=np.intp)
+        if bases.ndim == 2:
+            bases = bases[:, 0] | (bases[:, 1] << 1) | (bases[:, 2] << 2)
+        valid = valid_states(home_away, outs, bases, balls, strikes)
+        if not valid.all():
+            raise InvalidStateError(f'{np.size(valid) - np.count_nonzero(valid)} states out of range')
+        innings = np.clip(np.asarray(innings, dtype=np.intp), 1, MAX_INNING)
+        score_diffs = np.clip(np.asarray(score_diffs, dtype=np.intp), -MAX_SCORE_DIFF, MAX_SCORE_DIFF)
+        return ((((((innings - 1) * 2 + np.asarray(home_away, dtype=np.intp)) * 3 + np.asarray(outs, dtype=np.intp))
+                  * 8 + bases) * N_DIFFS + score_diffs + MAX_SCORE_DIFF) * N_COUNTS
+                + np.asarray(balls, dtype=np.intp) * 3 + np.asarray(strikes, dtype=np.intp))
+
+    def lookup_many(self, innings, home_away, outs, bases, score_diffs, balls, strikes, fallback=False):
+        """
+        Looks up many game states at once with fancy indexing.
+
+        Returns:
+        - LookupResult: win %, leverage and expected runs arrays (NaN where missing),
+          and a boolean mask of states with no win %. With fallback=True the values
+          come from the filled arrays and fallback holds the per-state flags.
+          States out of range (e.g. 3 outs) are flagged in invalid and are NaN and
+          missing in every case, with no fallback flags.
+        """
+        bases = np.asarray(bases, dtype=np.intp)
+        if bases.ndim == 2:
+            bases = bases[:, 0] | (bases[:, 1] << 1) | (bases[:, 2] << 2)
+        fields = np.broadcast_arrays(*(np.asarray(field, dtype=np.intp) for field in
+                                       (innings, home_away, outs, bases, score_diffs, balls, strikes)))
+        invalid = ~valid_states(*fields[1:4], *fields[5:])
+        # Invalid states are looked up as the first cell and blanked afterwards
+        indices = self.state_indices(*(np.where(invalid, 0, field) if i in (1, 2, 3, 5, 6) else field
+                                       for i, field in enumerate(fields)))
+        if fallback:
+            arrays = (self._win_filled_flat, self._leverage_filled_flat, self._runs_filled_flat)
+        else:
+            arrays = (self._win_flat, self._leverage_flat, self._runs_flat)
+        win, leverage, runs = (np.where(invalid, np.float32(np.nan), array[indices]) for array in arrays)
+        missing = np.isnan(self._win_flat[indices]) | invalid
+        flags = np.where(invalid, np.uint8(0), self._fallback_flat[indices]) if fallback else None
+        return LookupResult(win, leverage, runs, missing, flags, invalid)
+
+    def ingest_completed_game(self, pitch_states, home_won):
+        """
+        Adds one completed game to the counts and recomputes the win % of the cells it
+        touched, in place. Each state counts once per game however often it occurred.
+        Neighbouring cells that borrowed a fallback value keep it until the next compaction.
+
+        Parameters:
+        - pitch_states (array-like): (n, 7) states as (inning, home_away, outs, bases,
+          score_diff, balls, strikes), in the same encoding as lookup. States out of
+          range, such as the 3-out message that ends a half-inning, are skipped.
+        - home_won (bool): Whether the home team won
+
+        Returns:
+        - deltas (ndarray): The applied increments, with DELTA_DTYPE
+        """
+        states = np.asarray(pitch_states, dtype=np.intp).reshape(-1, 7)
+        states = states[valid_states(states[:, 1], states[:, 2], states[:, 3], states[:, 5], states[:, 6])]
+        indices = np.unique(self.state_indices(*states.T))
+        # Counts are from the batting team's side: the visitors bat in the top half
+        batting_home = np.unravel_index(indices, TABLE_SHAPE)[1] == 1
+        deltas = np.empty(len(indices), dtype=DELTA_DTYPE)
+        deltas['index'] = indices
+        deltas['won'] = batting_home == bool(home_won)
+        deltas['total'] = 1
+        self.apply_deltas(deltas)
+        return deltas
+
+    def apply_deltas(self, deltas):
+        """Adds count increments and recomputes win % and its fallback value for the touched cells."""
+        won, total = self.won.reshape(-1), self.total.reshape(-1)
+        np.add.at(won, deltas['index'], deltas['won'])
+        np.add.at(total, deltas['index'], deltas['total'])
+        indices = np.unique(deltas['index'])
+        percentage = won[indices] / np.maximum(total[indices], 1)
+        home_away = np.unravel_index(indices, TABLE_SHAPE)[1]
+        percentage = np.where(home_away == 0, 1 - percentage, percentage)
+        self._win_flat[indices] = percentage
+        self._win_filled_flat[indices] = percentage
+        self._fallback_flat[indices] &= ~np.uint8(FALLBACK_WIN | FALLBACK_DEFAULT_WIN)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def as_nested_dict(self):
+        """Read-only view with the same six-level indexing as build_combined_dict used to return."""
+        return NestedTableView(self)
+
+
+def _empty_table():
+    return np.full(TABLE_SHAPE, np.nan, dtype=np.float32)
+
+
+def _fill_nearest(array, axis):
+    """In place, replaces NaNs along one axis with the nearest non-NaN value on that axis (ties go low)."""
+    moved = np.moveaxis(array, axis, -1)
+    size = moved.shape[-1]
+    positions = np.arange(size)
+    valid = ~np.isnan(moved)
+    before = np.maximum.accumulate(np.where(valid, positions, -1), axis=-1)
+    after = np.minimum.accumulate(np.where(valid, positions, size)[..., ::-1], axis=-1)[..., ::-1]
+    use_before = (before >= 0) & ((after >= size) | (positions - before <= after - positions))
+    nearest = np.where(use_before, before, after)
+    found = nearest < size
+    values = np.take_along_axis(moved, np.minimum(nearest, size - 1), axis=-1)
+    moved[...] = np.where(found, values, np.nan)
+
+
+def _nan_to_none(value):
+    return None if value != value else value
+
+
+class NestedTableView:
+    """
+    Compatibility view over a WinExpectancyTable indexed like the old nested dict:
+    view[inning][home_away][outs][(b1, b2, b3)][score_diff][(balls, strikes)]
+    returns (win %, leverage, expected runs), with None for missing leverage/runs.
+    Only states with a win % are present.
+    """
+
+    def __init__(self, table, prefix=(), populated=None):
+        self._table = table
+        self._prefix = prefix
+        self._populated = ~np.isnan(table.win) if populated is None else populated
+
+    @staticmethod
+    def _key_to_index(level, key):
+        if level == 0:
+            return key - 1
+        if level == 3:
+            return encode_bases(*key)
+        if level == 4:
+            return key + MAX_SCORE_DIFF
+        if level == 5:
+            return key[0] * 3 + key[1]
+        return key
+
+    @staticmethod
+    def _index_to_key(level, index):
+        if level == 0:
+            return index + 1
+        if level == 3:
+            return decode_bases(index)
+        if level == 4:
+            return index - MAX_SCORE_DIFF
+        if level == 5:
+            return divmod(index, 3)
+        return index
+
+    def __getitem__(self, key):
+        level = len(self._prefix)
+        try:
+            index = self._key_to_index(level, key)
+        except (TypeError, ValueError):
+            raise KeyError(key)
+        if not isinstance(index, (int, np.integer)) or not 0 <= index < TABLE_SHAPE[level]:
+            raise KeyError(key)
+        if level == 5:
+            flat = np.ravel_multi_index(self._prefix + (index,), TABLE_SHAPE)
+            win = self._table._win_flat.item(flat)
+            if win != win:
+                raise KeyError(key)
+            return (win, _nan_to_none(self._table._leverage_flat.item(flat)),
+                    _nan_to_none(self._table._runs_flat.item(flat)))
+        prefix = self._prefix + (index,)
+        if not self._populated[prefix].any():
+            raise KeyError(key)
+        return NestedTableView(self._table, prefix, self._populated)
+
+    def __iter__(self):
+        level = len(self._prefix)
+        mask = self._populated[self._prefix]
+        for index in range(mask.shape[0]):
+            if mask[index].any():
+                yield self._index_to_key(level, index)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def build_win_expectancy_table(stats_path=STATS_PATH, leverage_path=LEVERAGE_PATH, runs_path=RUNS_PATH):
+    stats_records, _ = parse_stats_with_balls_strikes(stats_path)
+    leverage_records, _ = parse_leverage_index(leverage_path)
+    runs_records, _ = parse_runs_per_inning_balls_strikes_stats(runs_path)
+    return WinExpectancyTable.from_records(stats_records, leverage_records, runs_records)
+
+
 def build_combined_dict():
-    stats_dict = read_stats_with_balls_strikes('./statswithballsstrikes')
-    leverage_dict = read_leverage_index('./leverage')
-    runs_dict = read_runs_per_inning_balls_strikes_stats('./runsperinningballsstrikesstats')
-
-    combined_dict = {}
-
-    for inning in stats_dict:
-        for home_away in stats_dict[inning]:
-            for outs in stats_dict[inning][home_away]:
-                for base_positions in stats_dict[inning][home_away][outs]:
-                    for score_diff in stats_dict[inning][home_away][outs][base_positions]:
-                        for balls_strikes in stats_dict[inning][home_away][outs][base_positions][score_diff]:
-                            stats_val = stats_dict[inning][home_away][outs][base_positions][score_diff][balls_strikes]
-                            # Try to get leverage_val and runs_val, use None if not found
-                            try:
-                                leverage_val = leverage_dict[inning][home_away][outs][base_positions][score_diff]
-                            except Exception:
-                                leverage_val = None
-                            try:
-                                runs_val = runs_dict[outs][base_positions][balls_strikes]
-                            except Exception:
-                                runs_val = None
-                            # Build the nested structure
-                            combined_dict \
-                                .setdefault(inning, {}) \
-                                .setdefault(home_away, {}) \
-                                .setdefault(outs, {}) \
-                                .setdefault(base_positions, {}) \
-                                .setdefault(score_diff, {})[balls_strikes] = (stats_val, leverage_val, runs_val)
-    return combined_dict
+    return build_win_expectancy_table().as_nested_dict()
+
+
+_default_table = None
+
+
+def get_default_table():
+    """Loads the compiled table on first use and reuses it afterwards."""
+    global _default_table
+    if _default_table is None:
+        _default_table = load_win_expectancy_table()
+    return _default_table
+
+
+LOOKUP_COLUMNS = ('inning', 'home_away', 'outs', 'bases', 'score_diff', 'balls', 'strikes')
+
+
+def lookup_many(innings, halves=None, outs=None, bases=None, diffs=None, balls=None, strikes=None, table=None,
+                fallback=False):
+    """
+    Batch win-probability lookup for backtests and what-if analysis.
+
+    Parameters:
+    - innings (array-like or DataFrame): Innings, or a DataFrame with LOOKUP_COLUMNS
+    - halves (array-like): 0 for the top of the inning, 1 for the bottom
+    - outs (array-like): Outs (0-2)
+    - bases (array-like): Base masks from encode_bases, or an (n, 3) occupancy array
+    - diffs (array-like): Score differences
+    - balls (array-like): Balls (0-3)
+    - strikes (array-like): Strikes (0-2)
+    - table (WinExpectancyTable): Table to query (default: the compiled table)
+    - fallback (bool): Fill missing cells from their nearest populated state
+
+    Returns:
+    - LookupResult: win, leverage and runs arrays plus a missing-cell mask (and fallback flags),
+      and a mask of out-of-range states, which are always missing
+    """
+    if hasattr(innings, 'columns'):
+        frame = innings
+        innings, halves, outs, bases, diffs, balls, strikes = (frame[column].to_numpy() for column in LOOKUP_COLUMNS)
+    if table is None:
+        table = get_default_table()
+    return table.lookup_many(innings, halves, outs, bases, diffs, balls, strikes, fallback)
+
+
+def source_hashes(stats_path=STATS_PATH, leverage_path=LEVERAGE_PATH, runs_path=RUNS_PATH):
+    """SHA-256 of each source file (None if the file is missing), used to invalidate compiled artifacts."""
+    hashes = {}
+    for name, path in (('stats', stats_path), ('leverage', leverage_path), ('runs', runs_path)):
+        try:
+            with open(path, 'rb') as file:
+                hashes[name] = hashlib.sha256(file.read()).hexdigest()
+        except FileNotFoundError:
+            hashes[name] = None
+    return hashes
+
+
+def _align(offset):
+    return (offset + ARTIFACT_ALIGN - 1) // ARTIFACT_ALIGN * ARTIFACT_ALIGN
+
+
+def pack_table(table, sources, compacted_deltas=0):
+    """
+    Serializes a table into the artifact layout.
+
+    Returns:
+    - header (bytes): Magic, header length and JSON header, padded to the first array offset
+    - arrays (list): (offset, ndarray) pairs to write after the header
+    """
+    arrays = table.arrays()
+    header = {
+        'version': ARTIFACT_VERSION,
+        'shape': list(TABLE_SHAPE),
+        'max_score_diff': MAX_SCORE_DIFF,
+        'sources': sources,
+        'compacted_deltas': compacted_deltas,
+        'built_at': time.time(),
+        'arrays': {},
+    }
+    offset = ARTIFACT_HEADER_SIZE
+    placed = []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        header['arrays'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        placed.append((offset, array))
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix = ARTIFACT_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    if len(prefix) > ARTIFACT_HEADER_SIZE:
+        raise ValueError("Artifact header does not fit in its reserved space")
+    return prefix.ljust(ARTIFACT_HEADER_SIZE, b'\x00'), placed
+
+
+def unpack_table(buffer):
+    """Builds a WinExpectancyTable whose arrays are zero-copy views into an artifact buffer."""
+    if bytes(buffer[:len(ARTIFACT_MAGIC)]) != ARTIFACT_MAGIC:
+        raise ValueError("Not a win-expectancy table artifact")
+    (header_length,) = struct.unpack_from('<I', buffer, len(ARTIFACT_MAGIC))
+    start = len(ARTIFACT_MAGIC) + 4
+    header = json.loads(bytes(buffer[start:start + header_length]))
+    if header['version'] != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported artifact version {header['version']}")
+    if tuple(header['shape']) != TABLE_SHAPE:
+        raise ValueError(f"Artifact table shape {tuple(header['shape'])} does not match {TABLE_SHAPE}")
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+    return WinExpectancyTable(metadata=header, **arrays)
+
+
+def write_table_artifact(table, path=ARTIFACT_PATH, sources=None, compacted_deltas=0):
+    """Writes a compiled artifact atomically (temp file + rename) so readers never see a partial file."""
+    header, placed = pack_table(table, sources or {}, compacted_deltas)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as file:
+        file.write(header)
+        for offset, array in placed:
+            file.seek(offset)
+            file.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_table_artifact(path=ARTIFACT_PATH, writable=False):
+    """
+    Memory-maps a compiled artifact; pages are loaded lazily by the OS. A writable
+    mapping is copy-on-write, so in-place updates never reach the file.
+    """
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+    return unpack_table(buffer)
+
+
+def read_deltas(path):
+    """Reads a delta log, ignoring a partially written trailing record."""
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return np.empty(0, dtype=DELTA_DTYPE)
+    usable = len(data) - len(data) % DELTA_DTYPE.itemsize
+    return np.frombuffer(data[:usable], dtype=DELTA_DTYPE)
+
+
+@contextmanager
+def delta_log_lock(path, shared=False):
+    """
+    Holds the advisory lock of a delta log. Appends and compaction take it
+    exclusively, loaders shared, so a compaction never loses or double-counts a
+    concurrent append and a loader never sees the rewritten artifact with the old log.
+    """
+    with open(path + LOCK_SUFFIX, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        yield
+
+
+def append_deltas(deltas, path):
+    with delta_log_lock(path), open(path, 'ab') as file:
+        file.write(np.ascontiguousarray(deltas, dtype=DELTA_DTYPE).tobytes())
+
+
+def compile_tables(artifact_path=ARTIFACT_PATH, stats_path=STATS_PATH, leverage_path=LEVERAGE_PATH,
+                   runs_path=RUNS_PATH):
+    """Parses the source files and writes the compiled artifact. Returns the in-memory table."""
+    sources = source_hashes(stats_path, leverage_path, runs_path)
+    table = build_win_expectancy_table(stats_path, leverage_path, runs_path)
+    write_table_artifact(table, artifact_path, sources)
+    table.metadata = {'version': ARTIFACT_VERSION, 'sources': sources}
+    return table
+
+
+def load_win_expectancy_table(artifact_path=ARTIFACT_PATH, stats_path=STATS_PATH, leverage_path=LEVERAGE_PATH,
+                              runs_path=RUNS_PATH, writable=False):
+    """
+    Memory-maps the compiled artifact, recompiling it first if it is missing, from an
+    older format, or was built from source files whose hashes have since changed.
+    If the artifact cannot be written (e.g. a read-only deployment), the freshly
+    parsed table is returned from memory instead. Pending completed-game deltas are
+    applied on top, in a private copy-on-write mapping.
+    """
+    sources = source_hashes(stats_path, leverage_path, runs_path)
+    delta_path = artifact_path + DELTA_SUFFIX
+    table = None
+    # Read-only deployments have no log, and may not be able to create its lock file
+    with delta_log_lock(delta_path, shared=True) if os.path.exists(delta_path) else nullcontext():
+        deltas = read_deltas(delta_path)
+        writable = writable or len(deltas) > 0
+        try:
+            table = read_table_artifact(artifact_path, writable=writable)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            print(f"Ignoring artifact '{artifact_path}': {e}")
+    if table is not None and table.metadata.get('sources') != sources:
+        if table.metadata.get('compacted_deltas'):
+            print(f"Source files changed; dropping {table.metadata['compacted_deltas']} compacted game "
+                  f"updates from '{artifact_path}'")
+        table = None
+    if table is None:
+        try:
+            compile_tables(artifact_path, stats_path, leverage_path, runs_path)
+            table = read_table_artifact(artifact_path, writable=writable)
+        except OSError as e:
+            print(f"Could not write artifact '{artifact_path}': {e}")
+            table = build_win_expectancy_table(stats_path, leverage_path, runs_path)
+            table.metadata = {'version': ARTIFACT_VERSION, 'sources': sources}
+    if len(deltas):
+        table.apply_deltas(deltas)
+    return table
+
+
+def ingest_completed_game(pitch_states, home_won, table=None, artifact_path=ARTIFACT_PATH):
+    """
+    Adds a completed game to the loaded table and persists the increments to the
+    artifact's append-only delta log.
+
+    Parameters:
+    - pitch_states (array-like): (n, 7) states as (inning, home_away, outs, bases, score_diff, balls, strikes)
+    - home_won (bool): Whether the home team won
+    - table (WinExpectancyTable): Writable table to update (default: the loaded table)
+    - artifact_path (str): Artifact whose delta log receives the update
+    """
+    if table is None:
+        table = get_default_table()
+    if not table.won.flags.writeable:
+        raise ValueError("Table is read-only; load it with load_win_expectancy_table(writable=True)")
+    append_deltas(table.ingest_completed_game(pitch_states, home_won), artifact_path + DELTA_SUFFIX)
+
+
+def compact_deltas(artifact_path=ARTIFACT_PATH):
+    """
+    Folds the delta log into the artifact: applies it, rebuilds the fallback values,
+    rewrites the artifact and removes the log. Appends wait on the log's lock until
+    the new artifact is in place, then start a fresh log.
+
+    Returns:
+    - int: Number of delta records compacted
+    """
+    delta_path = artifact_path + DELTA_SUFFIX
+    with delta_log_lock(delta_path):
+        deltas = read_deltas(delta_path)
+        if not len(deltas):
+            return 0
+        table = read_table_artifact(artifact_path, writable=True)
+        table.apply_deltas(deltas)
+        table.build_fallback()
+        write_table_artifact(table, artifact_path, table.metadata.get('sources'),
+                             table.metadata.get('compacted_deltas', 0) + len(deltas))
+        os.remove(delta_path)
+    return len(deltas)
 
 # runs_per_inning_stats = read_runs_per_inning_balls_strikes_stats('runsperinningballsstrikesstats')
 # print(runs_per_inning_stats)  # Example usage
+_STANDARD_NORMAL = NormalDist()
+
+
+def _norm_ppf(p):
+    """
+    Inverse standard normal CDF. Scalars use the stdlib implementation so SciPy is
+    never imported on the polling path; arrays use scipy.special.ndtri, imported on
+    first use.
+    """
+    if np.ndim(p) == 0:
+        if p <= 0:
+            return -np.inf
+        if p >= 1:
+            return np.inf
+        return _STANDARD_NORMAL.inv_cdf(p)
+    from scipy.special import ndtri
+    return ndtri(p)
+
+
 def calculate_expected_margin(home_spread, away_spread, home_odds, away_odds, std_dev=3):
     """
     Calculate expected run margin that the away team wins by given spreads and odds.
+    Accepts scalars or equal-length arrays (one entry per game on the board); scalar
+    calls are cached since lines rarely move between polls.
 
     Parameters:
     - home_spread (float): Spread for home team (e.g. +2.5)
@@ -177,8 +1049,17 @@ def calculate_expected_margin(home_spread, away_spread, home_odds, away_odds, st
     - std_dev (float): Standard deviation of margin of victory (default 3)
 
     Returns:
-    - float: Expected margin of victory for away team
+    - float or ndarray: Expected margin of victory for away team
     """
+    values = (home_spread, away_spread, home_odds, away_odds, std_dev)
+    if any(np.ndim(value) for value in values):
+        return _expected_margins(*values)
+    # 0-d arrays are unhashable; numpy scalars become plain floats so they share cache entries
+    return _expected_margin_cached(*(value.item() if hasattr(value, 'item') else value for value in values))
+
+
+@lru_cache(maxsize=256)
+def _expected_margin_cached(home_spread, away_spread, home_odds, away_odds, std_dev):
     def american_to_prob(odds):
         if odds < 0:
             return -odds / (-odds + 100)
@@ -201,7 +1082,7 @@ def calculate_expected_margin(home_spread, away_spread, home_odds, away_odds, st
     prob_less_equal = 1 - prob_away_norm
 
     # Find z-score corresponding to that cumulative probability
-    z = stats.norm.ppf(prob_less_equal)
+    z = _norm_ppf(prob_less_equal)
 
     # Calculate expected mean margin (away team)
     if away_odds < home_odds:
@@ -212,6 +1093,17 @@ def calculate_expected_margin(home_spread, away_spread, home_odds, away_odds, st
     return mu
 
 
+def _expected_margins(home_spread, away_spread, home_odds, away_odds, std_dev):
+    """Vectorized calculate_expected_margin over arrays of games."""
+    home_odds = np.asarray(home_odds, dtype=np.float64)
+    away_odds = np.asarray(away_odds, dtype=np.float64)
+    away_spread = np.asarray(away_spread, dtype=np.float64)
+    prob_home = np.where(home_odds < 0, -home_odds, 100) / (np.abs(home_odds) + 100)
+    prob_away = np.where(away_odds < 0, -away_odds, 100) / (np.abs(away_odds) + 100)
+    z = _norm_ppf(1 - prob_away / (prob_home + prob_away))
+    return np.where(away_odds < home_odds, away_spread - z * std_dev, away_spread + z * std_dev)
+
+
 # # Example usage:
 # home_spread = +2.5
 # away_spread = -2.5
@@ -290,3 +1182,96 @@ def dynamic_kelly_fraction(
     # Cap at 1.0 and minimum of 0
     return max(0.0, min(base_fraction, 1.0))
 
+
+def _records_to_nested(records, key_fields, value_field):
+    """Rebuilds the read_* nested dict from parsed records, for comparing the two readers."""
+    data_dict = {}
+    for record in records.tolist():
+        row = dict(zip(records.dtype.names, record))
+        keys = []
+        for field in key_fields:
+            if field == 'bases':
+                keys.append(decode_bases(row['bases']))
+            elif field == 'count':
+                keys.append((row['balls'], row['strikes']))
+            else:
+                keys.append(row[field])
+        set_nested_dict(data_dict, keys, row[value_field])
+    return data_dict
+
+
+def benchmark_parsers(stats_path=STATS_PATH, leverage_path=LEVERAGE_PATH, runs_path=RUNS_PATH, repeat=3):
+    """
+    Times the line-by-line read_* functions against the vectorized parse_* functions
+    and checks that both produce identical values.
+
+    Returns:
+    - results (list): (name, old seconds, new seconds, parse stats, identical) per file
+    """
+    cases = [
+        ('stats', stats_path, read_stats_with_balls_strikes, parse_stats_with_balls_strikes,
+         ('inning', 'home_away', 'outs', 'bases', 'score_diff', 'count'), 'win'),
+        ('leverage', leverage_path, read_leverage_index, parse_leverage_index,
+         ('inning', 'home_away', 'outs', 'bases', 'score_diff'), 'leverage'),
+        ('runs', runs_path, read_runs_per_inning_balls_strikes_stats, parse_runs_per_inning_balls_strikes_stats,
+         ('outs', 'bases', 'count'), 'expected_runs'),
+    ]
+    results = []
+    for name, path, old_reader, new_reader, key_fields, value_field in cases:
+        old_times, new_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            old_dict = old_reader(path)
+            old_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            records, parse_stats = new_reader(path)
+            new_times.append(time.perf_counter() - start)
+        identical = _records_to_nested(records, key_fields, value_field) == old_dict
+        results.append((name, min(old_times), min(new_times), parse_stats, identical))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m getExpectedStats', description="Win-expectancy table tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compile_parser = commands.add_parser('compile', help="Compile the source tables into a binary artifact")
+    compile_parser.add_argument('--output', default=ARTIFACT_PATH)
+    compile_parser.add_argument('--stats', default=STATS_PATH)
+    compile_parser.add_argument('--leverage', default=LEVERAGE_PATH)
+    compile_parser.add_argument('--runs', default=RUNS_PATH)
+
+    bench_parser = commands.add_parser('bench-parsers', help="Compare the line-by-line and vectorized readers")
+    bench_parser.add_argument('--stats', default=STATS_PATH)
+    bench_parser.add_argument('--leverage', default=LEVERAGE_PATH)
+    bench_parser.add_argument('--runs', default=RUNS_PATH)
+    bench_parser.add_argument('--repeat', type=int, default=3)
+
+    compact_parser = commands.add_parser('compact', help="Fold completed-game deltas into the artifact")
+    compact_parser.add_argument('--artifact', default=ARTIFACT_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == 'compile':
+        start = time.perf_counter()
+        table = compile_tables(args.output, args.stats, args.leverage, args.runs)
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {args.output} ({table.nbytes() / 1e6:.1f} MB of arrays) in {elapsed:.2f}s")
+        start = time.perf_counter()
+        read_table_artifact(args.output)
+        print(f"Artifact maps in {(time.perf_counter() - start) * 1000:.2f} ms")
+    elif args.command == 'compact':
+        print(f"Compacted {compact_deltas(args.artifact)} delta records into {args.artifact}")
+    elif args.command == 'bench-parsers':
+        results = benchmark_parsers(args.stats, args.leverage, args.runs, args.repeat)
+        print(f"{'file':<10}{'rows':>8}{'rejected':>10}{'read_* ms':>12}{'parse_* ms':>12}{'speedup':>9}  identical")
+        for name, old_seconds, new_seconds, parse_stats, identical in results:
+            speedup = old_seconds / new_seconds if new_seconds else float('inf')
+            print(f"{name:<10}{parse_stats.rows_read:>8}{parse_stats.rows_rejected:>10}{old_seconds * 1000:>12.1f}"
+                  f"{new_seconds * 1000:>12.1f}{speedup:>8.1f}x  {identical}")
+        if not all(result[4] for result in results):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
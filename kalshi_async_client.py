@@ -0,0 +1,265 @@
+"""
+asyncio version of the Kalshi client, for use inside the FastAPI event loop.
+
+AsyncExchangeClient has the same methods as ExchangeClient (get_event,
+get_orderbook, create_order, get_positions, ...). Only the HTTP layer is
+replaced: get/post/delete are coroutines on a pooled httpx.AsyncClient, so every
+endpoint method returns an awaitable:
+
+    client = AsyncExchangeClient(api_base, key_id, private_key)
+    event = await client.get_event(event_ticker=ticker)
+
+Requests are signed by the same request_headers/sign_pss_text as the sync client.
+Deadlines (request_timing.request_deadline) and hedged reads work as in the
+sync client; a hedged read's losing request is cancelled.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from KalshiClientsBaseV2ApiKey import ExchangeClient, HttpError, KalshiClient, page_rows
+from fast_json import loads
+from rate_limiter import default_limiter, retry_after_seconds
+from request_timing import DeadlineExceeded, LatencyTracker, endpoint_key, remaining
+from response_cache import ResponseCache, cache_key
+
+
+class AsyncKalshiClient(KalshiClient):
+    """Authenticated Kalshi client whose requests never block the event loop."""
+    def __init__(
+        self,
+        host: str,
+        key_id: str,
+        private_key: rsa.RSAPrivateKey,
+        user_id: Optional[str] = None,
+        pool_size: int = 20,
+        max_retries: int = 3,
+        timeout: Optional[float] = 10,
+        rate_limiter=None,
+        cache_responses: bool = True,
+        hedge_reads: bool = False,
+    ):
+        """Requests share a keep-alive pool of up to pool_size connections; failed
+        connection attempts are retried up to max_retries times, and error responses,
+        429 included, are raised without a retry, as in KalshiClient. Requests wait for a
+        token from rate_limiter (by default the process-wide limiter, shared with
+        sync clients) with an asyncio sleep, so waiting never blocks the loop.
+        Cacheable reads are shared between concurrent tasks as in KalshiClient.
+        """
+        self.host = host
+        self.key_id = key_id
+        self.private_key = private_key
+        self.user_id = user_id
+        self.timeout = timeout
+        self.rate_limiter = default_limiter if rate_limiter is None else rate_limiter
+        # httpx ignores AsyncClient(limits=) when a transport is given; the pool belongs to the transport
+        self.session = httpx.AsyncClient(
+            timeout=timeout,
+            transport=httpx.AsyncHTTPTransport(
+                retries=max_retries,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            ),
+        )
+        self.request_count = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.in_flight = 0
+        self.response_cache = ResponseCache() if cache_responses else None
+        self.hedge_reads = hedge_reads
+        self.latency = LatencyTracker()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+        self.deadlines_exceeded = 0
+
+    async def rate_limit(self, method: str = "GET") -> None:
+        try:
+            await self.rate_limiter.acquire_async(method, timeout=remaining())
+        except DeadlineExceeded:
+            self.deadlines_exceeded += 1
+            raise
+
+    async def _bounded(self, request):
+        """Awaits request, cancelling it and raising DeadlineExceeded if the current deadline passes first."""
+        if remaining() is None:
+            return await request
+        try:
+            timeout = self.call_timeout()
+        except DeadlineExceeded:
+            request.close()
+            raise
+        try:
+            async with asyncio.timeout(timeout):
+                return await request
+        except TimeoutError as e:
+            if isinstance(e, DeadlineExceeded):
+                raise
+            self.deadlines_exceeded += 1
+            raise DeadlineExceeded("Request deadline exceeded") from e
+
+    async def _request(self, method: str, path: str, params: Dict[str, Any] = None, body: Optional[str] = None) -> Any:
+        await self.rate_limit(method)
+        if method == "GET" and self.hedge_reads:
+            return await self._hedged_get(path, params)
+        return await self._send(method, path, params, body)
+
+    async def _send(self, method: str, path: str, params: Dict[str, Any] = None, body: Optional[str] = None) -> Any:
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            response = await self.session.request(
+                # An empty params dict would make httpx drop the query string already in path
+                method, self.host + path, headers=self.request_headers(method, path), params=params or None,
+                content=body
+            )
+        finally:
+            self.in_flight -= 1
+            if method != "GET":
+                self.invalidate_cached(body)
+        if method == "GET":
+            self.latency.record(endpoint_key(path), time.monotonic() - started)
+        self.raise_if_bad_response(response)
+        return loads(response.content)
+
+    async def _hedged_get(self, path: str, params: Dict[str, Any]) -> Any:
+        """Sends a GET, and a second copy if the first is slower than the endpoint's p95.
+        The first answer wins and the other request is cancelled."""
+        delay = self.latency.hedge_delay(endpoint_key(path))
+        if delay is None:
+            return await self._send("GET", path, params)
+        first = asyncio.ensure_future(self._send("GET", path, params))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+            if not self.rate_limiter.try_acquire("GET"):
+                self.hedges_skipped += 1
+                return await first
+            self.hedges_fired += 1
+            tasks.append(asyncio.ensure_future(self._send("GET", path, params)))
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            winner = done.pop()
+            if winner.exception() is not None and pending:
+                # The other copy may still succeed
+                winner = pending.pop()
+                await asyncio.wait([winner])
+            if winner is not first:
+                self.hedges_won += 1
+            return winner.result()
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    task.exception()  # retrieved, so a failed loser is not logged
+                task.cancel()
+
+    async def post(self, path: str, body: dict) -> Any:
+        """POSTs to an authenticated Kalshi HTTP endpoint.
+        Returns the response body. Raises an HttpError on non-2XX results.
+        """
+        return await self._bounded(self._request("POST", path, body=body))
+
+    async def get(self, path: str, params: Dict[str, Any] = {}) -> Any:
+        """GETs from an authenticated Kalshi HTTP endpoint.
+        Returns the response body. Raises an HttpError on non-2XX results."""
+        ttl = self.response_cache.ttl_for(path) if self.response_cache is not None else None
+        if ttl is None:
+            return await self._bounded(self._request("GET", path, params=params))
+        # The shared fetch is shielded, so a caller's deadline only stops its own wait
+        return await self._bounded(self.response_cache.get_or_fetch_async(
+            cache_key(path, params), ttl, lambda: self._request("GET", path, params=params)
+        ))
+
+    async def delete(self, path: str, params: Dict[str, Any] = {}, body: Optional[str] = None) -> Any:
+        """DELETEs an authenticated Kalshi HTTP endpoint, with an optional JSON body.
+        Returns the response body. Raises an HttpError on non-2XX results."""
+        return await self._bounded(self._request("DELETE", path, params=params, body=body))
+
+    def raise_if_bad_response(self, response: httpx.Response) -> None:
+        self.request_count += 1
+        self.last_latency = response.elapsed.total_seconds()
+        self.total_latency += self.last_latency
+        if response.status_code == 429:
+            self.rate_limiter.record_server_throttle(response.request.method,
+                                                     retry_after_seconds(response.headers.get('Retry-After')))
+        if response.status_code not in range(200, 299):
+            raise HttpError(response.reason_phrase, response.status_code)
+
+    async def warm_up(self, path: str = "/exchange/status") -> bool:
+        """Opens a pooled connection ahead of the first real request.
+        Returns False if the request failed."""
+        try:
+            await self.get(path)
+            return True
+        except (httpx.HTTPError, HttpError):
+            return False
+
+    def connection_stats(self) -> Dict[str, Any]:
+        pool = getattr(getattr(self.session, "_transport", None), "_pool", None)
+        return {
+            "open_connections": len(pool.connections) if pool is not None else None,
+            "in_flight": self.in_flight,
+            "responses": self.request_count,
+            "mean_latency_ms": 1000 * self.total_latency / self.request_count if self.request_count else None,
+            "last_latency_ms": 1000 * self.last_latency if self.last_latency is not None else None,
+            "response_cache": self.response_cache.stats() if self.response_cache is not None else None,
+            **self.hedge_stats(),
+        }
+
+    async def close(self) -> None:
+        await self.session.aclose()
+
+
+class AsyncExchangeClient(ExchangeClient, AsyncKalshiClient):
+    """ExchangeClient whose endpoint methods return awaitables, and whose iter_*
+    methods return async generators (async for market in client.iter_markets())."""
+    def __init__(self,
+                    exchange_api_base: str,
+                    key_id: str,
+                    private_key: rsa.RSAPrivateKey,
+                    **session_options):
+        super().__init__(exchange_api_base, key_id, private_key, **session_options)
+
+    async def paginate(self,
+                    method: str,
+                    items_key: str,
+                    page_size: int = 100,
+                    max_items: Optional[int] = None,
+                    prefetch: bool = True,
+                    batches: Optional[str] = None,
+                    **filters):
+        """Async-generator version of ExchangeClient.paginate; the next page is
+        prefetched in a task while the caller works through the current one."""
+        fetch = getattr(self, method)
+        remaining = max_items
+        pending = None
+
+        async def request(cursor):
+            return await fetch(limit=page_size, cursor=cursor, **filters)
+
+        try:
+            page = await request(None)
+            while True:
+                cursor = page.get('cursor') or None
+                rows, count = page_rows(page, items_key, remaining, batches)
+                if remaining is not None:
+                    remaining -= count
+                more = cursor is not None and remaining != 0
+                if more and prefetch:
+                    pending = asyncio.ensure_future(request(cursor))
+                if count:
+                    if batches is None:
+                        for row in rows:
+                            yield row
+                    else:
+                        yield rows
+                if not more:
+                    break
+                page = await pending if pending is not None else await request(cursor)
+                pending = None
+        finally:
+            if pending is not None:
+                pending.cancel()
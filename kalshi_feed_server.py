@@ -0,0 +1,319 @@
+"""
+Local stand-in for Kalshi's market-data websocket, for testing and benchmarking
+kalshi_market_stream.MarketStream offline.
+
+The server random-walks an order book per market and speaks the subset of the
+trade-api/ws/v2 protocol MarketStream uses: subscribe/unsubscribe commands,
+'subscribed' acks, orderbook_snapshot and sequenced orderbook_delta messages,
+and ticker messages. It can skip sequence numbers and drop connections to
+exercise gap recovery and reconnects.
+
+Serve a feed:
+    python kalshi_feed_server.py --port 8765 --rate 200 --markets KXMLBGAME-25JUL04BOSNYY-NYY
+
+Benchmark MarketStream against it:
+    python kalshi_feed_server.py --benchmark 10 --rate 2000 --gap-every 500 --disconnect-after 5000
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import random
+import statistics
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from fast_json import dumps, loads
+from kalshi_market_stream import WS_PATH
+
+DEFAULT_MARKETS = ('KXMLBGAME-25JUL04BOSNYY-NYY', 'KXMLBGAME-25JUL04BOSNYY-BOS')
+BOOK_LEVELS = 5
+
+
+class SimulatedMarket:
+    """A bids-only Kalshi book (yes and no sides) moved by random size changes near the top."""
+
+    def __init__(self, ticker, rng, mid=50):
+        self.ticker = ticker
+        self.rng = rng
+        self.book = {
+            'yes': {price: rng.randint(1, 200) for price in range(mid - BOOK_LEVELS, mid)},
+            'no': {price: rng.randint(1, 200) for price in range(100 - mid - BOOK_LEVELS, 100 - mid)},
+        }
+        self.last_price = mid
+        self.volume = 0
+
+    def best(self, side):
+        return max(self.book[side]) if self.book[side] else 0
+
+    def step(self):
+        """Changes the size at one price level. Returns the delta message body."""
+        side = self.rng.choice(('yes', 'no'))
+        other = 'no' if side == 'yes' else 'yes'
+        best = self.best(side)
+        # Keep the book uncrossed: a yes bid at p and a no bid at q need p + q < 100
+        top = 99 - self.best(other)
+        price = min(max(self.rng.randint(best - BOOK_LEVELS + 1, best + 1), 1), top)
+        size = self.book[side].get(price, 0)
+        delta = self.rng.randint(-size, 100) or 1
+        if size + delta <= 0:
+            delta = -size
+            del self.book[side][price]
+            self.volume += size
+            self.last_price = price if side == 'yes' else 100 - price
+        else:
+            self.book[side][price] = size + delta
+        return {'market_ticker': self.ticker, 'price': price, 'delta': delta, 'side': side}
+
+    def snapshot(self):
+        return {'market_ticker': self.ticker,
+                'yes': sorted([price, size] for price, size in self.book['yes'].items()),
+                'no': sorted([price, size] for price, size in self.book['no'].items())}
+
+    def ticker_message(self):
+        no_best = self.best('no')
+        return {'market_ticker': self.ticker, 'price': self.last_price, 'yes_bid': self.best('yes'),
+                'yes_ask': 100 - no_best if no_best else 100, 'volume': self.volume,
+                'open_interest': self.volume // 2, 'ts': time.time()}
+
+
+class Subscription:
+    def __init__(self, sid, channel, tickers):
+        self.sid = sid
+        self.channel = channel
+        self.tickers = set(tickers)
+        self.seq = 0
+
+
+class FeedConnection:
+    """One client connection; messages go out through a queue so they are sent in the order they were made."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.subscriptions = {}
+        self.queue = asyncio.Queue()
+        self.sent = 0
+
+    def send(self, message):
+        self.queue.put_nowait(dumps(message))
+
+    async def writer(self, disconnect_after):
+        while True:
+            await self.connection.send(await self.queue.get())
+            self.sent += 1
+            if disconnect_after and self.sent >= disconnect_after:
+                await self.connection.close()
+                return
+
+
+class FeedServer:
+    """
+    Parameters:
+    - markets (list): Market tickers to simulate
+    - rate (float): Book updates per second, across all markets
+    - ticker_every (int): A ticker message is sent every this many book updates
+    - gap_every (int): Skip a sequence number every this many deltas per subscription (None: never)
+    - disconnect_after (int): Close each connection after this many messages (None: never)
+    - public_key (RSAPublicKey): When given, handshakes must carry a valid signature from its private key
+    - seed (int): Random seed
+    """
+
+    def __init__(self, markets=DEFAULT_MARKETS, rate=100.0, ticker_every=10, gap_every=None,
+                 disconnect_after=None, public_key=None, seed=None):
+        rng = random.Random(seed)
+        self.markets = {ticker: SimulatedMarket(ticker, rng) for ticker in markets}
+        self.rng = rng
+        self.rate = rate
+        self.ticker_every = ticker_every
+        self.gap_every = gap_every
+        self.disconnect_after = disconnect_after
+        self.public_key = public_key
+        self.connections = set()
+        self.updates = 0
+        self.gaps_injected = 0
+        self._sids = itertools.count(1)
+        self._server = None
+        self._publisher = None
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host='127.0.0.1', port=0):
+        self._server = await serve(self.handler, host, port, process_request=self.authenticate)
+        self._publisher = asyncio.create_task(self.publish())
+        return self
+
+    async def close(self):
+        self._publisher.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def authenticate(self, connection, request):
+        """Rejects handshakes without Kalshi auth headers, or with a bad signature when public_key is set."""
+        headers = request.headers
+        key, signature, timestamp = (headers.get('KALSHI-ACCESS-KEY'), headers.get('KALSHI-ACCESS-SIGNATURE'),
+                                     headers.get('KALSHI-ACCESS-TIMESTAMP'))
+        if not (key and signature and timestamp):
+            return connection.respond(401, 'Missing authentication headers\n')
+        if self.public_key is not None:
+            try:
+                self.public_key.verify(
+                    base64.b64decode(signature), (timestamp + 'GET' + WS_PATH).encode('utf-8'),
+                    padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.DIGEST_LENGTH),
+                    hashes.SHA256(),
+                )
+            except (InvalidSignature, ValueError):
+                return connection.respond(401, 'Invalid signature\n')
+        return None
+
+    async def handler(self, connection):
+        feed = FeedConnection(connection)
+        self.connections.add(feed)
+        writer = asyncio.create_task(feed.writer(self.disconnect_after))
+        try:
+            async for raw in connection:
+                self.command(feed, loads(raw))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(feed)
+            writer.cancel()
+
+    def command(self, feed, message):
+        params = message.get('params') or {}
+        if message.get('cmd') == 'subscribe':
+            tickers = [ticker for ticker in params.get('market_tickers') or () if ticker in self.markets]
+            for channel in params.get('channels') or ():
+                subscription = Subscription(next(self._sids), channel, tickers)
+                feed.subscriptions[subscription.sid] = subscription
+                feed.send({'id': message.get('id'), 'type': 'subscribed',
+                           'msg': {'channel': channel, 'sid': subscription.sid}})
+                if channel == 'orderbook_delta':
+                    for ticker in tickers:
+                        subscription.seq += 1
+                        feed.send({'type': 'orderbook_snapshot', 'sid': subscription.sid, 'seq': subscription.seq,
+                                   'msg': self.markets[ticker].snapshot()})
+        elif message.get('cmd') == 'unsubscribe':
+            for sid in params.get('sids') or ():
+                if feed.subscriptions.pop(sid, None) is not None:
+                    feed.send({'id': message.get('id'), 'type': 'unsubscribed', 'sid': sid})
+        else:
+            feed.send({'id': message.get('id'), 'type': 'error', 'msg': {'code': 1, 'msg': 'Unknown command'}})
+
+    def broadcast(self, channel, body):
+        for feed in list(self.connections):
+            for subscription in feed.subscriptions.values():
+                if subscription.channel != channel or body['market_ticker'] not in subscription.tickers:
+                    continue
+                message = {'type': channel, 'sid': subscription.sid, 'msg': body}
+                if channel == 'orderbook_delta':
+                    subscription.seq += 1
+                    if self.gap_every and subscription.seq % self.gap_every == 0:
+                        subscription.seq += 1
+                        self.gaps_injected += 1
+                    message['seq'] = subscription.seq
+                feed.send(message)
+
+    async def publish(self):
+        interval = 1 / self.rate
+        markets = list(self.markets.values())
+        next_at = time.monotonic()
+        while True:
+            if len(markets) != len(self.markets):
+                # Markets can be added while the feed runs (see mock_kalshi_exchange)
+                markets = list(self.markets.values())
+            if not markets:
+                next_at = time.monotonic() + interval
+                await asyncio.sleep(interval)
+                continue
+            market = self.rng.choice(markets)
+            self.broadcast('orderbook_delta', market.step())
+            self.updates += 1
+            if self.updates % self.ticker_every == 0:
+                self.broadcast('ticker', market.ticker_message())
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif self.updates % 100 == 0:
+                # Behind schedule: still let the connections write
+                await asyncio.sleep(0)
+
+
+async def benchmark(seconds, rate, gap_every, disconnect_after, markets):
+    """Runs a MarketStream against a local FeedServer and reports throughput, latency and recovery."""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from KalshiClientsBaseV2ApiKey import ExchangeClient
+    from kalshi_market_stream import MarketStream
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    server = await FeedServer(markets, rate=rate, gap_every=gap_every, disconnect_after=disconnect_after,
+                              public_key=private_key.public_key(), seed=1).start()
+    client = ExchangeClient(f'http://127.0.0.1:{server.port}/trade-api/v2', 'benchmark', private_key)
+    latencies = []
+
+    def on_update(ticker):
+        quote = stream.quotes[ticker]
+        if 'ts' in quote:
+            latencies.append(time.time() - quote.pop('ts'))
+
+    stream = MarketStream(client, markets, reconnect_delay=0.05, on_update=on_update)
+    stream.start()
+    started = time.monotonic()
+    await asyncio.sleep(seconds)
+    elapsed = time.monotonic() - started
+    # Stop publishing, let the stream drain, then compare its books with the server's
+    server._publisher.cancel()
+    await asyncio.sleep(0.2)
+    in_sync = [ticker for ticker in markets if stream.quote(ticker) is not None]
+    matching = sum(stream.books[ticker].snapshot() == {side: server.markets[ticker].snapshot()[side]
+                                                       for side in ('yes', 'no')} for ticker in in_sync)
+    await stream.stop()
+    await server.close()
+    client.close()
+
+    stats = stream.stats()
+    print(f"{stats['messages']} messages in {elapsed:.1f}s ({stats['messages'] / elapsed:,.0f}/s), "
+          f"{server.updates} book updates published")
+    if latencies:
+        latencies.sort()
+        print(f"ticker latency: median {1000 * statistics.median(latencies):.2f} ms, "
+              f"p99 {1000 * latencies[int(0.99 * (len(latencies) - 1))]:.2f} ms")
+    print(f"sequence gaps: {server.gaps_injected} injected, {stats['sequence_gaps']} detected; "
+          f"reconnects: {stats['reconnects']}")
+    print(f"books in sync and matching the server: {matching}/{len(markets)}")
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument('--host', default='127.0.0.1')
+    arguments.add_argument('--port', type=int, default=8765)
+    arguments.add_argument('--markets', nargs='+', default=list(DEFAULT_MARKETS))
+    arguments.add_argument('--rate', type=float, default=100.0, help='book updates per second')
+    arguments.add_argument('--gap-every', type=int, default=None, help='skip a sequence number every N deltas')
+    arguments.add_argument('--disconnect-after', type=int, default=None,
+                           help='close each connection after N messages')
+    arguments.add_argument('--benchmark', type=float, default=None, metavar='SECONDS',
+                           help='run a MarketStream against the server for SECONDS and report')
+    args = arguments.parse_args()
+    if args.benchmark:
+        asyncio.run(benchmark(args.benchmark, args.rate, args.gap_every, args.disconnect_after, args.markets))
+        return
+
+    async def serve_forever():
+        server = await FeedServer(args.markets, rate=args.rate, gap_every=args.gap_every,
+                                  disconnect_after=args.disconnect_after).start(args.host, args.port)
+        print(f"Serving ws://{args.host}:{server.port}{WS_PATH}")
+        await asyncio.Future()
+
+    asyncio.run(serve_forever())
+
+
+if __name__ == '__main__':
+    main()
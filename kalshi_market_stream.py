@@ -0,0 +1,275 @@
+"""
+Streaming Kalshi market data over the trade-api websocket.
+
+MarketStream runs alongside an ExchangeClient (sync or async) and reuses its key
+and RSA-PSS signing. It subscribes to the ticker and orderbook_delta channels for
+a set of markets and keeps, per market, the latest quote in the same shape as the
+markets returned by get_event (ticker, yes_bid, yes_ask, no_bid, no_ask,
+last_price, in cents), so callers can use either source:
+
+    stream = MarketStream(client, [home_ticker, away_ticker])
+    stream.start()
+    quote = stream.quote(home_ticker)  # None until the stream is connected and in sync
+
+Order-book channels carry a sequence number per subscription. When a number is
+skipped, the books of that subscription are dropped and the channel is
+resubscribed for a fresh snapshot. Dropped connections are reopened with
+exponential backoff, and every channel is subscribed again.
+
+kalshi_feed_server.py is a local stand-in for the feed, for tests and benchmarks.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from datetime import datetime
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+from fast_json import DecodeError, dumps, loads
+from order_book import OrderBook
+
+WS_PATH = '/trade-api/ws/v2'
+CHANNELS = ('ticker', 'orderbook_delta')
+# Channels whose messages carry a per-subscription sequence number
+SEQUENCED_CHANNELS = frozenset({'orderbook_delta'})
+
+
+def ws_url_for(api_base):
+    """Websocket URL for a REST base URL, e.g. https://host/trade-api/v2 -> wss://host/trade-api/ws/v2."""
+    scheme, rest = api_base.split('://', 1)
+    host = rest.split('/', 1)[0]
+    return ('wss' if scheme == 'https' else 'ws') + '://' + host + WS_PATH
+
+
+def auth_headers(client):
+    """Signed handshake headers for the websocket, made with a Kalshi client's key."""
+    timestamp = str(int(datetime.now().timestamp() * 1000))
+    return {
+        'KALSHI-ACCESS-KEY': client.key_id,
+        'KALSHI-ACCESS-SIGNATURE': client.sign_pss_text(timestamp + 'GET' + WS_PATH),
+        'KALSHI-ACCESS-TIMESTAMP': timestamp,
+    }
+
+
+class MarketStream:
+    """
+    Parameters:
+    - client (KalshiClient): Client whose key_id and sign_pss_text authenticate the connection
+    - market_tickers (list): Markets to subscribe to
+    - channels (tuple): Channels to subscribe to, ticker and/or orderbook_delta
+    - ws_url (str): Feed URL (default: derived from client.host)
+    - reconnect_delay (float): First reconnect delay in seconds, doubled after each failure
+    - max_reconnect_delay (float): Longest reconnect delay in seconds
+    - on_update (callable): Called with the ticker of every market whose quote changes
+    """
+
+    def __init__(self, client, market_tickers, channels=CHANNELS, ws_url=None, reconnect_delay=0.5,
+                 max_reconnect_delay=30.0, on_update=None):
+        self.client = client
+        self.market_tickers = list(market_tickers)
+        self.channels = tuple(channels)
+        self.ws_url = ws_url or ws_url_for(client.host)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_update = on_update
+        self.quotes = {}
+        self.books = {}  # ticker -> OrderBook
+        self.connected = False
+        self.messages = 0
+        self.reconnects = 0
+        self.gaps = 0
+        self.last_message_at = None
+        self._ids = itertools.count(1)
+        self._pending = {}    # command id -> channel
+        self._sids = {}       # sid -> channel
+        self._seq = {}        # sid -> last sequence number
+        self._synced = set()  # tickers whose book matches the feed
+        self._resubscribe_needed = set()
+        self._connection = None
+        self._task = None
+        # Set and replaced on every quote change, waking wait_for_update callers
+        self._changed = asyncio.Event()
+
+    def start(self):
+        """Runs the stream in a task on the current event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        """Connects, subscribes and applies messages until cancelled, reconnecting on failure."""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with connect(self.ws_url, additional_headers=auth_headers(self.client)) as connection:
+                    self._connection = connection
+                    self.connected = True
+                    for channel in self.channels:
+                        await self._subscribe(channel)
+                    async for raw in connection:
+                        self._handle(loads(raw))
+                        delay = self.reconnect_delay
+                        if self._resubscribe_needed:
+                            await self._resubscribe()
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionClosed, InvalidHandshake, OSError, asyncio.TimeoutError, *DecodeError) as e:
+                logging.warning(f"Market stream disconnected: {e}")
+            except Exception:
+                # E.g. a message of an unexpected shape; a dead stream would leave quotes frozen
+                logging.exception("Market stream failed, reconnecting")
+            finally:
+                self._reset()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self.max_reconnect_delay)
+
+    def _reset(self):
+        self._connection = None
+        self.connected = False
+        self._pending.clear()
+        self._sids.clear()
+        self._seq.clear()
+        self._synced.clear()
+        self._resubscribe_needed = set()
+
+    async def _subscribe(self, channel):
+        command_id = next(self._ids)
+        self._pending[command_id] = channel
+        await self._connection.send(dumps({
+            'id': command_id, 'cmd': 'subscribe',
+            'params': {'channels': [channel], 'market_tickers': self.market_tickers},
+        }))
+
+    async def _resubscribe(self):
+        """Replaces subscriptions that skipped a sequence number, which brings a fresh snapshot."""
+        sids, self._resubscribe_needed = self._resubscribe_needed, set()
+        for sid in sids:
+            channel = self._sids.pop(sid, None)
+            self._seq.pop(sid, None)
+            await self._connection.send(dumps({'id': next(self._ids), 'cmd': 'unsubscribe',
+                                                    'params': {'sids': [sid]}}))
+            if channel is not None:
+                await self._subscribe(channel)
+
+    def _handle(self, message):
+        self.messages += 1
+        self.last_message_at = time.monotonic()
+        kind = message.get('type')
+        body = message.get('msg') or {}
+        sid = message.get('sid')
+        if kind == 'subscribed':
+            self._sids[body.get('sid', sid)] = self._pending.pop(message.get('id'), body.get('channel'))
+            return
+        if kind == 'error':
+            logging.error(f"Market stream error: {body}")
+            return
+        if sid not in self._sids:
+            # A subscription replaced after a gap, whose messages may still be in flight
+            return
+        if 'seq' in message and not self._in_sequence(sid, message['seq'], kind == 'orderbook_snapshot'):
+            return
+        ticker = body.get('market_ticker')
+        if kind == 'ticker':
+            self._apply_ticker(ticker, body)
+        elif kind == 'orderbook_snapshot':
+            self.books[ticker] = OrderBook.from_snapshot(ticker, body)
+            self._synced.add(ticker)
+            self._apply_book(ticker)
+        elif kind == 'orderbook_delta' and ticker in self._synced:
+            self.books[ticker].apply_delta(body['side'], body['price'], body['delta'])
+            self._apply_book(ticker)
+
+    def _in_sequence(self, sid, seq, snapshot):
+        """Checks a message's sequence number; on a gap, drops the subscription's books and queues a resubscribe."""
+        last = self._seq.get(sid)
+        if snapshot or last is None or seq == last + 1:
+            self._seq[sid] = seq
+            return True
+        if sid in self._resubscribe_needed:
+            return False
+        self.gaps += 1
+        logging.warning(f"Market stream sequence gap on sid {sid}: {last} -> {seq}, resubscribing")
+        if self._sids.get(sid) in SEQUENCED_CHANNELS:
+            self._synced.clear()
+        self._resubscribe_needed.add(sid)
+        return False
+
+    def _apply_ticker(self, ticker, body):
+        quote = self.quotes.setdefault(ticker, {'ticker': ticker})
+        if 'price' in body:
+            quote['last_price'] = body['price']
+        for key in ('volume', 'open_interest'):
+            if key in body:
+                quote[key] = body[key]
+        # The book, when subscribed and in sync, is the more current source of bids and asks
+        if ticker not in self._synced:
+            if body.get('yes_bid') is not None:
+                quote['yes_bid'] = body['yes_bid']
+                quote['no_ask'] = 100 - body['yes_bid']
+            if body.get('yes_ask') is not None:
+                quote['yes_ask'] = body['yes_ask']
+                quote['no_bid'] = 100 - body['yes_ask']
+        self._updated(ticker, body.get('ts'))
+
+    def _apply_book(self, ticker):
+        self.quotes.setdefault(ticker, {'ticker': ticker}).update(self.books[ticker].quote())
+        self._updated(ticker, None)
+
+    def _updated(self, ticker, ts):
+        quote = self.quotes[ticker]
+        quote['updated'] = time.monotonic()
+        if ts is not None:
+            quote['ts'] = ts
+        if self.on_update is not None:
+            self.on_update(ticker)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def quote(self, ticker):
+        """Latest quote for a market, or None when the stream is down, out of sync, or has no bid/ask yet."""
+        if not self.connected:
+            return None
+        if 'orderbook_delta' in self.channels and ticker not in self._synced:
+            return None
+        quote = self.quotes.get(ticker)
+        if quote is None or quote.get('yes_bid') is None or quote.get('yes_ask') is None:
+            return None
+        return dict(quote)
+
+    def book(self, ticker):
+        """A copy of a market's order book, or None unless the stream is connected and the book in sync."""
+        if not self.connected or ticker not in self._synced:
+            return None
+        return self.books[ticker].copy()
+
+    async def wait_for_update(self, timeout=None):
+        """Waits until any quote changes. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self):
+        return {
+            'connected': self.connected,
+            'markets': len(self.market_tickers),
+            'messages': self.messages,
+            'reconnects': self.reconnects,
+            'sequence_gaps': self.gaps,
+            'synced_books': len(self._synced),
+            'seconds_since_message': (time.monotonic() - self.last_message_at
+                                      if self.last_message_at is not None else None),
+        }
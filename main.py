@@ -1,17 +1,27 @@
 from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from KalshiClientsBaseV2ApiKey import ExchangeClient
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
+from KalshiClientsBaseV2ApiKey import load_private_key
+from kalshi_async_client import AsyncExchangeClient
+from kalshi_market_stream import MarketStream
+from order_gateway import OrderGateway
+from fast_json import receive_json, send_json
+from rate_limiter import BACKGROUND, request_priority
 import asyncio
+import os
 import logging
+import uuid
 
 app = FastAPI()
 HOME_TEAM = "NON"
 AWAY_TEAM = "NON"
 EVENT_TICKER = "N/A"
+# Point at a mock exchange (mock_kalshi_exchange.py) with e.g. KALSHI_API_BASE=http://127.0.0.1:8001/trade-api/v2
+KALSHI_API_BASE = os.environ.get("KALSHI_API_BASE", "https://api.elections.kalshi.com/trade-api/v2")
 EXCHANGE_CLIENT = None
+MARKET_STREAM = None
+ORDER_GATEWAY = None
+QUOTE_PUSH_INTERVAL = 0.25  # Shortest time between streamed quote pushes to a /ws client
 
 app.add_middleware(
     CORSMiddleware,
@@ -45,64 +55,71 @@ async def select_teams(selection: TeamSelection):
     HOME_TEAM = selection.home
     AWAY_TEAM = selection.away
     logging.info(f"Teams selected: Home={HOME_TEAM}, Away={AWAY_TEAM}")
-    configureKal()
-    set_contracts()
+    await configureKal()
+    await set_contracts()
     return {"success": True}
 
 def load_private_key_from_file(file_path):
-    with open(file_path, "rb") as key_file:
-        private_key = serialization.load_pem_private_key(
-            key_file.read(),
-            password=None,
-            backend=default_backend()
-        )
-    return private_key
+    # Parsed once and cached until the key file changes
+    return load_private_key(file_path)
 
-def set_contracts():
-    global user_contracts, ticker_market, EXCHANGE_CLIENT
-
-    positions_params = {'limit': None,
-                        'cursor': None,
-                        'settlement_status': None,
-                        'ticker': ticker_market["home"],
-                        'event_ticker': None}
-
-    current_position = EXCHANGE_CLIENT.get_positions(**positions_params)
-    if len(current_position['market_positions']) > 0:
-        current_position = current_position['market_positions'][0]['position']
-    else:
-        current_position = 0
-    user_contracts["home"] = current_position
+async def get_exchange_client(api_base, key_id, key_path):
+    """Returns the shared AsyncExchangeClient, creating and warming it up only when the credentials change."""
+    global EXCHANGE_CLIENT
+    private_key = load_private_key_from_file(key_path)
+    client = EXCHANGE_CLIENT
+    if client is None or client.host != api_base or client.key_id != key_id or client.private_key is not private_key:
+        if client is not None:
+            await client.close()
+        client = AsyncExchangeClient(exchange_api_base=api_base, key_id=key_id, private_key=private_key,
+                                     hedge_reads=True)
+        if not await client.warm_up():
+            logging.error("Kalshi connection warm-up failed")
+        EXCHANGE_CLIENT = client
+    return client
 
-    positions_params = {'limit': None,
-                        'cursor': None,
-                        'settlement_status': None,
-                        'ticker': ticker_market["away"],
-                        'event_ticker': None}
+async def set_contracts():
+    global user_contracts, ticker_market, EXCHANGE_CLIENT
 
-    current_position = EXCHANGE_CLIENT.get_positions(**positions_params)
-    if len(current_position['market_positions']) > 0:
-        current_position = current_position['market_positions'][0]['position']
-    else:
-        current_position = 0
-    user_contracts["away"] = current_position
+    # Every page of the event's positions, not just the first row
+    positions = {}
+    async for market_position in EXCHANGE_CLIENT.iter_positions(event_ticker=EVENT_TICKER):
+        positions[market_position['ticker']] = market_position['position']
+    for team in ("home", "away"):
+        user_contracts[team] = positions.get(ticker_market[team], 0)
     print(f"User contracts set: {user_contracts}")
 
 
-def configureKal():
+async def configureKal():
     global EVENT_TICKER, EXCHANGE_CLIENT, AWAY_TEAM, HOME_TEAM, ticker_market 
     prod_key_id = "a1539644-fcd6-411e-ae45-b7ecfbb3ad0c"  # change if needed
-    prod_private_key = load_private_key_from_file('kalshi-key.key')
-    prod_api_base = "https://api.elections.kalshi.com/trade-api/v2"
-    EXCHANGE_CLIENT = ExchangeClient(
-        exchange_api_base=prod_api_base,
-        key_id=prod_key_id,
-        private_key=prod_private_key
-    )
+    EXCHANGE_CLIENT = await get_exchange_client(KALSHI_API_BASE, prod_key_id, 'kalshi-key.key')
     EVENT_TICKER = makeEventTicker()
     ticker_market["home"] = f"{EVENT_TICKER}-{HOME_TEAM}"
     ticker_market["away"] = f"{EVENT_TICKER}-{AWAY_TEAM}"
     logging.info(f"Configured Kalshi for event: {EVENT_TICKER}", ticker_market["home"],ticker_market["away"])
+    await start_market_stream([ticker_market["home"], ticker_market["away"]])
+
+async def start_market_stream(tickers):
+    """Replaces the market-data stream with one for the given markets."""
+    global MARKET_STREAM
+    if MARKET_STREAM is not None:
+        await MARKET_STREAM.stop()
+    MARKET_STREAM = MarketStream(EXCHANGE_CLIENT, tickers)
+    MARKET_STREAM.start()
+
+def streamed_quotes():
+    """Home and away quotes from the market stream, or None while it is down or out of sync."""
+    if MARKET_STREAM is None:
+        return None
+    home = MARKET_STREAM.quote(ticker_market["home"])
+    away = MARKET_STREAM.quote(ticker_market["away"])
+    if home is None or away is None:
+        return None
+    return {
+        "home": {"yes_ask": home["yes_ask"], "yes_bid": home["yes_bid"]},
+        "away": {"yes_ask": away["yes_ask"], "yes_bid": away["yes_bid"]},
+    }
 
 from datetime import datetime
 
@@ -123,25 +140,37 @@ async def websocket_endpoint(websocket: WebSocket):
             # Only send data if teams are selected and EXCHANGE_CLIENT is configured
             if EXCHANGE_CLIENT and EVENT_TICKER != "N/A":
                 try:
-                    event_params = {'event_ticker': EVENT_TICKER}
-                    event_response = EXCHANGE_CLIENT.get_event(**event_params)
-                    # Send only the first market's no_bid and yes_bid for simplicity
-                    if event_response and "markets" in event_response and len(event_response["markets"]) > 0:
-                        market = event_response["markets"]
-                        data = {
-                            "home" :{
-                            "yes_ask": market[0].get("yes_ask"),
-                            "yes_bid": market[0].get("yes_bid")
-                            },
-                            "away" :{
-                            "yes_ask": market[1].get("yes_ask"),
-                            "yes_bid": market[1].get("yes_bid")
-                            }   
-                        }
-                        await websocket.send_json(data)
+                    data = streamed_quotes()
+                    if data is None:
+                        event_params = {'event_ticker': EVENT_TICKER}
+                        # Routine polling; queued behind orders and other reads
+                        with request_priority(BACKGROUND):
+                            event_response = await EXCHANGE_CLIENT.get_event(**event_params)
+                        # Send only the first market's no_bid and yes_bid for simplicity
+                        if event_response and "markets" in event_response and len(event_response["markets"]) > 0:
+                            market = event_response["markets"]
+                            data = {
+                                "home" :{
+                                "yes_ask": market[0].get("yes_ask"),
+                                "yes_bid": market[0].get("yes_bid")
+                                },
+                                "away" :{
+                                "yes_ask": market[1].get("yes_ask"),
+                                "yes_bid": market[1].get("yes_bid")
+                                }   
+                            }
+                    if data is not None:
+                        await send_json(websocket, data)
+                except WebSocketDisconnect:
+                    raise
                 except Exception as e:
                     logging.error(f"Error fetching or sending market data: {e}")
-            await asyncio.sleep(30)  # Send update every 2 seconds
+            if MARKET_STREAM is not None and MARKET_STREAM.connected:
+                # Streamed quotes are pushed as they change, at most every QUOTE_PUSH_INTERVAL
+                await asyncio.sleep(QUOTE_PUSH_INTERVAL)
+                await MARKET_STREAM.wait_for_update(timeout=30)
+            else:
+                await asyncio.sleep(30)  # Send update every 2 seconds
     except Exception as e:
         logging.error(f"WebSocket connection closed or error occurred: {e}")
 # ...existing imports and code...
@@ -157,153 +186,86 @@ ticker_market = {
     "away": ""
 }
 
+def get_order_gateway():
+    """The order gateway for the current exchange client."""
+    global ORDER_GATEWAY
+    if ORDER_GATEWAY is None or ORDER_GATEWAY.client is not EXCHANGE_CLIENT:
+        ORDER_GATEWAY = OrderGateway(EXCHANGE_CLIENT)
+    return ORDER_GATEWAY
+
+def market_order(team, action, count):
+    """create_order arguments for a market order on a team's yes side."""
+    return {
+        "ticker": ticker_market[team],
+        # Kalshi rejects a client_order_id it has seen before
+        "client_order_id": f"frontend-{team}-{action}-{uuid.uuid4().hex[:12]}",
+        "type": "market",
+        "action": action,
+        "side": "yes",
+        "count": count,
+        "yes_price": None,
+        "no_price": None,
+        "expiration_ts": None,
+        "sell_position_floor": None,
+        "buy_max_cost": None
+    }
+
+async def flatten_and_flip(sell_team, buy_team, count):
+    """Sells every contract held on sell_team and buys count on buy_team, in one batched request."""
+    held = user_contracts[sell_team]
+    orders = [market_order(sell_team, "sell", held)] if held > 0 else []
+    orders.append(market_order(buy_team, "buy", count))
+    results = await get_order_gateway().submit_many(orders)
+    if held > 0 and not isinstance(results[0], Exception):
+        user_contracts[sell_team] = 0
+    errors = [str(result) for result in results if isinstance(result, Exception)]
+    if isinstance(results[-1], Exception):
+        return {"success": False, "error": "; ".join(errors)}
+    user_contracts[buy_team] += count
+    result = {"success": True, "action": f"buy_{buy_team}", "order_result": results[-1]}
+    if errors:
+        result["sell_error"] = errors[0]
+    return result
+
+async def flatten(team):
+    """Sells every contract held on a team."""
+    count = user_contracts[team]
+    if count <= 0:
+        return {"success": False, "error": f"No {team} contracts to sell."}
+    order_result = await get_order_gateway().submit(market_order(team, "sell", count))
+    user_contracts[team] = 0
+    return {"success": True, "action": f"sell_{team}", "order_result": order_result}
+
 @app.websocket("/action")
 async def websocket_action(websocket: WebSocket):
     await websocket.accept()
     try:
         while True:
-            data = await websocket.receive_json()
+            data = await receive_json(websocket)
             button = data.get("button")
             contracts = data.get("count")
             print(f"Received action: {data}")
             print(contracts)
             # Button actions
-            if button == 1:
-                # Buy 1 contract on home team (yes side)
-                try:
-                    count = user_contracts["away"]
-                    if count > 0:
-                        order_params = {
-                            "ticker": ticker_market["away"],
-                            "client_order_id": "frontend-away-sell",
-                            "type": "market",
-                            "action": "sell",
-                            "side": "yes",
-                            "count": count,
-                            "yes_price": None,
-                            "no_price": None,
-                            "expiration_ts": None,
-                            "sell_position_floor": None,
-                            "buy_max_cost": None
-                        }
-                        order_result = EXCHANGE_CLIENT.create_order(**order_params)
-                        user_contracts["away"] = 0
-                        result = {"success": True, "action": "sell_away", "order_result": order_result}
-                    else:
-                        result = {"success": False, "error": "No away contracts to sell."}
-                    order_params = {
-                        "ticker": ticker_market["home"],
-                        "client_order_id": "frontend-home-buy",
-                        "type": "market",
-                        "action": "buy",
-                        "side": "yes",
-                        "count": contracts,
-                        "yes_price": None,
-                        "no_price": None,
-                        "expiration_ts": None,
-                        "sell_position_floor": None,
-                        "buy_max_cost": None
-                    }
-                    order_result = EXCHANGE_CLIENT.create_order(**order_params)
-                    result = {"success": True, "action": "buy_home", "order_result": order_result}
-                    user_contracts["home"] += contracts
-                except Exception as e:
-                    result = {"success": False, "error": str(e)}
-            elif button == 2:
-                # Sell all contracts of home team (yes side)
-                try:
-                    count = user_contracts["home"]
-                    if count > 0:
-                        order_params = {
-                            "ticker": ticker_market["home"],
-                            "client_order_id": "frontend-home-sell",
-                            "type": "market",
-                            "action": "sell",
-                            "side": "yes",
-                            "count": count,
-                            "yes_price": None,
-                            "no_price": None,
-                            "expiration_ts": None,
-                            "sell_position_floor": None,
-                            "buy_max_cost": None
-                        }
-                        order_result = EXCHANGE_CLIENT.create_order(**order_params)
-                        user_contracts["home"] = 0
-                        result = {"success": True, "action": "sell_home", "order_result": order_result}
-                    else:
-                        result = {"success": False, "error": "No home contracts to sell."}
-                except Exception as e:
-                    result = {"success": False, "error": str(e)}
-            elif button == 3:
-                # Buy 1 contract on away team (yes side)
-                try:
-                    count = user_contracts["home"]
-                    if count > 0:
-                        order_params = {
-                            "ticker": ticker_market["home"],
-                            "client_order_id": "frontend-home-sell",
-                            "type": "market",
-                            "action": "sell",
-                            "side": "yes",
-                            "count": count,
-                            "yes_price": None,
-                            "no_price": None,
-                            "expiration_ts": None,
-                            "sell_position_floor": None,
-                            "buy_max_cost": None
-                        }
-                        order_result = EXCHANGE_CLIENT.create_order(**order_params)
-                        user_contracts["home"] = 0
-                        result = {"success": True, "action": "sell_home", "order_result": order_result}
-                    else:
-                        result = {"success": False, "error": "No home contracts to sell."}
-                    order_params = {
-                        "ticker": ticker_market["away"],
-                        "client_order_id": "frontend-away-buy",
-                        "type": "market",
-                        "action": "buy",
-                        "side": "yes",
-                        "count": contracts,
-                        "yes_price": None,
-                        "no_price": None,
-                        "expiration_ts": None,
-                        "sell_position_floor": None,
-                        "buy_max_cost": None
-                    }
-                    order_result = EXCHANGE_CLIENT.create_order(**order_params)
-                    result = {"success": True, "action": "buy_away", "order_result": order_result}
-                    user_contracts["away"] += contracts
-                except Exception as e:
-                    result = {"success": False, "error": str(e)}
-            elif button == 4:
-                # Sell all contracts of away team (yes side)
-                try:
-                    count = user_contracts["away"]
-                    if count > 0:
-                        order_params = {
-                            "ticker": ticker_market["away"],
-                            "client_order_id": "frontend-away-sell",
-                            "type": "market",
-                            "action": "sell",
-                            "side": "yes",
-                            "count": count,
-                            "yes_price": None,
-                            "no_price": None,
-                            "expiration_ts": None,
-                            "sell_position_floor": None,
-                            "buy_max_cost": None
-                        }
-                        order_result = EXCHANGE_CLIENT.create_order(**order_params)
-                        user_contracts["away"] = 0
-                        result = {"success": True, "action": "sell_away", "order_result": order_result}
-                    else:
-                        result = {"success": False, "error": "No away contracts to sell."}
-                except Exception as e:
-                    result = {"success": False, "error": str(e)}
-            else:
-                result = {"success": False, "error": "Invalid button value."}
+            try:
+                if button == 1:
+                    # Sell all away contracts and buy home (yes side), in one round-trip
+                    result = await flatten_and_flip("away", "home", contracts)
+                elif button == 2:
+                    # Sell all contracts of home team (yes side)
+                    result = await flatten("home")
+                elif button == 3:
+                    # Sell all home contracts and buy away (yes side), in one round-trip
+                    result = await flatten_and_flip("home", "away", contracts)
+                elif button == 4:
+                    # Sell all contracts of away team (yes side)
+                    result = await flatten("away")
+                else:
+                    result = {"success": False, "error": "Invalid button value."}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
 
-            await websocket.send_json(result)
+            await send_json(websocket, result)
     except WebSocketDisconnect:
         pass
     except Exception as e:
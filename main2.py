@@ -1,16 +1,29 @@
 from draftkings_mlb_data import fetch_draftkings_mlb_html_data
-from getExpectedStats import calculate_expected_margin, read_stats_with_balls_strikes, read_runs_per_inning_balls_strikes_stats, kelly_criterion, dynamic_kelly_fraction, read_leverage_index, build_combined_dict
-from fastapi import FastAPI, WebSocket, HTTPException
+from getExpectedStats import calculate_expected_margin, read_stats_with_balls_strikes, read_runs_per_inning_balls_strikes_stats, read_leverage_index, encode_bases, valid_states, FALLBACK_DEFAULT_WIN
+from shared_tables import load_table, open_channel
+from table_registry import TableRegistry
+from game_simulator import GameSimulator
+from decision_surface import DecisionSurface
+from speculative_decisions import DecisionCache, decide, speculate, top_of_book
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import logging
 import asyncio
+import hmac
+import os
+import threading
 from contextlib import asynccontextmanager
 
-from KalshiClientsBaseV2ApiKey import ExchangeClient
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.backends import default_backend
-import json
+from KalshiClientsBaseV2ApiKey import load_private_key
+from kalshi_async_client import AsyncExchangeClient
+from kalshi_market_stream import MarketStream
+from order_book import OrderBook
+from order_gateway import OrderGateway
+from fast_json import loads
+from rate_limiter import BACKGROUND, default_limiter, request_priority
+from request_timing import request_deadline
+import time
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -21,14 +34,37 @@ async def lifespan(app: FastAPI):
         await task
     except asyncio.CancelledError:
         pass
+    if MARKET_STREAM is not None:
+        await MARKET_STREAM.stop()
+    if EXCHANGE_CLIENT is not None:
+        await EXCHANGE_CLIENT.close()
 
 app = FastAPI(lifespan=lifespan)
 HOME_TEAM = "NON"  # Replace with actual home team
 AWAY_TEAM = "NON"  # Replace with actual away team
 # Allow frontend to call backend
 EVENT_TICKER = "N/A"
+# Point at a mock exchange (mock_kalshi_exchange.py) with e.g. KALSHI_API_BASE=http://127.0.0.1:8001/trade-api/v2
+KALSHI_API_BASE = os.environ.get("KALSHI_API_BASE", "https://api.elections.kalshi.com/trade-api/v2")
 EXCHANGE_CLIENT = None
-data_dict = build_combined_dict()
+MARKET_STREAM = None
+ORDER_GATEWAY = None
+QUOTE_TICKER = None  # The event's first market, whose quote drives decisions
+MARKET_DATA_DEADLINE = 1.0  # Seconds a decision waits on a REST quote before giving up on it
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")  # Bearer token for /admin/reload-tables; unset disables it
+shared_channel = open_channel()
+table_registry = TableRegistry(load_table(shared_channel), channel=shared_channel)
+simulator = GameSimulator.from_file()
+# The speculative worker thread gets its own simulator; random generators are not thread-safe
+speculative_simulator = GameSimulator(simulator.distributions, simulator.ghost_runner)
+simulator_lock = threading.Lock()
+decision_cache = DecisionCache()
+decision_surface = None
+surface_lock = threading.Lock()
+speculation_task = None
+SIMULATION_PATHS = 2000
+SUBMIT_ORDERS = False  # Orders are only logged unless this is enabled
+MODEL_CONFIDENCE = .25  # Scaled down further when the simulation disagrees with the table
 balance = 100  # Initial balance
 yes_contracts = 0
 no_contracts = 0
@@ -107,33 +143,65 @@ async def select_teams(selection: TeamSelection):
     AWAY_TEAM = selection.away
     logging.info(f"Teams selected: Home={HOME_TEAM}, Away={AWAY_TEAM}")
     print(f"Received teams: Home={HOME_TEAM}, Away={AWAY_TEAM}")
-    configureKal()
+    await configureKal()
     return {"success": True}
 
 def load_private_key_from_file(file_path):
-    with open(file_path, "rb") as key_file:
-        private_key = serialization.load_pem_private_key(
-            key_file.read(),
-            password=None,
-            backend=default_backend()
-        )
-    return private_key
-
-def configureKal():
+    # Parsed once and cached until the key file changes
+    return load_private_key(file_path)
+
+async def get_exchange_client(api_base, key_id, key_path):
+    """Returns the shared AsyncExchangeClient, creating and warming it up only when the credentials change."""
+    global EXCHANGE_CLIENT
+    private_key = load_private_key_from_file(key_path)
+    client = EXCHANGE_CLIENT
+    if client is None or client.host != api_base or client.key_id != key_id or client.private_key is not private_key:
+        if client is not None:
+            await client.close()
+        client = AsyncExchangeClient(exchange_api_base=api_base, key_id=key_id, private_key=private_key,
+                                     hedge_reads=True)
+        if not await client.warm_up():
+            logging.error("Kalshi connection warm-up failed")
+        EXCHANGE_CLIENT = client
+    return client
+
+async def configureKal():
     global EVENT_TICKER, EXCHANGE_CLIENT
     prod_key_id = "a1539644-fcd6-411e-ae45-b7ecfbb3ad0c"  # change if needed
-    prod_private_key = load_private_key_from_file('kalshi-key.key')
-    prod_api_base = "https://api.elections.kalshi.com/trade-api/v2"
-    EXCHANGE_CLIENT = ExchangeClient(
-    exchange_api_base=prod_api_base,
-    key_id=prod_key_id,
-    private_key=prod_private_key
-    )
+    EXCHANGE_CLIENT = await get_exchange_client(KALSHI_API_BASE, prod_key_id, 'kalshi-key.key')
     EVENT_TICKER = makeEventTicker()
     print(EVENT_TICKER)
     event_params = {'event_ticker': EVENT_TICKER}
-    event_response = EXCHANGE_CLIENT.get_event(**event_params)
+    event_response = await EXCHANGE_CLIENT.get_event(**event_params)
     logging.info(f"event response {event_response}")
+    await start_market_stream([market['ticker'] for market in event_response['markets']])
+
+async def start_market_stream(tickers):
+    """Replaces the market-data stream with one for the given markets."""
+    global MARKET_STREAM, QUOTE_TICKER
+    if MARKET_STREAM is not None:
+        await MARKET_STREAM.stop()
+    QUOTE_TICKER = tickers[0] if tickers else None
+    MARKET_STREAM = MarketStream(EXCHANGE_CLIENT, tickers)
+    MARKET_STREAM.start()
+
+async def current_market():
+    """
+    The decision market's quote and order book: from the market stream when it is in
+    sync, else from get_orderbook. Returns (quote, book); book is None if only
+    get_event could be used. A REST read raises DeadlineExceeded after
+    MARKET_DATA_DEADLINE seconds rather than deciding on a late quote.
+    """
+    if MARKET_STREAM is not None and QUOTE_TICKER is not None:
+        quote, book = MARKET_STREAM.quote(QUOTE_TICKER), MARKET_STREAM.book(QUOTE_TICKER)
+        if quote is not None and book is not None:
+            return quote, book
+    with request_deadline(MARKET_DATA_DEADLINE):
+        if QUOTE_TICKER is None:
+            event_response = await EXCHANGE_CLIENT.get_event(event_ticker=EVENT_TICKER)
+            return event_response['markets'][0], None
+        book = OrderBook.from_response(QUOTE_TICKER, await EXCHANGE_CLIENT.get_orderbook(ticker=QUOTE_TICKER))
+    return book.quote(), book
 
 
 from datetime import datetime
@@ -157,80 +225,161 @@ async def game_state_websocket(websocket: WebSocket):
             logging.info(f"Received game state: {data}")
             print(type(data))
             # Optionally, process or store the game state here
-            x(data)
+            state = await x(data)
             await websocket.send_text("Game state received")
+            if state is not None:
+                schedule_speculation(state)
     except Exception as e:
         logging.error(f"WebSocket connection closed or error occurred: {e}")
 
-def x(gamestate):
-        global data_dict, balance, EVENT_TICKER, EXCHANGE_CLIENT, yes_contracts, no_contracts
-        try:
-            print(f"Received game state: {gamestate}")
-            event_params = {'event_ticker': EVENT_TICKER}
-            gamestate = json.loads(gamestate)
-            
-            if gamestate['isTop']:
-                gamestate["home_away"] = 0
-            else:
-                gamestate["home_away"] = 1
-            winPer, leverage, expected_runs = data_dict[gamestate['inning']][gamestate['home_away']][gamestate['outs']][
-        (gamestate['bases'][1], gamestate['bases'][2], gamestate['bases'][3])
-    ][gamestate['homeScores'] - gamestate['awayScores']][
-        (gamestate['balls'], gamestate['strikes'])
-    ]
-            event_response = EXCHANGE_CLIENT.get_event(**event_params)
-            if winPer is None:
-                logging.info('No data available for the current game state.')
-                return
-            kalshi_home_win = (event_response['markets'][0]['yes_ask'] + (event_response['markets'][0]['yes_ask'] - event_response['markets'][0]['yes_bid']) + 4)/100
-            if winPer > kalshi_home_win:
-                contracts,_ = kelly_criterion(winPer, event_response['markets'][0]['yes_ask']+0.02, balance, dynamic_kelly_fraction(winPer, gamestate['inning'], leverage, .25))
-                contracts = round(contracts/(event_response['markets'][0]['yes_ask']/100+0.02))
-                balance -= contracts * (event_response['markets'][0]['yes_ask']/100+0.02)
-                if balance < 0:
-                    logging.error("Insufficient balance for betting.")
-                    balance += contracts * (event_response['markets'][0]['yes_ask']/100+0.02)
-                logging.info(f"Balance after home bet: {balance} for {contracts} contracts at {event_response['markets'][0]['yes_ask']}")
-                yes_contracts += contracts
-            elif yes_contracts > 0 and winPer < event_response['markets'][0]['yes_bid']/100:
-                contracts = yes_contracts
-                balance += contracts * (event_response['markets'][0]['yes_bid']/100)
-                logging.info(f"Balance after home bet sell: {balance} for {contracts} contracts at {event_response['markets'][0]['yes_bid']}")
-                yes_contracts = 0
-
-            kalshi_home_lose = (event_response['markets'][0]['no_ask'] + (event_response['markets'][0]['no_ask'] - event_response['markets'][0]['no_bid']) + 4)/100
-
-            if 1-winPer < kalshi_home_lose:
-                contracts,_ = kelly_criterion(1-winPer, event_response['markets'][0]['no_ask']+0.02, balance, dynamic_kelly_fraction(1-winPer, gamestate['inning'], leverage, .25))
-                contracts = round(contracts/(event_response['markets'][0]['no_ask']/100+0.02))
-                balance -= contracts * (event_response['markets'][0]['no_ask']/100+0.02)
-                if balance < 0:
-                    logging.error("Insufficient balance for betting.")
-                    balance += contracts * (event_response['markets'][0]['yes_ask']/100+0.02)
-                logging.info(f"Balance after home lose bet: {balance} for {contracts} contracts at {event_response['markets'][0]['no_ask']}")
-                no_contracts += contracts
-
-
-            logging.info(f"Balance before home bet: {kalshi_home_win} Kalshi home lose: {kalshi_home_lose}")
-            logging.info(f"Balance after home bet: {balance}")
-            logging.info(f"winPer: {winPer}, leverage: {leverage}, expected_runs: {expected_runs}")
-            logging.info(
-                f"event response home: yes_bid{event_response['markets'][0]['yes_bid']}, "
-                f"no_bid{event_response['markets'][0]['no_bid']}, "
-                f"yes_ask{event_response['markets'][0]['yes_ask']}, "
-                f"no_ask{event_response['markets'][0]['no_ask']}"
-            )
-            logging.info(
-                f"event response away: yes_bid{event_response['markets'][1]['yes_bid']}, "
-                f"no_bid{event_response['markets'][1]['no_bid']}, "
-                f"yes_ask{event_response['markets'][1]['yes_ask']}, "
-                f"no_ask{event_response['markets'][1]['no_ask']}"
-            )
-        
-        except Exception as e:
-            logging.error(f"Error processing game state: {e}")
-            return
-
-
-
+def require_admin(authorization: str = Header(None)):
+    """Admits requests carrying "Authorization: Bearer <ADMIN_TOKEN>"; without ADMIN_TOKEN set, admits none."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if authorization is None or not hmac.compare_digest(authorization.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
+@app.post("/admin/reload-tables", dependencies=[Depends(require_admin)])
+async def reload_tables():
+    # Always the configured artifact; under shared_tables serve the new table reaches every worker
+    try:
+        version = await table_registry.reload()
+    except (OSError, ValueError) as e:
+        logging.error(f"Table reload failed: {e}")
+        raise HTTPException(status_code=422, detail=f"Table reload failed: {e}")
+    logging.info(f"Table version {version.number} active from {version.source}")
+    return {"success": True, "active": version.describe()}
+
+@app.get("/admin/tables")
+async def tables_status():
+    return table_registry.status()
+
+@app.get("/admin/connections")
+async def connection_status():
+    if EXCHANGE_CLIENT is None:
+        return {"configured": False, "rate_limits": default_limiter.metrics()}
+    return {"configured": True, **EXCHANGE_CLIENT.connection_stats(), "rate_limits": default_limiter.metrics(),
+            "market_stream": MARKET_STREAM.stats() if MARKET_STREAM is not None else None,
+            "orders": ORDER_GATEWAY.stats() if ORDER_GATEWAY is not None else None}
+
+def parse_game_state(gamestate):
+    gamestate = loads(gamestate)
+    return (gamestate['inning'], 0 if gamestate['isTop'] else 1, gamestate['outs'],
+            encode_bases(gamestate['bases'][1], gamestate['bases'][2], gamestate['bases'][3]),
+            gamestate['homeScores'] - gamestate['awayScores'], gamestate['balls'], gamestate['strikes'])
+
+async def x(gamestate):
+    """Decides and books the bets for one game-state message. Returns the parsed state, or None on error."""
+    try:
+        print(f"Received game state: {gamestate}")
+        state = parse_game_state(gamestate)
+        if not valid_states(*state[1:4], *state[5:]):
+            # E.g. the 3-out message between half-innings; it has no cell of its own
+            logging.info(f"Game state {state} is outside the table, not trading on it.")
+            return None
+        decision = decision_cache.lookup(state, (balance, yes_contracts, no_contracts), streamed_top_of_book(),
+                                         table_registry.version)
+        if decision is None:
+            quote, book = await current_market()
+            # The simulation takes tens of milliseconds; keep it off the event loop
+            decision = await asyncio.to_thread(decide_current, state, quote, book)
+        else:
+            logging.info('Using the speculative decision for the current game state.')
+        await apply_decision(decision)
+        return state
+    except Exception as e:
+        logging.error(f"Error processing game state: {e}")
+        return None
+
+def decide_current(state, quote, book):
+    """Decides one state against the active table (runs in a worker thread)."""
+    # Messages from several websockets can be decided at once; the simulator's generator is not thread-safe
+    with simulator_lock, table_registry.acquire() as win_table:
+        return decide(state, current_surface(win_table), simulator, quote, balance, yes_contracts, no_contracts,
+                      MODEL_CONFIDENCE, SIMULATION_PATHS, book)
+
+def get_order_gateway():
+    """The order gateway for the current exchange client."""
+    global ORDER_GATEWAY
+    if ORDER_GATEWAY is None or ORDER_GATEWAY.client is not EXCHANGE_CLIENT:
+        ORDER_GATEWAY = OrderGateway(EXCHANGE_CLIENT)
+    return ORDER_GATEWAY
+
+def current_surface(win_table):
+    """The decision surface for the active table, rebuilt when the table or Kelly parameters change."""
+    global decision_surface
+    # Called from the decision and speculation threads; only one of them rebuilds
+    with surface_lock:
+        surface = decision_surface
+        if surface is None or not surface.matches(win_table):
+            surface = DecisionSurface(win_table)
+            decision_surface = surface
+        return surface
+
+async def apply_decision(decision):
+    global balance, yes_contracts, no_contracts
+    for action, payload in decision.orders:
+        price = payload['yes_price'] if payload['side'] == 'yes' else payload['no_price']
+        logging.info(f"{action}: {payload['count']} contracts at {price}")
+    errors = []
+    if SUBMIT_ORDERS and decision.orders:
+        # Every order of the decision in one batched request
+        results = await get_order_gateway().submit_many([payload for _, payload in decision.orders])
+        # Book the orders that went through before reporting the ones that did not, as main.flatten_and_flip does
+        for (cash, yes_change, no_change), result in zip(decision.effects, results):
+            if isinstance(result, Exception):
+                logging.error(f"Order rejected: {result}")
+                errors.append(result)
+                continue
+            balance += cash
+            yes_contracts += yes_change
+            no_contracts += no_change
+    else:
+        balance, yes_contracts, no_contracts = decision.balance, decision.yes_contracts, decision.no_contracts
+    if decision.fallback & FALLBACK_DEFAULT_WIN:
+        logging.info('No data available for the current game state.')
+    elif decision.fallback:
+        logging.info(f'Using nearest-state fallback for the current game state (flags {decision.fallback}).')
+    logging.info(f"Balance after bets: {balance}, yes contracts: {yes_contracts}, no contracts: {no_contracts}")
+    logging.info(f"winPer: {decision.win}, leverage: {decision.leverage}, expected_runs: {decision.expected_runs}")
+    logging.info(f"simulated winPer: {decision.simulation.mean} +/- {decision.simulation.stderr}, "
+                 f"confidence: {decision.confidence}")
+    logging.info(
+        f"event response home: yes_bid{decision.quote['yes_bid']}, "
+        f"no_bid{decision.quote['no_bid']}, "
+        f"yes_ask{decision.quote['yes_ask']}, "
+        f"no_ask{decision.quote['no_ask']}"
+    )
+    if errors:
+        raise errors[0]
+
+def streamed_top_of_book():
+    """Top of book of the decision market from the market stream, or None if the stream has no quote."""
+    if MARKET_STREAM is None or QUOTE_TICKER is None:
+        return None
+    return top_of_book(MARKET_STREAM.quote(QUOTE_TICKER))
+
+def speculate_successors(state, quote, book, quoted_at, sequence):
+    """Decides every successor of state against a quote and book (runs in a worker thread)."""
+    context = (balance, yes_contracts, no_contracts)
+    # Read before acquiring: a swap in between leaves the stored version stale, which only causes a miss
+    table_version = table_registry.version
+    with table_registry.acquire() as win_table:
+        decisions = speculate(state, current_surface(win_table), speculative_simulator, quote, *context,
+                              MODEL_CONFIDENCE, SIMULATION_PATHS, book)
+    decision_cache.store(decisions, context, quoted_at, top_of_book(quote), table_version, sequence)
+
+async def run_speculation(state, sequence):
+    try:
+        with request_priority(BACKGROUND):
+            quote, book = await current_market()
+        await asyncio.to_thread(speculate_successors, state, quote, book, time.monotonic(), sequence)
+    except Exception as e:
+        logging.error(f"Speculative precomputation failed: {e}")
+
+def schedule_speculation(state):
+    global speculation_task
+    if speculation_task is not None and not speculation_task.done():
+        speculation_task.cancel()
+    # Cancelling does not stop a worker thread that has started; begin() makes its late store a no-op
+    speculation_task = asyncio.create_task(run_speculation(state, decision_cache.begin()))
@@ -0,0 +1,196 @@
+"""
+Model-based win probability built from the run-distribution table.
+
+runsperinningballsstrikesstats gives, for every (outs, bases, count) state, the
+distribution of runs scored in the rest of the half-inning. Treating half-innings
+as independent, the final margin is the current score diff plus the runs the
+batting team still scores this half plus the convolution of every remaining
+half-inning's run distribution, and the home team's win probability follows
+directly. Score diffs are home minus away, as in main2.x().
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from getExpectedStats import (MAX_INNING, MAX_RUNS, MAX_SCORE_DIFF, N_COUNTS, N_DIFFS, RUNS_PATH, TABLE_SHAPE,
+                              WinExpectancyTable, load_win_expectancy_table,
+                              parse_runs_per_inning_balls_strikes_stats)
+
+REGULATION_INNINGS = 9
+# Extra innings start with a runner on second (bases mask 2)
+GHOST_RUNNER_BASES = 2
+
+
+class MarkovWinEngine:
+    """
+    Computes remaining-game win probability by convolving half-inning run distributions.
+
+    Parameters:
+    - distributions (ndarray): Run pmfs of shape (3, 8, N_COUNTS, MAX_RUNS) indexed by
+      (outs, bases mask, balls * 3 + strikes)
+    - ghost_runner (bool): Start extra innings with a runner on second
+    """
+
+    def __init__(self, distributions, ghost_runner=True):
+        self.distributions = distributions
+        self.fresh_half = distributions[0, 0, 0]
+        self.extra_half = distributions[0, GHOST_RUNNER_BASES, 0] if ghost_runner else self.fresh_half
+        self._halves = {0: np.ones(1)}
+        self._remaining = {}
+        self.extra_innings_win = self._extra_innings_win()
+        self._grid = None
+
+    @classmethod
+    def from_file(cls, file_path=RUNS_PATH, **kwargs):
+        return cls(load_run_distributions(file_path), **kwargs)
+
+    def runs_over_halves(self, halves):
+        """Pmf of runs scored over a number of full half-innings, memoized by count."""
+        pmf = self._halves.get(halves)
+        if pmf is None:
+            pmf = np.convolve(self.runs_over_halves(halves - 1), self.fresh_half)
+            self._halves[halves] = pmf
+        return pmf
+
+    def _extra_innings_win(self):
+        # Home wins a tied extra inning when it outscores the visitors; ties repeat
+        margin, offset = _margin_pmf(self.extra_half, self.extra_half)
+        p_win = margin[offset + 1:].sum()
+        p_tie = margin[offset]
+        return p_win / (1 - p_tie)
+
+    def remaining_margin(self, inning, home_away):
+        """
+        Pmf of (home runs - away runs) over the half-innings after the current one.
+
+        Returns:
+        - pmf (ndarray): Probabilities, where index i means a margin of i - offset
+        - offset (int): Index of a zero margin
+        """
+        key = (min(inning, MAX_INNING), home_away)
+        cached = self._remaining.get(key)
+        if cached is not None:
+            return cached
+        inning = key[0]
+        if inning <= REGULATION_INNINGS:
+            away_halves = REGULATION_INNINGS - inning
+            home_halves = away_halves + (1 if home_away == 0 else 0)
+            home, away = self.runs_over_halves(home_halves), self.runs_over_halves(away_halves)
+        elif home_away == 0:
+            # Top of an extra inning: only the home half of this inning remains
+            home, away = self.extra_half, np.ones(1)
+        else:
+            home, away = np.ones(1), np.ones(1)
+        cached = _margin_pmf(home, away)
+        self._remaining[key] = cached
+        return cached
+
+    def win_probability(self, inning, home_away, outs, bases, score_diff, balls, strikes):
+        """Home win probability from a single state; takes the same arguments as WinExpectancyTable.lookup."""
+        remaining, offset = self.remaining_margin(inning, home_away)
+        current = self.distributions[outs, bases, balls * 3 + strikes]
+        if home_away == 0:
+            margin = np.convolve(remaining, current[::-1])
+            offset += len(current) - 1
+        else:
+            margin = np.convolve(remaining, current)
+        threshold = offset - score_diff
+        if threshold < 0:
+            return 1.0
+        if threshold >= len(margin):
+            return 0.0
+        return float(margin[threshold + 1:].sum() + margin[threshold] * self.extra_innings_win)
+
+    def win_grid(self):
+        """
+        Home win probability for every state in the WinExpectancyTable layout, as a
+        float32 array of TABLE_SHAPE. Computed once and cached.
+        """
+        if self._grid is not None:
+            return self._grid
+        grid = np.empty(TABLE_SHAPE, dtype=np.float32)
+        current = self.distributions.reshape(-1, MAX_RUNS)
+        diffs = np.arange(-MAX_SCORE_DIFF, MAX_SCORE_DIFF + 1)
+        for inning in range(1, MAX_INNING + 1):
+            for home_away in (0, 1):
+                remaining, offset = self.remaining_margin(inning, home_away)
+                # Add the rest of the current half for all states at once: one shifted copy per run count
+                margin = np.zeros((len(current), len(remaining) + MAX_RUNS - 1))
+                for runs in range(MAX_RUNS):
+                    shift = MAX_RUNS - 1 - runs if home_away == 0 else runs
+                    margin[:, shift:shift + len(remaining)] += current[:, runs, None] * remaining[None, :]
+                if home_away == 0:
+                    offset += MAX_RUNS - 1
+                # P(margin index > j) for every j, padded so out-of-range thresholds read 1 or 0
+                above = np.concatenate([np.ones((len(current), 1)),
+                                        1 - np.cumsum(margin, axis=1), np.zeros((len(current), 1))], axis=1)
+                equal = np.concatenate([np.zeros((len(current), 1)), margin, np.zeros((len(current), 1))], axis=1)
+                thresholds = np.clip(offset - diffs, -1, margin.shape[1]) + 1
+                win = above[:, thresholds] + equal[:, thresholds] * self.extra_innings_win
+                grid[inning - 1, home_away] = np.clip(win, 0, 1).reshape(3, 8, N_COUNTS, N_DIFFS).transpose(0, 1, 3, 2)
+        self._grid = grid
+        return grid
+
+    def to_table(self, template=None):
+        """
+        Builds a WinExpectancyTable whose win % comes from the model. Leverage and
+        expected runs are copied from template when given, otherwise runs are the
+        means of the run distributions.
+        """
+        if template is not None:
+            leverage, runs = np.array(template.leverage), np.array(template.runs)
+        else:
+            leverage = np.full(TABLE_SHAPE, np.nan, dtype=np.float32)
+            means = (self.distributions * np.arange(MAX_RUNS)).sum(axis=-1)
+            runs = np.broadcast_to(means[None, None, :, :, None, :], TABLE_SHAPE).astype(np.float32)
+        table = WinExpectancyTable(win=self.win_grid().copy(), leverage=leverage, runs=runs,
+                                   metadata={'model': 'markov'})
+        table.build_fallback()
+        return table
+
+
+def run_distributions(runs_records):
+    """Normalizes parsed run counts into pmfs of shape (3, 8, N_COUNTS, MAX_RUNS)."""
+    counts = np.zeros((3, 8, N_COUNTS, MAX_RUNS), dtype=np.float64)
+    counts[runs_records['outs'], runs_records['bases'],
+           runs_records['balls'] * 3 + runs_records['strikes']] = runs_records['runs']
+    totals = counts.sum(axis=-1, keepdims=True)
+    if (totals == 0).any():
+        raise ValueError(f"Run distribution missing for {int((totals == 0).sum())} states")
+    return counts / totals
+
+
+def load_run_distributions(file_path=RUNS_PATH):
+    records, _ = parse_runs_per_inning_balls_strikes_stats(file_path)
+    return run_distributions(records)
+
+
+def _margin_pmf(home, away):
+    """Pmf of home - away for independent run pmfs; returns (pmf, index of a zero margin)."""
+    return np.convolve(home, away[::-1]), len(away) - 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m markov_engine', description="Markov-chain win probability")
+    parser.add_argument('--runs', default=RUNS_PATH)
+    parser.add_argument('--no-ghost-runner', action='store_true')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    engine = MarkovWinEngine.from_file(args.runs, ghost_runner=not args.no_ghost_runner)
+    grid = engine.win_grid()
+    print(f"Computed {grid.size} states in {time.perf_counter() - start:.2f}s "
+          f"(extra-innings home win {engine.extra_innings_win:.3f})")
+    empirical = load_win_expectancy_table().win
+    populated = ~np.isnan(empirical)
+    if populated.any():
+        error = np.abs(grid[populated] - empirical[populated])
+        print(f"Versus {int(populated.sum())} empirical cells: mean abs diff {error.mean():.4f}, "
+              f"max {error.max():.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
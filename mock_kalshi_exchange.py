@@ -0,0 +1,710 @@
+"""
+Local mock of Kalshi's trade-api/v2, for load-testing main.py and main2.py
+without production keys.
+
+It serves the REST endpoints ExchangeClient uses (exchange status, events,
+series, markets, orderbooks, trades, balance, orders and batched orders,
+fills, positions) and the market-data websocket MarketStream subscribes to.
+Requests must carry Kalshi auth headers; with a key file, their RSA-PSS
+signatures are verified too. Reads and writes are rate limited per key like
+the exchange's Basic tier, and every response can be delayed by a fixed latency
+plus an exponential tail. Prices random-walk as in kalshi_feed_server, and
+orders are matched against the simulated book.
+
+Events are created on first use from their ticker, e.g. KXMLBGAME-25JUL04BOSNYY
+gets the markets KXMLBGAME-25JUL04BOSNYY-NYY and -BOS, so the servers need no
+setup beyond the API base:
+
+    python mock_kalshi_exchange.py --port 8001 --key-file kalshi-key.key --latency 0.03 --jitter 0.02
+    KALSHI_API_BASE=http://127.0.0.1:8001/trade-api/v2 uvicorn main2:app
+
+The key file is created if it does not exist. Benchmark an AsyncExchangeClient
+against the mock:
+
+    python mock_kalshi_exchange.py --benchmark 10 --concurrency 16 --latency 0.02 --jitter 0.01 --seed 1
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import os
+import random
+import re
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from fastapi import APIRouter, FastAPI, Request, WebSocket
+from fastapi.responses import Response
+
+from fast_json import dumps_bytes, loads
+from kalshi_feed_server import FeedServer, SimulatedMarket
+from kalshi_market_stream import WS_PATH
+from rate_limiter import READ_RATE, WRITE_RATE, TokenBucket, request_kind
+
+API_PREFIX = '/trade-api/v2'
+# Series, date and the away and home team codes, e.g. KXMLBGAME-25JUL04BOSNYY
+EVENT_PATTERN = re.compile(r'^[A-Z0-9]+-\d{2}[A-Z]{3}\d{2}[A-Z]{2,}$')
+STARTING_BALANCE = 100000  # cents
+PAGE_SIZE = 100
+
+
+class ExchangeError(Exception):
+    """An error response, with Kalshi's {'error': {'code', 'message'}} body and, for 429s, a Retry-After."""
+    def __init__(self, status, code, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.retry_after = retry_after
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _json(body, status=200):
+    return Response(dumps_bytes(body), status_code=status, media_type='application/json')
+
+
+def _error(error):
+    response = _json({'error': {'code': error.code, 'message': error.message}}, error.status)
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = f'{error.retry_after:.3f}'
+    return response
+
+
+def _page(items, key, limit, cursor):
+    """One page of items, with the cursor of the next page ('' after the last)."""
+    start = int(cursor) if cursor else 0
+    limit = limit or PAGE_SIZE
+    end = start + limit
+    return {key: items[start:end], 'cursor': str(end) if end < len(items) else ''}
+
+
+class _WebSocketConnection:
+    """A Starlette websocket with the send/close/iteration interface FeedServer.handler expects."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def send(self, text):
+        await self.websocket.send_text(text)
+
+    async def close(self):
+        await self.websocket.close()
+
+    def __aiter__(self):
+        return self.websocket.iter_text()
+
+
+class _MockFeed(FeedServer):
+    """FeedServer over the exchange's markets; subscribing to a market creates it."""
+
+    def __init__(self, exchange, rate, seed):
+        super().__init__(markets=(), rate=rate, seed=seed)
+        self.exchange = exchange
+
+    def command(self, feed, message):
+        for ticker in (message.get('params') or {}).get('market_tickers') or ():
+            try:
+                self.exchange.market(ticker)
+            except ExchangeError:
+                pass
+        super().command(feed, message)
+
+
+class MockExchange:
+    """
+    Parameters:
+    - public_key (RSAPublicKey): When given, request signatures must verify against it
+    - read_rate (float): Reads per second allowed per key
+    - write_rate (float): Writes per second allowed per key; each order or cancel in a batch counts as one
+    - latency (float): Seconds added to every response
+    - jitter (float): Mean of an exponentially distributed extra delay, in seconds
+    - walk_rate (float): Simulated book updates per second, across all markets
+    - balance (int): Starting balance in cents
+    - events (list): Event tickers to create up front
+    - seed (int): Random seed for prices and delays
+    """
+
+    def __init__(self, public_key=None, read_rate=READ_RATE, write_rate=WRITE_RATE, latency=0.0, jitter=0.0,
+                 walk_rate=50.0, balance=STARTING_BALANCE, events=(), seed=None):
+        self.public_key = public_key
+        self.rates = {'read': read_rate, 'write': write_rate}
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.feed = _MockFeed(self, walk_rate, seed)
+        self.markets = self.feed.markets
+        self.events = {}
+        self.balance = balance
+        self.orders = {}
+        self.fills = []
+        self.trades = []
+        self.positions = {}
+        self._resting = {}  # order_id -> (market, book side, price) of its resting size
+        self._client_order_ids = set()
+        self._buckets = {}
+        self.requests = 0
+        self.throttled = 0
+        self.unauthorized = 0
+        for event_ticker in events:
+            self.event(event_ticker)
+
+    async def start(self):
+        self.feed._publisher = asyncio.create_task(self.feed.publish())
+
+    async def stop(self):
+        self.feed._publisher.cancel()
+
+    def delay(self):
+        return self.latency + (self.rng.expovariate(1 / self.jitter) if self.jitter else 0.0)
+
+    def verify(self, headers, method, path):
+        """Checks a request's auth headers. Returns its key id."""
+        key, signature, timestamp = (headers.get('KALSHI-ACCESS-KEY'), headers.get('KALSHI-ACCESS-SIGNATURE'),
+                                     headers.get('KALSHI-ACCESS-TIMESTAMP'))
+        if not (key and signature and timestamp):
+            self.unauthorized += 1
+            raise ExchangeError(401, 'missing_parameters', 'Missing authentication headers')
+        if self.public_key is not None:
+            try:
+                self.public_key.verify(
+                    base64.b64decode(signature), (timestamp + method + path).encode('utf-8'),
+                    padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.DIGEST_LENGTH),
+                    hashes.SHA256(),
+                )
+            except (InvalidSignature, ValueError):
+                self.unauthorized += 1
+                raise ExchangeError(401, 'authentication_error', 'Invalid signature')
+        return key
+
+    def throttle(self, key, method, cost=1, paid=0):
+        """
+        Takes cost tokens from the key's read or write bucket; raises a 429 if there are not enough.
+
+        A cost larger than a full bucket (less the paid tokens the request already took
+        at the gate) is admitted once the bucket is full, and leaves it in debt.
+        """
+        kind = request_kind(method)
+        bucket = self._buckets.get((key, kind))
+        if bucket is None:
+            bucket = self._buckets[(key, kind)] = TokenBucket(self.rates[kind])
+        bucket.wait_time(time.monotonic())  # refills
+        needed = min(cost, bucket.capacity - paid)
+        if bucket.tokens < needed:
+            self.throttled += 1
+            raise ExchangeError(429, 'too_many_requests', 'Too many requests',
+                                retry_after=(needed - bucket.tokens) / bucket.rate)
+        bucket.tokens -= cost
+
+    # Markets and events
+
+    def event(self, event_ticker):
+        """The event's market tickers, creating a market per team the first time the event is seen."""
+        tickers = self.events.get(event_ticker)
+        if tickers:
+            return tickers
+        if not EVENT_PATTERN.match(event_ticker):
+            raise ExchangeError(404, 'not_found', f'Event {event_ticker} not found')
+        teams = event_ticker[event_ticker.index('-') + 8:]
+        away, home = teams[:len(teams) // 2], teams[len(teams) // 2:]
+        mid = self.rng.randint(35, 65)
+        self.market(f'{event_ticker}-{home}', mid)
+        self.market(f'{event_ticker}-{away}', 100 - mid)
+        return self.events[event_ticker]
+
+    def market(self, ticker, mid=50):
+        market = self.markets.get(ticker)
+        if market is None:
+            event_ticker = ticker.rpartition('-')[0]
+            if not EVENT_PATTERN.match(event_ticker):
+                raise ExchangeError(404, 'not_found', f'Market {ticker} not found')
+            market = self.markets[ticker] = SimulatedMarket(ticker, self.feed.rng, mid)
+            self.events.setdefault(event_ticker, []).append(ticker)
+        return market
+
+    def market_view(self, market):
+        yes_bid, no_bid = market.best('yes'), market.best('no')
+        event_ticker = market.ticker.rpartition('-')[0]
+        return {
+            'ticker': market.ticker, 'event_ticker': event_ticker, 'market_type': 'binary', 'status': 'active',
+            'yes_sub_title': market.ticker.rpartition('-')[2], 'response_price_units': 'usd_cent', 'tick_size': 1,
+            'yes_bid': yes_bid, 'yes_ask': 100 - no_bid if no_bid else 100,
+            'no_bid': no_bid, 'no_ask': 100 - yes_bid if yes_bid else 100,
+            'last_price': market.last_price, 'volume': market.volume, 'open_interest': market.volume // 2,
+        }
+
+    def orderbook(self, ticker, depth=None):
+        market = self.market(ticker)
+        book = {}
+        for side in ('yes', 'no'):
+            levels = sorted([price, size] for price, size in market.book[side].items())
+            if depth:
+                levels = levels[-depth:]
+            book[side] = levels or None
+        return {'orderbook': book}
+
+    def _change(self, market, side, price, delta):
+        """Changes the size at a price and sends the delta to the feed's subscribers."""
+        size = market.book[side].get(price, 0) + delta
+        if size > 0:
+            market.book[side][price] = size
+        else:
+            market.book[side].pop(price, None)
+        self.feed.broadcast('orderbook_delta', {'market_ticker': market.ticker, 'price': price, 'delta': delta,
+                                                'side': side})
+
+    # Orders
+
+    def position(self, ticker):
+        position = self.positions.get(ticker)
+        if position is None:
+            position = self.positions[ticker] = {'ticker': ticker, 'position': 0, 'market_exposure': 0,
+                                                 'realized_pnl': 0, 'total_traded': 0, 'resting_orders_count': 0,
+                                                 'fees_paid': 0, '_basis': 0}
+        return position
+
+    def _book_position(self, ticker, contracts, yes_price):
+        """Adds contracts (positive yes, negative no) bought at yes_price to a position, netting yes against no."""
+        position = self.position(ticker)
+        held, basis = position['position'], position['_basis']
+        if held and (held > 0) != (contracts > 0):
+            closed = contracts if abs(contracts) <= abs(held) else -held
+            average = basis / held
+            position['realized_pnl'] += round(-closed * (yes_price - average))
+            held += closed
+            basis = average * held
+            contracts -= closed
+        held += contracts
+        basis += contracts * yes_price
+        position['position'], position['_basis'] = held, basis
+        position['market_exposure'] = round(basis if held >= 0 else -held * 100 + basis)
+
+    def _take(self, market, order, limit, max_cost):
+        """Fills order against the book up to its limit price. Returns (contracts filled, cents traded)."""
+        side, buy = order['side'], order['action'] == 'buy'
+        book_side = ('no' if side == 'yes' else 'yes') if buy else side
+        filled, traded = 0, 0
+        for level in sorted(market.book[book_side], reverse=True):
+            price = 100 - level if buy else level
+            wanted = order['remaining_count'] - filled
+            if wanted == 0 or (price > limit if buy else price < limit):
+                break
+            take = min(market.book[book_side][level], wanted)
+            if max_cost is not None:
+                take = min(take, (max_cost - traded) // price)
+                if take <= 0:
+                    break
+            self._change(market, book_side, level, -take)
+            filled += take
+            traded += take * price
+            yes_price = price if side == 'yes' else 100 - price
+            market.last_price = yes_price
+            market.volume += take
+            trade_id = str(uuid.uuid4())
+            self.fills.append({'trade_id': trade_id, 'order_id': order['order_id'], 'ticker': market.ticker,
+                               'side': side, 'action': order['action'], 'count': take, 'yes_price': yes_price,
+                               'no_price': 100 - yes_price, 'is_taker': True, 'created_time': _now()})
+            self.trades.append({'trade_id': trade_id, 'ticker': market.ticker, 'count': take,
+                                'yes_price': yes_price, 'no_price': 100 - yes_price,
+                                'taker_side': side if buy else ('no' if side == 'yes' else 'yes'),
+                                'created_time': _now()})
+            signed = take if (side == 'yes') == buy else -take
+            self._book_position(market.ticker, signed, yes_price)
+            self.position(market.ticker)['total_traded'] += take * price
+        return filled, traded
+
+    def place(self, params):
+        """
+        Matches an order against the book; a limit order's remainder rests until cancelled.
+        The simulated flow never trades with resting orders.
+
+        Returns:
+        - dict: The order, as create_order returns it under 'order'
+        """
+        ticker, side, action, kind = (params.get('ticker'), params.get('side'), params.get('action'),
+                                      params.get('type', 'limit'))
+        count = params.get('count')
+        if side not in ('yes', 'no') or action not in ('buy', 'sell') or kind not in ('limit', 'market'):
+            raise ExchangeError(400, 'invalid_parameters', 'side, action or type is invalid')
+        if not isinstance(count, int) or count < 1:
+            raise ExchangeError(400, 'invalid_parameters', 'count must be a positive integer')
+        client_order_id = params.get('client_order_id')
+        if client_order_id in self._client_order_ids:
+            raise ExchangeError(409, 'order_already_exists', f'Duplicate client_order_id {client_order_id}')
+        market = self.market(ticker)
+        price = params.get(f'{side}_price')
+        other_price = params.get(f"{'no' if side == 'yes' else 'yes'}_price")
+        if price is None and other_price is not None:
+            price = 100 - other_price
+        if kind == 'limit' and (price is None or not 1 <= price <= 99):
+            raise ExchangeError(400, 'invalid_parameters', 'A limit order needs a price between 1 and 99')
+        limit = price if price is not None else (99 if action == 'buy' else 1)
+
+        held = self.position(ticker)['position'] * (1 if side == 'yes' else -1)
+        if action == 'sell':
+            # Sells only close positions, so sell_position_floor is always met
+            if count > held:
+                raise ExchangeError(400, 'insufficient_position', f'Cannot sell {count}; {max(held, 0)} held')
+            max_cost = None
+        else:
+            max_cost = min(params.get('buy_max_cost') or self.balance, self.balance)
+            if kind == 'limit' and limit * count > self.balance:
+                raise ExchangeError(400, 'insufficient_balance', 'Insufficient balance')
+
+        order = {'order_id': str(uuid.uuid4()), 'client_order_id': client_order_id, 'ticker': ticker,
+                 'status': 'resting', 'side': side, 'action': action, 'type': kind,
+                 'yes_price': limit if side == 'yes' else 100 - limit,
+                 'no_price': limit if side == 'no' else 100 - limit,
+                 'initial_count': count, 'fill_count': 0, 'remaining_count': count, 'taker_fill_cost': 0,
+                 'created_time': _now()}
+        filled, traded = self._take(market, order, limit, max_cost)
+        self.balance += traded if action == 'sell' else -traded
+        order['fill_count'], order['remaining_count'], order['taker_fill_cost'] = filled, count - filled, traded
+        if order['remaining_count'] and kind == 'limit':
+            # A buy rests as a bid on its side; a sell as a bid on the other side at the complementary price
+            book_side, level = (side, limit) if action == 'buy' else ('no' if side == 'yes' else 'yes', 100 - limit)
+            self._change(market, book_side, level, order['remaining_count'])
+            self._resting[order['order_id']] = (market, book_side, level)
+            self.position(ticker)['resting_orders_count'] += 1
+            if action == 'buy':
+                self.balance -= limit * order['remaining_count']
+        else:
+            order['status'] = 'executed' if order['remaining_count'] == 0 else 'canceled'
+        self._client_order_ids.add(client_order_id)
+        self.orders[order['order_id']] = order
+        return order
+
+    def order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None:
+            raise ExchangeError(404, 'not_found', f'Order {order_id} not found')
+        return order
+
+    def decrease(self, order_id, reduce_by=None, reduce_to=None):
+        """Takes contracts off a resting order. Returns the number removed."""
+        order = self.order(order_id)
+        resting = self._resting.get(order_id)
+        if resting is None:
+            raise ExchangeError(400, 'order_not_resting', f'Order {order_id} is not resting')
+        remaining = order['remaining_count']
+        reduced = min(remaining, reduce_by if reduce_by is not None else remaining - (reduce_to or 0))
+        market, book_side, level = resting
+        self._change(market, book_side, level, -min(reduced, market.book[book_side].get(level, 0)))
+        if order['action'] == 'buy':
+            self.balance += reduced * (order['yes_price'] if order['side'] == 'yes' else order['no_price'])
+        order['remaining_count'] = remaining - reduced
+        if order['remaining_count'] == 0:
+            order['status'] = 'canceled'
+            del self._resting[order_id]
+            self.position(order['ticker'])['resting_orders_count'] -= 1
+        return reduced
+
+    def cancel(self, order_id):
+        return self.decrease(order_id, reduce_to=0)
+
+    def stats(self):
+        return {'requests': self.requests, 'throttled': self.throttled, 'unauthorized': self.unauthorized,
+                'markets': len(self.markets), 'orders': len(self.orders), 'fills': len(self.fills),
+                'balance': self.balance, 'book_updates': self.feed.updates}
+
+
+def _position_view(position):
+    return {key: value for key, value in position.items() if not key.startswith('_')}
+
+
+def create_app(exchange):
+    """FastAPI app serving exchange under /trade-api/v2 and the market-data websocket."""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await exchange.start()
+        yield
+        await exchange.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    api = APIRouter(prefix=API_PREFIX)
+
+    @app.middleware('http')
+    async def gate(request: Request, call_next):
+        """Authenticates, rate limits and delays every API request."""
+        path = request.url.path
+        if not path.startswith(API_PREFIX):
+            return await call_next(request)
+        exchange.requests += 1
+        try:
+            request.state.key = exchange.verify(request.headers, request.method, path)
+            exchange.throttle(request.state.key, request.method)
+        except ExchangeError as e:
+            return _error(e)
+        delay = exchange.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return await call_next(request)
+
+    @app.exception_handler(ExchangeError)
+    async def exchange_error(request: Request, error: ExchangeError):
+        return _error(error)
+
+    @api.get('/exchange/status')
+    async def exchange_status():
+        return _json({'exchange_active': True, 'trading_active': True})
+
+    @api.post('/logout')
+    async def logout():
+        return _json({})
+
+    @api.get('/events/{event_ticker}')
+    async def get_event(event_ticker: str):
+        tickers = exchange.event(event_ticker)
+        event = {'event_ticker': event_ticker, 'series_ticker': event_ticker.split('-')[0],
+                 'title': event_ticker, 'mutually_exclusive': True, 'category': 'Sports'}
+        return _json({'event': event, 'markets': [exchange.market_view(exchange.markets[t]) for t in tickers]})
+
+    @api.get('/series/{series_ticker}')
+    async def get_series(series_ticker: str):
+        return _json({'series': {'ticker': series_ticker, 'title': series_ticker, 'frequency': 'daily',
+                                 'category': 'Sports'}})
+
+    @api.get('/markets')
+    async def get_markets(event_ticker: str = None, tickers: str = None, limit: int = None, cursor: str = None):
+        if event_ticker:
+            selected = exchange.event(event_ticker)
+        elif tickers:
+            selected = [exchange.market(ticker).ticker for ticker in tickers.split(',')]
+        else:
+            selected = list(exchange.markets)
+        markets = [exchange.market_view(exchange.markets[ticker]) for ticker in selected]
+        return _json(_page(markets, 'markets', limit, cursor))
+
+    @api.get('/markets/trades')
+    async def get_trades(ticker: str = None, limit: int = None, cursor: str = None):
+        trades = [trade for trade in reversed(exchange.trades) if ticker is None or trade['ticker'] == ticker]
+        return _json(_page(trades, 'trades', limit, cursor))
+
+    @api.get('/markets/{ticker}')
+    async def get_market(ticker: str):
+        return _json({'market': exchange.market_view(exchange.market(ticker))})
+
+    @api.get('/markets/{ticker}/orderbook')
+    async def get_orderbook(ticker: str, depth: int = None):
+        return _json(exchange.orderbook(ticker, depth))
+
+    @api.get('/portfolio/balance')
+    async def get_balance():
+        return _json({'balance': exchange.balance})
+
+    @api.post('/portfolio/orders')
+    async def create_order(request: Request):
+        return _json({'order': exchange.place(loads(await request.body()))}, 201)
+
+    @api.post('/portfolio/orders/batched')
+    async def batch_create_orders(request: Request):
+        orders = loads(await request.body()).get('orders') or []
+        exchange.throttle(request.state.key, 'POST', max(len(orders) - 1, 0), paid=1)
+        results = []
+        for params in orders:
+            try:
+                results.append({'order': exchange.place(params), 'error': None})
+            except ExchangeError as e:
+                results.append({'order': None, 'error': {'code': e.code, 'message': e.message}})
+        return _json({'orders': results}, 201)
+
+    @api.delete('/portfolio/orders/batched')
+    async def batch_cancel_orders(request: Request):
+        order_ids = loads(await request.body()).get('ids') or []
+        exchange.throttle(request.state.key, 'DELETE', max(len(order_ids) - 1, 0), paid=1)
+        results = []
+        for order_id in order_ids:
+            try:
+                reduced = exchange.cancel(order_id)
+                results.append({'order_id': order_id, 'order': exchange.order(order_id), 'reduced_by': reduced,
+                                'error': None})
+            except ExchangeError as e:
+                results.append({'order_id': order_id, 'order': None, 'reduced_by': 0,
+                                'error': {'code': e.code, 'message': e.message}})
+        return _json({'orders': results})
+
+    @api.get('/portfolio/orders')
+    async def get_orders(ticker: str = None, event_ticker: str = None, status: str = None, limit: int = None,
+                         cursor: str = None):
+        orders = [order for order in reversed(exchange.orders.values())
+                  if (ticker is None or order['ticker'] == ticker)
+                  and (event_ticker is None or order['ticker'].startswith(event_ticker + '-'))
+                  and (status is None or order['status'] == status)]
+        return _json(_page(orders, 'orders', limit, cursor))
+
+    @api.get('/portfolio/orders/{order_id}')
+    async def get_order(order_id: str):
+        return _json({'order': exchange.order(order_id)})
+
+    @api.post('/portfolio/orders/{order_id}/decrease')
+    async def decrease_order(order_id: str, request: Request):
+        body = loads(await request.body())
+        exchange.decrease(order_id, body.get('reduce_by'), body.get('reduce_to'))
+        return _json({'order': exchange.order(order_id)})
+
+    @api.delete('/portfolio/orders/{order_id}')
+    @api.delete('/portfolio/orders/{order_id}/cancel')
+    async def cancel_order(order_id: str):
+        reduced = exchange.cancel(order_id)
+        return _json({'order': exchange.order(order_id), 'reduced_by': reduced})
+
+    @api.get('/portfolio/fills')
+    async def get_fills(ticker: str = None, order_id: str = None, limit: int = None, cursor: str = None):
+        fills = [fill for fill in reversed(exchange.fills)
+                 if (ticker is None or fill['ticker'] == ticker) and (order_id is None or fill['order_id'] == order_id)]
+        return _json(_page(fills, 'fills', limit, cursor))
+
+    @api.get('/portfolio/positions')
+    async def get_positions(ticker: str = None, event_ticker: str = None, limit: int = None, cursor: str = None):
+        positions = [_position_view(position) for position in exchange.positions.values()
+                     if (ticker is None or position['ticker'] == ticker)
+                     and (event_ticker is None or position['ticker'].startswith(event_ticker + '-'))]
+        page = _page(positions, 'market_positions', limit, cursor)
+        page['event_positions'] = []
+        return _json(page)
+
+    @api.get('/portfolio/settlements')
+    async def get_portfolio_settlements(limit: int = None, cursor: str = None):
+        return _json({'settlements': [], 'cursor': ''})
+
+    @app.get('/mock/stats')
+    async def mock_stats():
+        return _json(exchange.stats())
+
+    @app.websocket(WS_PATH)
+    async def market_data(websocket: WebSocket):
+        try:
+            exchange.verify(websocket.headers, 'GET', WS_PATH)
+        except ExchangeError:
+            await websocket.close(code=1008)
+            return
+        await websocket.accept()
+        await exchange.feed.handler(_WebSocketConnection(websocket))
+
+    app.include_router(api)
+    return app
+
+
+def load_or_create_key(path):
+    """Private key from a PEM file, which is created with a new key if it does not exist."""
+    from KalshiClientsBaseV2ApiKey import load_private_key
+    if not os.path.exists(path):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                        serialization.NoEncryption())
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as key_file:
+            key_file.write(pem)
+        print(f"Wrote a new key to {path}")
+    return load_private_key(path)
+
+
+async def benchmark(seconds, concurrency, latency, jitter, read_rate, write_rate, seed):
+    """Runs workers reading quotes and trading through an AsyncExchangeClient against the mock, and reports."""
+    import uvicorn
+    from kalshi_async_client import AsyncExchangeClient
+    from rate_limiter import RateLimiter
+
+    event_ticker = 'KXMLBGAME-25JUL04BOSNYY'
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    exchange = MockExchange(private_key.public_key(), read_rate, write_rate, latency, jitter,
+                            events=[event_ticker], seed=seed)
+    server = uvicorn.Server(uvicorn.Config(create_app(exchange), host='127.0.0.1', port=0, log_level='warning'))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    # Uncached, so every read reaches the mock; limited below the mock's rates so it should never answer 429
+    client = AsyncExchangeClient(f'http://127.0.0.1:{port}{API_PREFIX}', 'benchmark', private_key,
+                                 rate_limiter=RateLimiter(read_rate, write_rate), cache_responses=False,
+                                 hedge_reads=True)
+    tickers = exchange.event(event_ticker)
+    latencies = {}
+    errors = {}
+    stop_at = time.monotonic() + seconds
+
+    async def timed(name, call):
+        started = time.monotonic()
+        try:
+            result = await call
+        except Exception:
+            errors[name] = errors.get(name, 0) + 1
+            return None
+        latencies.setdefault(name, []).append(time.monotonic() - started)
+        return result
+
+    async def worker(n):
+        ticker = tickers[n % len(tickers)]
+        for i in itertools.count(n):
+            if time.monotonic() >= stop_at:
+                return
+            await timed('get_event', client.get_event(event_ticker=event_ticker))
+            await timed('get_orderbook', client.get_orderbook(ticker=ticker))
+            if i % 4 == 0:
+                order = {'ticker': ticker, 'side': 'yes', 'type': 'market', 'count': 1}
+                bought = await timed('create_order', client.create_order(
+                    client_order_id=str(uuid.uuid4()), action='buy', **order))
+                if bought is not None and bought['order']['fill_count']:
+                    await timed('create_order', client.create_order(
+                        client_order_id=str(uuid.uuid4()), action='sell', **order))
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.monotonic() - started
+    stats = client.connection_stats()
+    await client.close()
+    server.should_exit = True
+    await serving
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:,.1f}/s) with {concurrency} workers; "
+          f"mock latency {1000 * latency:.0f} ms + {1000 * jitter:.0f} ms mean tail")
+    for name, values in latencies.items():
+        values.sort()
+        print(f"{name:<14} {len(values):>6}  median {1000 * statistics.median(values):7.2f} ms  "
+              f"p99 {1000 * values[int(0.99 * (len(values) - 1))]:7.2f} ms  errors {errors.get(name, 0)}")
+    print(f"hedges fired {stats['hedges_fired']}, won {stats['hedges_won']}, skipped {stats['hedges_skipped']}")
+    print(f"exchange: {exchange.stats()}")
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument('--host', default='127.0.0.1')
+    arguments.add_argument('--port', type=int, default=8001)
+    arguments.add_argument('--key-file', default=None,
+                           help='PEM private key the clients sign with (created if missing); '
+                                'without it signatures are not verified')
+    arguments.add_argument('--read-rate', type=float, default=READ_RATE, help='reads per second per key')
+    arguments.add_argument('--write-rate', type=float, default=WRITE_RATE, help='writes per second per key')
+    arguments.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    arguments.add_argument('--jitter', type=float, default=0.0, help='mean extra delay in seconds (exponential)')
+    arguments.add_argument('--walk-rate', type=float, default=50.0, help='simulated book updates per second')
+    arguments.add_argument('--events', nargs='*', default=(), help='event tickers to create at startup')
+    arguments.add_argument('--seed', type=int, default=None)
+    arguments.add_argument('--benchmark', type=float, default=None, metavar='SECONDS',
+                           help='run an AsyncExchangeClient against the mock for SECONDS and report')
+    arguments.add_argument('--concurrency', type=int, default=8, help='benchmark workers')
+    args = arguments.parse_args()
+    if args.benchmark:
+        asyncio.run(benchmark(args.benchmark, args.concurrency, args.latency, args.jitter, args.read_rate,
+                              args.write_rate, args.seed))
+        return
+
+    import uvicorn
+    public_key = load_or_create_key(args.key_file).public_key() if args.key_file else None
+    exchange = MockExchange(public_key, args.read_rate, args.write_rate, args.latency, args.jitter,
+                            args.walk_rate, events=args.events, seed=args.seed)
+    print(f"Serving http://{args.host}:{args.port}{API_PREFIX}")
+    uvicorn.run(create_app(exchange), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Local copy of a Kalshi market's order book, with depth-aware fill pricing.
+
+Kalshi books hold bids only: a no bid at q cents is a yes ask at 100 - q, and
+vice versa. OrderBook keeps the resting size at every price (1-99 cents) per
+side in an array indexed by price, tracks the best bid per side so best bid and
+ask are O(1), and keeps cumulative size and cost arrays, rebuilt lazily after a
+change, so fill questions are a searchsorted away:
+
+    book = OrderBook.from_response(ticker, client.get_orderbook(ticker=ticker))
+    book.apply_delta('no', 47, -20)
+    book.buy_cost('yes', 150)        # cents to take 150 yes contracts off the book
+    book.marginal_ask('yes', 150)    # limit price that fills all 150
+    book.available_to_buy('yes', 55) # contracts offered at 55 cents or better
+
+Prices and costs are in cents.
+"""
+import numpy as np
+
+SIDES = ('yes', 'no')
+N_LEVELS = 100  # index = price in cents; 0 is never used
+_PRICES = np.arange(N_LEVELS + 1, dtype=np.int64)
+
+
+def _other(side):
+    return 'no' if side == 'yes' else 'yes'
+
+
+class OrderBook:
+    """
+    Parameters:
+    - ticker (str): Market ticker
+    """
+
+    def __init__(self, ticker=None):
+        self.ticker = ticker
+        self.bids = {side: np.zeros(N_LEVELS, dtype=np.int64) for side in SIDES}
+        self._best = {side: 0 for side in SIDES}
+        self._dirty = True
+
+    @classmethod
+    def from_snapshot(cls, ticker, levels):
+        """Book from {'yes': [[price, size], ...], 'no': [...]}, as in get_orderbook and the websocket snapshot."""
+        book = cls(ticker)
+        for side in SIDES:
+            for price, size in (levels or {}).get(side) or ():
+                book.bids[side][price] = size
+            nonzero = np.flatnonzero(book.bids[side] > 0)
+            book._best[side] = int(nonzero[-1]) if nonzero.size else 0
+        return book
+
+    @classmethod
+    def from_response(cls, ticker, response):
+        """Book from an ExchangeClient.get_orderbook response; empty sides come back as null."""
+        return cls.from_snapshot(ticker, response.get('orderbook'))
+
+    def copy(self):
+        book = OrderBook(self.ticker)
+        book.bids = {side: levels.copy() for side, levels in self.bids.items()}
+        book._best = dict(self._best)
+        return book
+
+    def apply_delta(self, side, price, delta):
+        """Adds delta contracts at a price on a side; sizes never go below zero."""
+        levels = self.bids[side]
+        size = max(int(levels[price]) + delta, 0)
+        levels[price] = size
+        self._dirty = True
+        best = self._best[side]
+        if size > 0 and price > best:
+            self._best[side] = price
+        elif size == 0 and price == best:
+            nonzero = np.flatnonzero(levels[:price] > 0)
+            self._best[side] = int(nonzero[-1]) if nonzero.size else 0
+
+    def best_bid(self, side):
+        """Best bid in cents, or None if the side is empty."""
+        return self._best[side] or None
+
+    def best_ask(self, side):
+        """Best ask in cents, i.e. 100 minus the other side's best bid, or None if there is none."""
+        other = self._best[_other(side)]
+        return 100 - other if other else None
+
+    def quote(self):
+        """Top of book in the shape of a get_event market; an empty side quotes a 0 bid and 100 ask."""
+        yes_bid, no_bid = self._best['yes'], self._best['no']
+        return {'ticker': self.ticker, 'yes_bid': yes_bid, 'no_bid': no_bid,
+                'yes_ask': 100 - no_bid if no_bid else 100, 'no_ask': 100 - yes_bid if yes_bid else 100}
+
+    def snapshot(self):
+        return {side: [[int(price), int(self.bids[side][price])] for price in np.flatnonzero(self.bids[side])]
+                for side in SIDES}
+
+    def _rebuild(self):
+        """Cumulative size and cost, by price, of the asks (cheapest first) and bids (highest first) per side."""
+        self._ask_size, self._ask_cost, self._bid_size, self._bid_cost = {}, {}, {}, {}
+        for side in SIDES:
+            asks = np.zeros(N_LEVELS + 1, dtype=np.int64)
+            asks[1:N_LEVELS] = self.bids[_other(side)][N_LEVELS - 1:0:-1]
+            self._ask_size[side] = np.cumsum(asks)
+            self._ask_cost[side] = np.cumsum(asks * _PRICES)
+            # Bids from 99 down; position j holds price 99 - j
+            bids = self.bids[side][::-1]
+            self._bid_size[side] = np.cumsum(bids)
+            self._bid_cost[side] = np.cumsum(bids * _PRICES[N_LEVELS - 1::-1])
+        self._dirty = False
+
+    def ask_depth(self, side):
+        """Array where [price] is the contracts offered on a side at that price or better."""
+        if self._dirty:
+            self._rebuild()
+        return self._ask_size[side]
+
+    def available_to_buy(self, side, limit):
+        return int(self.ask_depth(side)[min(max(limit, 0), N_LEVELS)])
+
+    def available_to_sell(self, side, limit):
+        """Contracts bid on a side at limit cents or more."""
+        if self._dirty:
+            self._rebuild()
+        if limit >= N_LEVELS:
+            return 0
+        return int(self._bid_size[side][N_LEVELS - 1 - max(limit, 0)])
+
+    def marginal_ask(self, side, count):
+        """Price of the last of count contracts bought by walking the asks, or None if the book is too thin."""
+        price = int(np.searchsorted(self.ask_depth(side), count))
+        return price if count > 0 and price < N_LEVELS else None
+
+    def buy_cost(self, side, count):
+        """Cents paid to buy count contracts by walking the asks, or None if the book is too thin."""
+        price = self.marginal_ask(side, count)
+        if price is None:
+            return None
+        filled = self._ask_size[side][price - 1]
+        return int(self._ask_cost[side][price - 1] + (count - filled) * price)
+
+    def marginal_bid(self, side, count):
+        """Price of the last of count contracts sold into the bids, or None if the book is too thin."""
+        if self._dirty:
+            self._rebuild()
+        position = int(np.searchsorted(self._bid_size[side], count))
+        return N_LEVELS - 1 - position if count > 0 and position < N_LEVELS - 1 else None
+
+    def sell_proceeds(self, side, count):
+        """Cents received for selling count contracts into the bids, or None if the book is too thin."""
+        price = self.marginal_bid(side, count)
+        if price is None:
+            return None
+        position = N_LEVELS - 1 - price
+        filled = self._bid_size[side][position - 1] if position else 0
+        cost = self._bid_cost[side][position - 1] if position else 0
+        return int(cost + (count - filled) * price)
+
+    def vwap(self, side, count, action='buy'):
+        """Average fill price in cents for count contracts, or None if the book is too thin."""
+        total = self.buy_cost(side, count) if action == 'buy' else self.sell_proceeds(side, count)
+        return None if total is None else total / count
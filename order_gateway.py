@@ -0,0 +1,206 @@
+"""
+Coalesces order placements and cancels into Kalshi's batch endpoints.
+
+Orders submitted within a short window of each other, or together as one
+decision, go out as a single batch_create_orders request (cancels as a single
+batch_cancel_orders). Each caller gets back its own order's result:
+
+    gateway = OrderGateway(client)            # an AsyncExchangeClient
+    result = await gateway.submit(order)      # joins any batch forming in the next few ms
+    results = await gateway.submit_many([sell, buy])  # one round-trip, results in order
+
+A result is the order's entry from the batch response ({'order': {...}}), the
+same shape create_order returns. An order the exchange rejects inside a batch
+raises OrderError for its caller only; an order sent on its own raises
+create_order's HttpError. submit_many returns the error in that order's place.
+
+Batch endpoints are limited to some Kalshi access tiers. If the exchange refuses
+them (403/404), the gateway switches to concurrent single-order requests.
+"""
+import asyncio
+import logging
+import uuid
+
+from KalshiClientsBaseV2ApiKey import HttpError
+
+# Kalshi accepts at most this many orders (or cancels) per batch request
+MAX_BATCH = 20
+# Seconds a batch stays open for further orders after the first one arrives
+BATCH_WINDOW = 0.005
+# Statuses meaning the batch endpoints are not available to this account
+BATCH_UNAVAILABLE = (403, 404)
+
+
+class OrderError(Exception):
+    """An order or cancel the exchange rejected inside a batch."""
+    def __init__(self, error, request):
+        super().__init__(error.get('message') or error.get('code') or str(error) if isinstance(error, dict)
+                         else str(error))
+        self.error = error
+        self.request = request
+
+
+class _Batcher:
+    """Collects requests for one batch endpoint and fans the per-request results back to the callers."""
+
+    def __init__(self, gateway, send_batch, send_one, window, max_batch):
+        self.gateway = gateway
+        self.send_batch = send_batch
+        self.send_one = send_one
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._sending = set()  # in-flight send tasks, referenced until done
+        self.batches = 0
+        self.requests = 0
+
+    def add(self, request):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush_now)
+        return future
+
+    def add_many(self, requests):
+        """Adds requests and flushes at once, together with anything already waiting."""
+        futures = [self.add(request) for request in requests]
+        if self._pending:
+            self._flush_now()
+        return futures
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for start in range(0, len(pending), self.max_batch):
+            task = asyncio.ensure_future(self._send(pending[start:start + self.max_batch]))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, entries):
+        requests = [request for request, _ in entries]
+        self.requests += len(requests)
+        try:
+            if len(requests) > 1 and self.gateway.batching:
+                self.batches += 1
+                try:
+                    results = await self.send_batch(requests)
+                except HttpError as e:
+                    if e.status not in BATCH_UNAVAILABLE:
+                        raise
+                    logging.warning(f"Batch endpoint unavailable ({e}), sending orders one at a time")
+                    self.gateway.batching = False
+                else:
+                    for (request, future), result in zip(entries, results):
+                        _resolve(future, request, result)
+                    return
+            results = await asyncio.gather(*(self.send_one(request) for request in requests),
+                                           return_exceptions=True)
+            for (request, future), result in zip(entries, results):
+                if isinstance(result, BaseException):
+                    if not future.done():
+                        future.set_exception(result)
+                else:
+                    _resolve(future, request, result)
+        except BaseException as e:
+            # The whole request failed, or was cancelled: every caller in it gets the error
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+
+def _resolve(future, request, result):
+    if future.done():
+        return
+    error = result.get('error') if isinstance(result, dict) else None
+    if error:
+        future.set_exception(OrderError(error, request))
+    else:
+        future.set_result(result)
+
+
+def _batch_results(response, key, count):
+    """The per-request entries of a batch response, padded to count so every caller is answered."""
+    results = list(response.get(key) or [])
+    missing = {'error': {'message': 'No result for this request in the batch response'}}
+    return results + [missing] * (count - len(results))
+
+
+class OrderGateway:
+    """
+    Parameters:
+    - client (AsyncExchangeClient): Client the batches are sent with
+    - window (float): Seconds a batch waits for more orders after its first
+    - max_batch (int): Most orders (or cancels) per request
+    """
+
+    def __init__(self, client, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.client = client
+        self.batching = True
+        self._orders = _Batcher(self, self._create_batch, self._create_one, window, max_batch)
+        self._cancels = _Batcher(self, self._cancel_batch, self._cancel_one, window, max_batch)
+
+    async def _create_batch(self, orders):
+        response = await self.client.batch_create_orders(orders)
+        return _batch_results(response, 'orders', len(orders))
+
+    async def _create_one(self, order):
+        return await self.client.create_order(**order)
+
+    async def _cancel_batch(self, order_ids):
+        response = await self.client.batch_cancel_orders(order_ids)
+        return _batch_results(response, 'orders', len(order_ids))
+
+    async def _cancel_one(self, order_id):
+        return await self.client.cancel_order(order_id)
+
+    @staticmethod
+    def _prepare(order):
+        """create_order arguments without unset fields, with a unique client_order_id if none was given."""
+        order = {key: value for key, value in order.items() if value is not None}
+        order.setdefault('client_order_id', str(uuid.uuid4()))
+        return order
+
+    async def submit(self, order):
+        """
+        Places one order, batched with any others submitted in the same window.
+
+        Parameters:
+        - order (dict): create_order arguments
+
+        Returns:
+        - dict: The order's result. Raises OrderError or HttpError if the exchange rejected it.
+        """
+        return await self._orders.add(self._prepare(order))
+
+    async def submit_many(self, orders):
+        """
+        Places orders together in one request (more than MAX_BATCH are split).
+
+        Returns:
+        - list: Per-order result, or the OrderError/exception for orders that failed, in order
+        """
+        futures = self._orders.add_many([self._prepare(order) for order in orders])
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def cancel(self, order_id):
+        return await self._cancels.add(order_id)
+
+    async def cancel_many(self, order_ids):
+        futures = self._cancels.add_many(list(order_ids))
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    def stats(self):
+        return {
+            'batching': self.batching,
+            'orders': self._orders.requests,
+            'order_batches': self._orders.batches,
+            'cancels': self._cancels.requests,
+            'cancel_batches': self._cancels.batches,
+        }
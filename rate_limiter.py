@@ -0,0 +1,266 @@
+"""
+Token-bucket rate limiting for Kalshi API calls.
+
+Reads and writes draw from separate buckets sized to SAFETY_MARGIN (90%) of
+Kalshi's Basic-tier limits (20 reads/s, 10 writes/s), so clock skew and network
+jitter do not push us over the exchange's own bucket. A 429 drains the bucket for
+the Retry-After the server asked for, or one token's time without it. Each bucket serves its waiters strictly by priority
+lane, then arrival order, so an order placement or cancel never waits behind a
+queue of market-data polls. The same limiter can be shared by sync clients
+(acquire) and async clients (acquire_async), since the budget belongs to the
+account, not the client.
+
+The lane for a request comes from its method (writes default to URGENT, reads to
+NORMAL) unless the caller overrides it:
+
+    with request_priority(BACKGROUND):
+        client.get_event(event_ticker=ticker)
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from request_timing import DeadlineExceeded
+
+# Priority lanes; lower numbers are served first
+URGENT = 0
+NORMAL = 1
+BACKGROUND = 2
+LANE_NAMES = {URGENT: 'urgent', NORMAL: 'normal', BACKGROUND: 'background'}
+
+# Kalshi Basic-tier limits, requests per second
+READ_RATE = 20
+WRITE_RATE = 10
+# Fraction of the documented limits the limiter actually uses
+SAFETY_MARGIN = 0.9
+WRITE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+_priority = contextvars.ContextVar('kalshi_request_priority', default=None)
+
+
+@contextmanager
+def request_priority(lane):
+    """Runs the requests made inside the with-block (in this thread or task) in the given lane."""
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def request_kind(method):
+    return 'write' if method.upper() in WRITE_METHODS else 'read'
+
+
+def retry_after_seconds(value):
+    """Seconds from a Retry-After header value, or None if it is missing or not a number of seconds."""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Parameters:
+    - rate (float): Tokens added per second
+    - capacity (float): Most tokens held at once, i.e. the largest burst (default: one second's worth)
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available, without taking it."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """Takes a token if one is available. Returns 0, or the seconds until the next token."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def drain(self, now, seconds=0.0):
+        """Empties the bucket and keeps it empty for the given seconds (tokens go negative)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class LaneMetrics:
+    def __init__(self):
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait):
+        self.acquired += 1
+        if wait > 0:
+            self.throttled += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def as_dict(self):
+        return {
+            'acquired': self.acquired,
+            'throttled': self.throttled,
+            'mean_wait_ms': 1000 * self.total_wait / self.acquired if self.acquired else 0.0,
+            'max_wait_ms': 1000 * self.max_wait,
+        }
+
+
+class RateLimiter:
+    """
+    Parameters:
+    - read_rate (float): Reads per second allowed by the exchange
+    - write_rate (float): Writes per second allowed by the exchange
+    - burst (float): Bucket capacity in seconds of rate (default 1)
+    - margin (float): Fraction of the rates, and of the burst, actually used
+    """
+
+    def __init__(self, read_rate=READ_RATE, write_rate=WRITE_RATE, burst=1.0, margin=SAFETY_MARGIN):
+        read_rate, write_rate = read_rate * margin, write_rate * margin
+        self.buckets = {'read': TokenBucket(read_rate, read_rate * burst),
+                        'write': TokenBucket(write_rate, write_rate * burst)}
+        self._queues = {kind: [] for kind in self.buckets}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._sequence = itertools.count()
+        self._metrics = {(kind, lane): LaneMetrics() for kind in self.buckets for lane in LANE_NAMES}
+        self.server_throttles = {kind: 0 for kind in self.buckets}
+
+    def lane_for(self, method):
+        lane = _priority.get()
+        if lane is not None:
+            return lane
+        return URGENT if request_kind(method) == 'write' else NORMAL
+
+    def _enqueue(self, kind, lane):
+        entry = (lane, next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._queues[kind], entry)
+        return entry
+
+    def _leave(self, kind, entry):
+        with self._lock:
+            queue = self._queues[kind]
+            queue.remove(entry)
+            heapq.heapify(queue)
+            self._changed.notify_all()
+
+    def _poll(self, kind, entry):
+        """Takes a token for entry if it is first in line. Returns 0 on success, else seconds to wait."""
+        with self._lock:
+            bucket = self.buckets[kind]
+            queue = self._queues[kind]
+            if queue[0] != entry:
+                # Not our turn: check again once the bucket could have another token
+                return max(bucket.wait_time(time.monotonic()), 0.25 / bucket.rate)
+            wait = bucket.take(time.monotonic())
+            if wait == 0:
+                heapq.heappop(queue)
+                self._changed.notify_all()
+            return wait
+
+    def acquire(self, method='GET', timeout=None):
+        """Blocks the calling thread until the request may be sent. Returns the seconds waited.
+        Raises DeadlineExceeded if no token can be had within timeout seconds."""
+        kind = request_kind(method)
+        lane = self.lane_for(method)
+        entry = self._enqueue(kind, lane)
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._poll(kind, entry)
+                if wait == 0:
+                    break
+                if timeout is not None and time.monotonic() + wait > start + timeout:
+                    raise DeadlineExceeded(f'No {kind} token within {timeout:.3f}s')
+                with self._changed:
+                    self._changed.wait(wait)
+        except BaseException:
+            self._leave(kind, entry)
+            raise
+        return self._record(kind, lane, start)
+
+    async def acquire_async(self, method='GET', timeout=None):
+        """Waits, without blocking the event loop, until the request may be sent. Returns the seconds waited.
+        Raises DeadlineExceeded if no token can be had within timeout seconds."""
+        kind = request_kind(method)
+        lane = self.lane_for(method)
+        entry = self._enqueue(kind, lane)
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._poll(kind, entry)
+                if wait == 0:
+                    break
+                if timeout is not None and time.monotonic() + wait > start + timeout:
+                    raise DeadlineExceeded(f'No {kind} token within {timeout:.3f}s')
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._leave(kind, entry)
+            raise
+        return self._record(kind, lane, start)
+
+    def try_acquire(self, method='GET'):
+        """Takes a token only if one is free now and nobody is queued for it. Returns whether it did."""
+        kind = request_kind(method)
+        lane = self.lane_for(method)
+        with self._lock:
+            if self._queues[kind] or self.buckets[kind].take(time.monotonic()) != 0:
+                return False
+            self._metrics[(kind, lane)].record(0.0)
+        return True
+
+    def _record(self, kind, lane, start):
+        waited = time.monotonic() - start
+        with self._lock:
+            self._metrics[(kind, lane)].record(waited if waited > 1e-4 else 0.0)
+        return waited
+
+    def record_server_throttle(self, method, retry_after=None):
+        """
+        Counts a 429 from the server, i.e. a request the limiter should have held back,
+        and drains the bucket so nothing more is sent until the server's budget is back.
+
+        Parameters:
+        - method (str): Method of the throttled request
+        - retry_after (float): Seconds from the response's Retry-After header, if any;
+          without it the bucket is held empty for one token's time
+        """
+        kind = request_kind(method)
+        with self._lock:
+            self.server_throttles[kind] += 1
+            bucket = self.buckets[kind]
+            bucket.drain(time.monotonic(), 1 / bucket.rate if retry_after is None else retry_after)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                kind: {
+                    'rate': self.buckets[kind].rate,
+                    'queued': len(self._queues[kind]),
+                    'server_throttles': self.server_throttles[kind],
+                    'lanes': {LANE_NAMES[lane]: self._metrics[(kind, lane)].as_dict() for lane in LANE_NAMES},
+                }
+                for kind in self.buckets
+            }
+
+
+# Shared by every client in the process, since Kalshi's limits are per account
+default_limiter = RateLimiter()
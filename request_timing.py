@@ -0,0 +1,107 @@
+"""
+Deadlines and latency tracking for Kalshi API calls.
+
+A deadline bounds everything a call does: waiting for a rate-limit token,
+waiting on a shared (single-flight) read, and the HTTP request itself. Like
+request_priority, it applies to every client call made inside the with-block,
+in this thread or task, so no method signature changes:
+
+    with request_deadline(0.25):
+        event = await client.get_event(event_ticker=ticker)  # DeadlineExceeded after 250 ms
+
+Nested deadlines never extend an outer one. Without a deadline, calls are still
+bounded by the client's timeout.
+
+LatencyTracker keeps recent latencies per endpoint, so the clients can hedge a
+read that is slower than its usual p95.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_deadline = contextvars.ContextVar('kalshi_request_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call could not finish before its request_deadline."""
+
+
+@contextmanager
+def request_deadline(seconds):
+    """Calls made inside the with-block must finish within seconds from now."""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current deadline (possibly negative), or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(default):
+    """
+    Timeout for the next blocking step of a call: the time left before the
+    deadline, capped by the client's default timeout.
+
+    Raises:
+    - DeadlineExceeded: If the deadline has already passed
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded('Request deadline exceeded')
+    return left if default is None else min(default, left)
+
+
+def endpoint_key(path):
+    """Latency bucket for a path: /events/X -> events, /markets/X/orderbook -> markets/orderbook."""
+    parts = path.split('?', 1)[0].strip('/').split('/')
+    return parts[0] if len(parts) < 3 else parts[0] + '/' + parts[-1]
+
+
+class LatencyTracker:
+    """
+    Parameters:
+    - window (int): Recent latencies kept per endpoint
+    - min_samples (int): Latencies needed before an endpoint's quantile is trusted
+    - quantile (float): Quantile returned by hedge_delay
+    """
+
+    def __init__(self, window=200, min_samples=20, quantile=0.95):
+        self.window = window
+        self.min_samples = min_samples
+        self.quantile = quantile
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def hedge_delay(self, key):
+        """The endpoint's latency quantile in seconds, or None until enough samples are in."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(int(self.quantile * len(ordered)), len(ordered) - 1)]
+
+    def summary(self):
+        with self._lock:
+            keys = list(self._samples)
+        return {key: {'samples': len(self._samples[key]),
+                      'hedge_after_ms': 1000 * delay if (delay := self.hedge_delay(key)) is not None else None}
+                for key in keys}
@@ -0,0 +1,183 @@
+"""
+Short-lived cache for Kalshi market-data reads.
+
+Every /ws connection and every game-state message asks for the same event, so
+identical GETs multiply with connections and pitches. The clients route GETs of
+cacheable endpoints (events, markets, series, orderbooks) through a
+ResponseCache:
+
+- Entries expire after a per-endpoint TTL, and the least recently used entry is
+  evicted once max_entries is reached.
+- Concurrent requests for the same path share one HTTP call (single-flight), for
+  threads and asyncio tasks alike.
+- A write (order placement, cancel, ...) drops the cached entries for the market
+  and event it touches, or every entry when the request does not name a ticker.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from fast_json import DecodeError, loads
+
+# (path pattern, seconds); the first match wins, paths without a match are not cached
+DEFAULT_TTLS = (
+    (re.compile(r'^/markets/[^/?]+/orderbook'), 0.25),
+    (re.compile(r'^/events/[^/?]+(\?|$)'), 1.0),
+    # /markets/trades is a paginated list, not a market
+    (re.compile(r'^/markets/(?!trades(\?|$))[^/?]+(\?|$)'), 1.0),
+    (re.compile(r'^/series/[^/?]+(\?|$)'), 60.0),
+)
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def cache_key(path, params=None):
+    """Cache key for a GET; params are usually already in the path's query string."""
+    if not params:
+        return path
+    return path + '#' + json.dumps(params, sort_keys=True, default=str)
+
+
+def _tickers(body):
+    """Tickers named by a write request body, or None if it names none."""
+    if not body:
+        return None
+    try:
+        payload = loads(body) if isinstance(body, (str, bytes)) else body
+    except DecodeError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    tickers = {payload['ticker']} if payload.get('ticker') else set()
+    for order in payload.get('orders') or ():
+        if isinstance(order, dict) and order.get('ticker'):
+            tickers.add(order['ticker'])
+    return tickers or None
+
+
+class ResponseCache:
+    """
+    Parameters:
+    - ttls (tuple): (compiled path pattern, TTL seconds) pairs, checked in order
+    - max_entries (int): Entries kept before least-recently-used eviction
+    """
+
+    def __init__(self, ttls=DEFAULT_TTLS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+        # Bumped on every invalidation, so a response fetched before a write is not stored after it
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def ttl_for(self, path):
+        for pattern, ttl in self.ttls:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            return False, None
+
+    def _store(self, key, value, ttl, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_fetch(self, key, ttl, fetch, timeout=None):
+        """Returns the cached value for key, or calls fetch() once for all concurrent callers and caches it.
+        Callers waiting on another's fetch give up after timeout seconds (TimeoutError)."""
+        found, value = self._lookup(key)
+        if found:
+            return value
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = Future()
+                self._flights[key] = flight
+                self.misses += 1
+                generation = self._generation
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result(timeout)
+        try:
+            value = fetch()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            self._store(key, value, ttl, generation)
+            flight.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    async def get_or_fetch_async(self, key, ttl, fetch):
+        """Async version of get_or_fetch; fetch is a coroutine function."""
+        found, value = self._lookup(key)
+        if found:
+            return value
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            # shield: a cancelled follower must not cancel the shared request
+            return await asyncio.shield(flight)
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+        flight = asyncio.ensure_future(fetch())
+        self._async_flights[key] = flight
+        try:
+            value = await asyncio.shield(flight)
+        finally:
+            if self._async_flights.get(key) is flight:
+                del self._async_flights[key]
+        self._store(key, value, ttl, generation)
+        return value
+
+    def invalidate(self, tickers=None):
+        """Drops entries whose path mentions any of the tickers or their events; all entries if tickers is None."""
+        with self._lock:
+            self._generation += 1
+            if tickers is None:
+                self._entries.clear()
+                return
+            names = set(tickers)
+            # Market tickers are the event ticker plus a suffix, e.g. KXMLBGAME-25JUL04BOSNYY-NYY
+            names.update(ticker.rsplit('-', 1)[0] for ticker in tickers if '-' in ticker)
+            for key in [key for key in self._entries if any(name in key for name in names)]:
+                del self._entries[key]
+
+    def invalidate_write(self, body):
+        self.invalidate(_tickers(body))
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'coalesced': self.coalesced, 'evictions': self.evictions}
@@ -0,0 +1,244 @@
+"""
+Shares the compiled win-expectancy table between uvicorn workers.
+
+A loader process publishes the table once into a multiprocessing.shared_memory
+segment (same layout as the compiled artifact), and each worker attaches to it
+read-only without copying or parsing anything:
+
+    python -m shared_tables serve --app main2:app --workers 4
+
+Workers find the segment through the MLB_TABLES_SHM environment variable and fall
+back to memory-mapping the compiled artifact when it is not set. Each serve run
+publishes under its own name (mlb_win_tables_<pid> unless --name is given), and
+publishing never replaces an existing segment, which may still be in use.
+
+A reload in any worker is shared with the others through a SharedTableChannel:
+the reloading worker publishes the new table as the next generation (<name>_<n>)
+and bumps the generation number in the <name>_control segment, and every worker's
+TableRegistry attaches to it on its next acquire.
+"""
+import argparse
+import os
+import signal
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from getExpectedStats import load_win_expectancy_table, pack_table, unpack_table
+
+SHM_NAME = 'mlb_win_tables'
+SHM_ENV = 'MLB_TABLES_SHM'
+CONTROL_SUFFIX = '_control'
+
+# Attached segments must stay open for as long as their arrays are in use
+_attached = {}
+
+
+def default_name():
+    """Segment name for this process, so concurrent or restarted publishers never collide."""
+    return f'{SHM_NAME}_{os.getpid()}'
+
+
+def generation_name(name, generation):
+    """Segment name of one generation of a serve run's tables; generation 0 is the one serve publishes."""
+    return name if generation == 0 else f'{name}_{generation}'
+
+
+def publish_table(table=None, name=SHM_NAME):
+    """
+    Copies a table into a new shared memory segment.
+
+    Parameters:
+    - table (WinExpectancyTable): Table to publish (default: the compiled artifact)
+    - name (str): Segment name
+
+    Returns:
+    - shm (SharedMemory): The segment; the caller owns it and must unlink it on shutdown
+
+    Raises:
+    - FileExistsError: If a segment with that name exists. It may belong to a live
+      publisher whose workers are attached, so it is never unlinked here; a stale
+      one left by a crashed run can be removed with `python -m shared_tables unlink`.
+    """
+    if table is None:
+        table = load_win_expectancy_table()
+    header, placed = pack_table(table, table.metadata.get('sources'))
+    size = max(offset + array.nbytes for offset, array in placed)
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        raise FileExistsError(f"Shared memory segment '{name}' already exists; another publisher may be "
+                              f"serving it") from None
+    shm.buf[:len(header)] = header
+    for offset, array in placed:
+        np.frombuffer(shm.buf, dtype=array.dtype, count=array.size, offset=offset)[:] = array.reshape(-1)
+    return shm
+
+
+def _untrack(shm):
+    # Creating or attaching registers the segment with this process's resource tracker,
+    # which would unlink it when the process exits, even while other workers still use it
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _open_untracked(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return _untrack(shared_memory.SharedMemory(name=name))
+
+
+def _unlink(name):
+    try:
+        # Opened tracked: unlink() unregisters the segment again
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def attach_table(name=SHM_NAME):
+    """Returns a read-only WinExpectancyTable backed directly by a published segment."""
+    shm = _attached.get(name)
+    if shm is None:
+        shm = _open_untracked(name)
+        _attached[name] = shm
+    table = unpack_table(shm.buf.toreadonly())
+    table.metadata['shm_name'] = name
+    return table
+
+
+class SharedTableChannel:
+    """
+    The generation counter of a serve run, through which workers share reloads.
+
+    Parameters:
+    - name (str): Base segment name, as published by serve
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._control = _open_untracked(name + CONTROL_SUFFIX)
+
+    @classmethod
+    def create(cls, name):
+        """Creates the control segment at generation 0; the caller unlinks it with close(unlink=True)."""
+        _untrack(shared_memory.SharedMemory(name=name + CONTROL_SUFFIX, create=True, size=8)).close()
+        return cls(name)
+
+    def generation(self):
+        return struct.unpack_from('<q', self._control.buf)[0]
+
+    def attach(self, generation):
+        """Read-only table of a generation; raises FileNotFoundError if it has been superseded and removed."""
+        table = attach_table(generation_name(self.name, generation))
+        table.metadata['shm_generation'] = generation
+        return table
+
+    def publish(self, table):
+        """
+        Publishes a validated table as the next generation, points every worker at it
+        and removes the segment it replaces (workers still holding that one keep their
+        mapping until they let go of it).
+
+        Returns:
+        - generation (int), table (WinExpectancyTable): The new generation and a table attached to it
+
+        Raises:
+        - FileExistsError: If another worker is publishing the same generation
+        """
+        previous = self.generation()
+        generation = previous + 1
+        _untrack(publish_table(table, generation_name(self.name, generation))).close()
+        attached = self.attach(generation)
+        struct.pack_into('<q', self._control.buf, 0, generation)
+        _unlink(generation_name(self.name, previous))
+        return generation, attached
+
+    def close(self, unlink=False):
+        """Releases the control segment; with unlink, also removes it and the current generation."""
+        generation = self.generation()
+        self._control.close()
+        if unlink:
+            _unlink(generation_name(self.name, generation))
+            _unlink(self.name + CONTROL_SUFFIX)
+
+
+def open_channel():
+    """The channel of the serve run named by MLB_TABLES_SHM, or None outside one."""
+    name = os.environ.get(SHM_ENV)
+    if not name:
+        return None
+    try:
+        return SharedTableChannel(name)
+    except FileNotFoundError as e:
+        print(f"Could not open shared tables '{name}': {e}")
+        return None
+
+
+def load_table(channel=None):
+    """Attaches to the current generation of a channel if given, otherwise maps the compiled artifact."""
+    if channel is not None:
+        try:
+            return channel.attach(channel.generation())
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Could not attach shared tables '{channel.name}': {e}")
+    return load_win_expectancy_table()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m shared_tables', description="Shared-memory table loader")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="Publish the tables and hold them until terminated")
+    serve_parser.add_argument('--name', default=None, help="segment name (default: unique per run)")
+    serve_parser.add_argument('--app', help="ASGI app to run with uvicorn workers, e.g. main2:app")
+    serve_parser.add_argument('--workers', type=int, default=1)
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    unlink_parser = commands.add_parser('unlink', help="Remove a segment left behind by a crashed publisher")
+    unlink_parser.add_argument('name')
+    args = parser.parse_args(argv)
+
+    if args.command == 'unlink':
+        stale = shared_memory.SharedMemory(name=args.name)
+        stale.close()
+        stale.unlink()
+        return 0
+    args.name = args.name or default_name()
+    try:
+        shm = _untrack(publish_table(name=args.name))
+    except FileExistsError as e:
+        print(e)
+        return 1
+    size = shm.size
+    shm.close()
+    try:
+        channel = SharedTableChannel.create(args.name)
+    except FileExistsError as e:
+        _unlink(args.name)
+        print(e)
+        return 1
+    os.environ[SHM_ENV] = args.name
+    print(f"Published tables to shared memory '{args.name}' ({size / 1e6:.1f} MB)")
+    try:
+        if args.app:
+            import uvicorn
+            # Workers are spawned by this process and inherit MLB_TABLES_SHM
+            uvicorn.run(args.app, host=args.host, port=args.port, workers=args.workers)
+        else:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Workers may have reloaded since; remove whichever generation is current
+        channel.close(unlink=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
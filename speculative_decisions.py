@@ -0,0 +1,273 @@
+"""
+Speculative decisions for the game states that can follow the current one.
+
+Between pitches the server is idle. After each game-state message, main2 refreshes
+the Kalshi quote and, in a worker thread, evaluates every legal successor state
+(the same state, ball, strike, each out type, each hit and walk), so that when the
+next message arrives its decision, including the order payloads, is a dictionary
+lookup. A
+cached decision is only used while the market's top of book and the table version
+are the ones it was computed from, and only if it came from the latest speculation:
+a cancelled one whose worker thread finishes late cannot replace newer decisions.
+
+States are (inning, home_away, outs, bases mask, score_diff, balls, strikes) tuples,
+with score diffs as home minus away like everywhere in main2.
+"""
+import time
+import threading
+from collections import namedtuple
+
+from game_simulator import model_confidence
+
+# Decisions made from a quote older than this are recomputed even if the top of book is unchanged
+QUOTE_MAX_AGE = 5.0
+QUOTE_FIELDS = ('ticker', 'yes_bid', 'yes_ask', 'no_bid', 'no_ask')
+
+# effects holds one (balance change, yes change, no change) per order, for applying fills one order at a time
+Decision = namedtuple('Decision', ['state', 'win', 'leverage', 'expected_runs', 'confidence', 'fallback',
+                                   'simulation', 'quote', 'orders', 'effects', 'balance', 'yes_contracts',
+                                   'no_contracts'])
+
+
+def _advance(bases, steps, batter=0):
+    """
+    Moves every runner forward a number of bases and places the batter.
+
+    Parameters:
+    - bases (int): Bases mask (first | second << 1 | third << 2)
+    - steps (int): Bases each runner advances
+    - batter (int): Base the batter reaches (0 if out, 4 for a home run)
+
+    Returns:
+    - bases (int), runs (int): New bases mask and runs scored
+    """
+    new_bases, runs = 0, 0
+    for base in (1, 2, 3):
+        if bases & (1 << (base - 1)):
+            if base + steps > 3:
+                runs += 1
+            else:
+                new_bases |= 1 << (base + steps - 1)
+    if batter == 4:
+        runs += 1
+    elif batter:
+        new_bases |= 1 << (batter - 1)
+    return new_bases, runs
+
+
+def _force(bases):
+    """Bases mask and runs after a walk: only forced runners move."""
+    if not bases & 1:
+        return bases | 1, 0
+    if not bases & 2:
+        return bases | 3, 0
+    if not bases & 4:
+        return 7, 0
+    return 7, 1
+
+
+def _after_play(state, outs_made, bases, runs):
+    """State after a plate appearance ends; a third out ends the half-inning and cancels its runs."""
+    inning, home_away, outs, _, score_diff, _, _ = state
+    outs += outs_made
+    if outs >= 3:
+        if home_away == 0:
+            return (inning, 1, 0, 0, score_diff, 0, 0)
+        return (inning + 1, 0, 0, 0, score_diff, 0, 0)
+    score_diff += runs if home_away == 1 else -runs
+    return (inning, home_away, outs, bases, score_diff, 0, 0)
+
+
+def successor_states(state):
+    """
+    Yields (event, state) pairs for every outcome of the next pitch.
+
+    Events are unchanged (the same state again, e.g. after a foul with two strikes or
+    a pickoff throw), ball, strike, walk, strikeout, groundout, flyout (a sacrifice
+    fly with a runner on third and fewer than two outs), double_play (with a runner
+    on first and fewer than two outs), single, double, triple and home_run. Runners
+    advance one base on a groundout or single, two on a double, and score on a
+    triple. Several events can lead to the same state.
+    """
+    inning, home_away, outs, bases, score_diff, balls, strikes = state
+    yield 'unchanged', state
+    if balls < 3:
+        yield 'ball', (inning, home_away, outs, bases, score_diff, balls + 1, strikes)
+    if strikes < 2:
+        yield 'strike', (inning, home_away, outs, bases, score_diff, balls, strikes + 1)
+    yield 'walk', _after_play(state, 0, *_force(bases))
+    yield 'strikeout', _after_play(state, 1, bases, 0)
+    yield 'groundout', _after_play(state, 1, *_advance(bases, 1))
+    if bases & 4 and outs < 2:
+        yield 'flyout', _after_play(state, 1, bases & ~4, 1)
+    else:
+        yield 'flyout', _after_play(state, 1, bases, 0)
+    if bases & 1 and outs < 2:
+        yield 'double_play', _after_play(state, 2, *_advance(bases & ~1, 1))
+    yield 'single', _after_play(state, 0, *_advance(bases, 1, batter=1))
+    yield 'double', _after_play(state, 0, *_advance(bases, 2, batter=2))
+    yield 'triple', _after_play(state, 0, *_advance(bases, 3, batter=3))
+    yield 'home_run', _after_play(state, 0, *_advance(bases, 4, batter=4))
+
+
+def top_of_book(quote):
+    """The ticker and best prices of a quote, as a hashable key; None if there is no quote."""
+    if quote is None:
+        return None
+    return tuple(quote.get(field) for field in QUOTE_FIELDS)
+
+
+def order_payload(ticker, side, action, count, price):
+    """
+    create_order arguments for a limit order, without client_order_id, which must
+    be unique per submission and is added when the order is sent.
+
+    Parameters:
+    - price (int): Limit price in cents on the given side
+    """
+    return {
+        'ticker': ticker,
+        'type': 'limit',
+        'action': action,
+        'side': side,
+        'count': int(count),
+        'yes_price': int(price) if side == 'yes' else None,
+        'no_price': int(price) if side == 'no' else None,
+        'expiration_ts': None,
+        'sell_position_floor': None,
+        'buy_max_cost': None,
+    }
+
+
+def decide(state, surface, simulator, quote, balance, yes_contracts, no_contracts, confidence_scale, paths,
+           book=None):
+    """
+    Evaluates one state against a market quote: table lookup, simulation-based
+    confidence, and the orders to place according to the decision surface.
+
+    Parameters:
+    - state (tuple): (inning, home_away, outs, bases, score_diff, balls, strikes)
+    - surface (DecisionSurface): Decision surface built from the active table
+    - simulator (GameSimulator): Simulator for the confidence check
+    - quote (dict): Home market from get_event, with yes_bid/yes_ask/no_bid/no_ask in cents
+    - balance (float), yes_contracts (int), no_contracts (int): Current bankroll (dollars) and position
+    - confidence_scale (float): Model confidence before the simulation check
+    - paths (int): Simulation paths
+    - book (OrderBook): Depth of the quoted market, for depth-aware sizing (optional)
+
+    Returns:
+    - Decision: Including the bankroll and position after the orders are filled
+    """
+    win, leverage, expected_runs, fallback = surface.table.lookup_with_fallback(*state)
+    simulation = simulator.simulate(*state, paths=paths)
+    confidence = confidence_scale * model_confidence(win, simulation)
+    ticker = quote.get('ticker')
+    orders, effects = [], []
+    for action in surface.decide(surface.index(*state), quote, balance, confidence, yes_contracts, no_contracts,
+                                 book):
+        if action.action == 'buy':
+            cash, change = -action.amount, action.count
+        else:
+            cash, change = action.amount, -action.count
+        effect = (cash, change, 0) if action.side == 'yes' else (cash, 0, change)
+        balance += cash
+        yes_contracts += effect[1]
+        no_contracts += effect[2]
+        orders.append((f'{action.action}_{action.side}',
+                       order_payload(ticker, action.side, action.action, action.count, action.price)))
+        effects.append(effect)
+    return Decision(state, win, leverage, expected_runs, confidence, fallback, simulation, quote,
+                    tuple(orders), tuple(effects), balance, yes_contracts, no_contracts)
+
+
+class DecisionCache:
+    """
+    Decisions precomputed for the successors of the last state, valid only for the
+    bankroll and position they were computed with, while the market's top of book
+    and the table version are unchanged, while their quote is fresh, and until the
+    next speculation begins.
+    """
+
+    def __init__(self, max_quote_age=QUOTE_MAX_AGE):
+        self.max_quote_age = max_quote_age
+        self._decisions = {}
+        self._context = None
+        self._market = None
+        self._table_version = None
+        self._quoted_at = 0.0
+        self._sequence = 0
+        self._stored_sequence = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def begin(self):
+        """Starts a speculation from a new state. Returns its sequence number, to pass to store()."""
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def store(self, decisions, context, quoted_at, market, table_version, sequence):
+        """
+        Parameters:
+        - decisions (dict): {state: Decision} from speculate
+        - context (tuple): (balance, yes_contracts, no_contracts) they were computed with
+        - quoted_at (float): time.monotonic() of the quote
+        - market (tuple): top_of_book() of that quote
+        - table_version (int): Number of the table version they were computed with
+        - sequence (int): begin() of the speculation that computed them
+
+        Returns:
+        - bool: False if a newer speculation has begun since, in which case nothing is stored
+        """
+        with self._lock:
+            if sequence != self._sequence:
+                return False
+            self._stored_sequence = sequence
+            self._decisions = decisions
+            self._context = context
+            self._quoted_at = quoted_at
+            self._market = market
+            self._table_version = table_version
+            return True
+
+    def lookup(self, state, context, market, table_version):
+        """
+        Returns the cached Decision for a state, or None if absent or stale: it is not
+        from the latest speculation, the position, current top of book (None if unknown)
+        or table version differ from the ones it was computed with, or its quote is
+        older than max_quote_age.
+        """
+        with self._lock:
+            decision = self._decisions.get(state)
+            if (decision is None or self._stored_sequence != self._sequence
+                    or context != self._context or market is None or market != self._market
+                    or table_version != self._table_version
+                    or time.monotonic() - self._quoted_at > self.max_quote_age):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return decision
+
+    def clear(self):
+        with self._lock:
+            self._decisions = {}
+            self._context = None
+            self._market = None
+            self._table_version = None
+
+
+def speculate(state, surface, simulator, quote, balance, yes_contracts, no_contracts, confidence_scale,
+              paths, book=None):
+    """
+    Decides every successor of a state against the same quote (and book, if given).
+
+    Returns:
+    - dict: {successor state: Decision}
+    """
+    decisions = {}
+    for _, successor in successor_states(state):
+        if successor not in decisions:
+            decisions[successor] = decide(successor, surface, simulator, quote, balance, yes_contracts,
+                                          no_contracts, confidence_scale, paths, book)
+    return decisions
@@ -0,0 +1,225 @@
+"""
+Regenerates statswithballsstrikes, leverage and runsperinningballsstrikesstats from
+raw play-by-play CSVs, e.g. Retrosheet event files expanded with cwevent.
+
+Every CSV row is the game state before one event (a pitch or a plate appearance),
+in game order, with these columns:
+
+    GAME_ID, INN_CT, BAT_HOME_ID, OUTS_CT, BALLS_CT, STRIKES_CT, AWAY_SCORE_CT,
+    HOME_SCORE_CT, BASE1_RUN_ID, BASE2_RUN_ID, BASE3_RUN_ID, EVENT_RUNS_CT
+
+Files are read in chunks and processed across a process pool: pass one counts
+per-state wins and runs to the end of the half-inning, pass two measures win
+expectancy swings for the leverage index. Partial aggregates are dense arrays,
+so merging them is a sum. Score diffs in statswithballsstrikes are home minus
+away, with wins counted for the batting team. The leverage file uses the batting
+team's diff, as read_leverage_index expects.
+
+    python -m table_pipeline RAW_DIR --out-dir . --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from getExpectedStats import MAX_RUNS, MAX_SCORE_DIFF, N_COUNTS, N_DIFFS, decode_bases
+
+COLUMNS = ['GAME_ID', 'INN_CT', 'BAT_HOME_ID', 'OUTS_CT', 'BALLS_CT', 'STRIKES_CT', 'AWAY_SCORE_CT',
+           'HOME_SCORE_CT', 'BASE1_RUN_ID', 'BASE2_RUN_ID', 'BASE3_RUN_ID', 'EVENT_RUNS_CT']
+# Innings are kept as-is up to this cap; read_stats_with_balls_strikes folds 10+ together later
+MAX_PIPELINE_INNING = 25
+STATS_SHAPE = (MAX_PIPELINE_INNING, 2, 3, 8, N_DIFFS, N_COUNTS)
+LEVERAGE_SHAPE = STATS_SHAPE[:5]
+RUNS_SHAPE = (3, 8, N_COUNTS, MAX_RUNS)
+DEFAULT_CHUNKSIZE = 200_000
+
+
+def iter_game_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Reads a CSV in chunks, holding back the trailing game so every chunk has whole games only."""
+    carry = None
+    for chunk in pd.read_csv(path, usecols=COLUMNS, chunksize=chunksize, dtype={'GAME_ID': str,
+                             'BASE1_RUN_ID': str, 'BASE2_RUN_ID': str, 'BASE3_RUN_ID': str}):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last_game = chunk['GAME_ID'].iat[-1]
+        complete = chunk['GAME_ID'] != last_game
+        carry = chunk[~complete]
+        if complete.any():
+            yield chunk[complete]
+    if carry is not None and len(carry):
+        yield carry
+
+
+def _states(frame):
+    """Integer state columns for a chunk of complete games."""
+    home_batting = frame['BAT_HOME_ID'].to_numpy(dtype=np.int64)
+    bases = (frame['BASE1_RUN_ID'].notna().to_numpy().astype(np.int64)
+             | frame['BASE2_RUN_ID'].notna().to_numpy().astype(np.int64) << 1
+             | frame['BASE3_RUN_ID'].notna().to_numpy().astype(np.int64) << 2)
+    home_score = frame['HOME_SCORE_CT'].to_numpy(dtype=np.int64)
+    away_score = frame['AWAY_SCORE_CT'].to_numpy(dtype=np.int64)
+    event_runs = frame['EVENT_RUNS_CT'].to_numpy(dtype=np.int64)
+    games = pd.factorize(frame['GAME_ID'])[0]
+
+    # Final score: the last row of each game plus the runs scored on its event
+    last = np.flatnonzero(np.r_[games[1:] != games[:-1], True])
+    final_home = home_score[last] + event_runs[last] * home_batting[last]
+    final_away = away_score[last] + event_runs[last] * (1 - home_batting[last])
+    home_won = (final_home > final_away)[games]
+
+    # Runs the batting team scores from this event to the end of its half-inning
+    half_key = pd.Series(games * 1000 + frame['INN_CT'].to_numpy() * 2 + home_batting)
+    runs_before = pd.Series(event_runs).groupby(half_key).cumsum().to_numpy() - event_runs
+    half_total = pd.Series(event_runs).groupby(half_key).transform('sum').to_numpy()
+
+    return {
+        'game': games,
+        'inning': np.clip(frame['INN_CT'].to_numpy(dtype=np.int64), 1, MAX_PIPELINE_INNING),
+        'home_away': home_batting,
+        'outs': np.clip(frame['OUTS_CT'].to_numpy(dtype=np.int64), 0, 2),
+        'bases': bases,
+        'score_diff': np.clip(home_score - away_score, -MAX_SCORE_DIFF, MAX_SCORE_DIFF),
+        'count': (np.clip(frame['BALLS_CT'].to_numpy(dtype=np.int64), 0, 3) * 3
+                  + np.clip(frame['STRIKES_CT'].to_numpy(dtype=np.int64), 0, 2)),
+        'batting_won': home_won == (home_batting == 1),
+        'runs_rest': np.minimum(half_total - runs_before, MAX_RUNS - 1),
+        'last_in_game': np.r_[games[1:] != games[:-1], True],
+        'home_won': home_won,
+    }
+
+
+def _stats_index(states):
+    return np.ravel_multi_index((states['inning'] - 1, states['home_away'], states['outs'], states['bases'],
+                                 states['score_diff'] + MAX_SCORE_DIFF, states['count']), STATS_SHAPE)
+
+
+def _count_file(path, chunksize):
+    """Pass one for one file: per-state won/total game counts and the run-distribution histogram."""
+    won = np.zeros(STATS_SHAPE, dtype=np.int64)
+    total = np.zeros(STATS_SHAPE, dtype=np.int64)
+    runs = np.zeros(RUNS_SHAPE, dtype=np.int64)
+    for frame in iter_game_chunks(path, chunksize):
+        states = _states(frame)
+        cells = _stats_index(states)
+        # A state counts once per game, however often it recurs
+        _, first = np.unique(states['game'] * won.size + cells, return_index=True)
+        np.add.at(total.reshape(-1), cells[first], 1)
+        np.add.at(won.reshape(-1), cells[first], states['batting_won'][first])
+        np.add.at(runs, (states['outs'], states['bases'], states['count'], states['runs_rest']), 1)
+    return won, total, runs
+
+
+def _swing_file(path, chunksize, home_win):
+    """Pass two for one file: sum of |change in home win expectancy| per event, by state."""
+    swing = np.zeros(LEVERAGE_SHAPE, dtype=np.float64)
+    events = np.zeros(LEVERAGE_SHAPE, dtype=np.int64)
+    for frame in iter_game_chunks(path, chunksize):
+        states = _states(frame)
+        cells = np.ravel_multi_index((states['inning'] - 1, states['home_away'], states['outs'], states['bases'],
+                                      states['score_diff'] + MAX_SCORE_DIFF), LEVERAGE_SHAPE)
+        before = home_win.reshape(-1)[cells]
+        # The state after an event is the next row, or the final result at the end of a game
+        after = np.r_[before[1:], 0.0]
+        last = states['last_in_game']
+        after[last] = states['home_won'][last]
+        np.add.at(swing.reshape(-1), cells, np.abs(after - before))
+        np.add.at(events.reshape(-1), cells, 1)
+    return swing, events
+
+
+def _run_pool(function, jobs, workers):
+    if workers == 1 or len(jobs) <= 1:
+        return [function(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, *zip(*jobs)))
+
+
+def build_tables(raw_dir, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Aggregates every CSV in raw_dir.
+
+    Returns:
+    - won, total (ndarray): Per-state batting-team wins and games, shape STATS_SHAPE
+    - runs (ndarray): Runs-to-end-of-half-inning histogram, shape RUNS_SHAPE
+    - leverage (ndarray): Leverage index per state, shape LEVERAGE_SHAPE (NaN if unseen)
+    """
+    paths = sorted(os.path.join(raw_dir, name) for name in os.listdir(raw_dir) if name.lower().endswith('.csv'))
+    if not paths:
+        raise ValueError(f"No CSV files in '{raw_dir}'")
+    partials = _run_pool(_count_file, [(path, chunksize) for path in paths], workers)
+    won = sum(partial[0] for partial in partials)
+    total = sum(partial[1] for partial in partials)
+    runs = sum(partial[2] for partial in partials)
+
+    # Home win expectancy per state at the start of a plate appearance, pooled over counts
+    state_won = won.sum(axis=-1)
+    state_total = total.sum(axis=-1)
+    batting_win = np.divide(state_won, state_total, out=np.full(state_won.shape, 0.5), where=state_total > 0)
+    home_win = batting_win.copy()
+    home_win[:, 0] = 1 - batting_win[:, 0]
+
+    partials = _run_pool(_swing_file, [(path, chunksize, home_win) for path in paths], workers)
+    swing = sum(partial[0] for partial in partials)
+    events = sum(partial[1] for partial in partials)
+    average_swing = swing.sum() / max(events.sum(), 1)
+    leverage = np.divide(swing, events * average_swing, out=np.full(swing.shape, np.nan), where=events > 0)
+    return won, total, runs, leverage
+
+
+def write_stats_file(won, total, path):
+    with open(path, 'w') as file:
+        for cell in np.argwhere(total > 0):
+            inning, home_away, outs, bases, diff, count = (int(value) for value in cell)
+            balls, strikes = divmod(count, 3)
+            file.write(f"({inning + 1}, {home_away}, {outs}, {decode_bases(bases)}, {diff - MAX_SCORE_DIFF}, "
+                       f"({balls}, {strikes})): ({won[tuple(cell)]}, {total[tuple(cell)]})\n")
+
+
+def write_leverage_file(leverage, path):
+    with open(path, 'w') as file:
+        for cell in np.argwhere(~np.isnan(leverage)):
+            inning, home_away, outs, bases, diff = (int(value) for value in cell)
+            diff -= MAX_SCORE_DIFF
+            # The file is from the batting team's side; read_leverage_index flips it back for visitors
+            team, diff = ('H', diff) if home_away == 1 else ('V', -diff)
+            file.write(f'"{team}",{inning + 1},{outs},{bases + 1},{diff},{leverage[tuple(cell)]:.2f}\n')
+
+
+def write_runs_file(runs, path):
+    with open(path, 'w') as file:
+        for outs, bases, count in np.ndindex(RUNS_SHAPE[:3]):
+            histogram = runs[outs, bases, count]
+            if not histogram.any():
+                continue
+            length = int(np.flatnonzero(histogram)[-1]) + 1
+            balls, strikes = divmod(count, 3)
+            values = ', '.join(str(int(value)) for value in histogram[:length])
+            file.write(f"({outs}, {decode_bases(bases)}, ({balls}, {strikes})): [{values}]\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m table_pipeline', description="Build the model tables "
+                                     "from play-by-play CSVs")
+    parser.add_argument('raw_dir')
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    won, total, runs, leverage = build_tables(args.raw_dir, args.workers, args.chunksize)
+    os.makedirs(args.out_dir, exist_ok=True)
+    write_stats_file(won, total, os.path.join(args.out_dir, 'statswithballsstrikes'))
+    write_leverage_file(leverage, os.path.join(args.out_dir, 'leverage'))
+    write_runs_file(runs, os.path.join(args.out_dir, 'runsperinningballsstrikesstats'))
+    print(f"Built tables from {int(runs.sum())} events in {time.perf_counter() - start:.2f}s; "
+          f"run 'python -m getExpectedStats compile' to refresh the artifact")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
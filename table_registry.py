@@ -0,0 +1,229 @@
+"""
+Versioned, hot-swappable model tables for the server.
+
+The registry holds the active WinExpectancyTable. Callers take it for the length of
+one evaluation with acquire(), so a reload never changes the table under a
+running evaluation:
+
+    with registry.acquire() as table:
+        table.lookup_with_fallback(...)
+
+await registry.reload() loads and validates the new table in a worker thread, so
+the event loop keeps serving, then swaps the active version in one step. The
+initial table is only checked for structure: on a fresh checkout without the stats
+files it is empty, which is logged and served (every state is a default, so nothing
+is traded) until a reload brings in a populated one. The
+previous version is dropped when its last holder releases it; memory-mapped or
+shared-memory arrays are unmapped once nothing references them.
+
+With a channel (shared_tables.SharedTableChannel), as under `shared_tables serve`,
+a reload also publishes the new table to the other worker processes, and acquire()
+first switches to any table another worker has published since.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from getExpectedStats import ARTIFACT_PATH, TABLE_SHAPE, WinExpectancyTable, load_win_expectancy_table
+
+
+class TableVersion:
+    """One loaded table and the number of evaluations currently holding it."""
+
+    def __init__(self, number, table, source):
+        self.number = number
+        self.table = table
+        self.source = source
+        self.loaded_at = time.time()
+        self.holders = 0
+        self.retired = False
+
+    def describe(self):
+        return {
+            'version': self.number,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'holders': self.holders,
+            'retired': self.retired,
+            'artifact_version': self.table.metadata.get('version'),
+            'built_at': self.table.metadata.get('built_at'),
+            'compacted_deltas': self.table.metadata.get('compacted_deltas', 0),
+            'populated_states': int(np.count_nonzero(~np.isnan(self.table.win))),
+        }
+
+
+def validate_table(table, strict=True):
+    """
+    Checks that a table is safe to serve.
+
+    Parameters:
+    - table (WinExpectancyTable): Table to check
+    - strict (bool): Reject a table with no populated states; when False it is only logged
+
+    Raises:
+    - ValueError: If an array has the wrong shape, win % falls outside [0, 1], the
+      fallback arrays have gaps, or (strict) the table has no populated states
+    """
+    if not isinstance(table, WinExpectancyTable):
+        raise ValueError(f"Expected a WinExpectancyTable, got {type(table).__name__}")
+    for name, array in table.arrays().items():
+        if array.shape != TABLE_SHAPE:
+            raise ValueError(f"Array '{name}' has shape {array.shape}, expected {TABLE_SHAPE}")
+    populated = ~np.isnan(table.win)
+    if not populated.any():
+        if strict:
+            raise ValueError("Table has no populated states")
+        logging.warning("Serving a table with no populated states; no state will be traded until a reload")
+    if (table.win[populated] < 0).any() or (table.win[populated] > 1).any():
+        raise ValueError("Win % outside [0, 1]")
+    for name in ('win_filled', 'leverage_filled', 'runs_filled'):
+        if np.isnan(getattr(table, name)).any():
+            raise ValueError(f"Array '{name}' has missing values")
+
+
+class TableRegistry:
+    """
+    Parameters:
+    - table (WinExpectancyTable): Initial table; loaded with loader() when omitted
+    - loader (callable): Loads a table from a source path (default: load_win_expectancy_table)
+    - validator (callable): Raises ValueError for tables that must not be served; called
+      with strict=False for the initial table and strict=True on swap and reload
+    - source (str): Artifact path that reload() loads
+    - channel (SharedTableChannel): Shares reloads with other worker processes. The
+      initial table is the channel's current generation (attached when omitted).
+    """
+
+    def __init__(self, table=None, loader=load_win_expectancy_table, validator=validate_table,
+                 source=ARTIFACT_PATH, channel=None):
+        self.loader = loader
+        self.validator = validator
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._reload_lock = None
+        self._versions = {}
+        self._next_number = 1
+        self._generation = None
+        if channel is not None:
+            self._generation = channel.generation()
+            if table is None:
+                table = channel.attach(self._generation)
+        if table is None:
+            table = loader(source)
+        validator(table, strict=False)
+        self._active = self._register(table, source)
+
+    def _register(self, table, source):
+        version = TableVersion(self._next_number, table, source)
+        self._next_number += 1
+        self._versions[version.number] = version
+        return version
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def version(self):
+        """Number of the active version; it changes on every swap."""
+        return self._active.number
+
+    @property
+    def table(self):
+        """The active table, for callers that do not need to pin a version."""
+        return self._active.table
+
+    @contextmanager
+    def acquire(self):
+        """Pins the active version for the duration of the with-block and yields its table."""
+        if self.channel is not None:
+            self._follow()
+        with self._lock:
+            version = self._active
+            version.holders += 1
+        try:
+            yield version.table
+        finally:
+            with self._lock:
+                version.holders -= 1
+                if version.retired and version.holders == 0:
+                    self._versions.pop(version.number, None)
+
+    def swap(self, table, source=None, validated=False):
+        """
+        Makes a table the active version, validating it first unless the caller already
+        has. Returns the new TableVersion.
+        """
+        if not validated:
+            self.validator(table)
+        with self._lock:
+            return self._activate(table, source)
+
+    def _activate(self, table, source, generation=None):
+        # Called with self._lock held
+        previous = self._active
+        self._active = self._register(table, source)
+        previous.retired = True
+        if previous.holders == 0:
+            self._versions.pop(previous.number, None)
+        if generation is not None:
+            self._generation = generation
+        return self._active
+
+    def _follow(self):
+        """Switches to the newest generation on the channel if another worker published one."""
+        generation = self.channel.generation()
+        if generation == self._generation:
+            return
+        try:
+            # The publishing worker validated it
+            table = self.channel.attach(generation)
+        except (FileNotFoundError, ValueError) as e:
+            # Superseded again while attaching; the next acquire picks up the newer one
+            logging.warning(f"Could not attach shared table generation {generation}: {e}")
+            return
+        with self._lock:
+            if self._generation is None or generation > self._generation:
+                self._activate(table, self._active.source, generation)
+
+    def _load(self, source):
+        table = self.loader(source)
+        self.validator(table)
+        generation = None
+        if self.channel is not None:
+            generation, table = self.channel.publish(table)
+        return table, generation
+
+    async def reload(self, source=None):
+        """
+        Loads and validates a table in a worker thread, then swaps it in. Concurrent
+        reloads run one at a time. On failure the active version is left as it was.
+        With a channel, the table is published to the other workers as well.
+
+        Parameters:
+        - source (str): Artifact path to load (default: the active version's source)
+
+        Returns:
+        - TableVersion: The newly active version
+        """
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            source = source or self._active.source
+            table, generation = await asyncio.to_thread(self._load, source)
+            with self._lock:
+                if generation is not None and self._generation is not None and generation <= self._generation:
+                    # An acquire on another thread already switched to it
+                    return self._active
+                return self._activate(table, source, generation)
+
+    def status(self):
+        with self._lock:
+            return {
+                'active': self._active.describe(),
+                'retained': [version.describe() for number, version in sorted(self._versions.items())
+                             if version is not self._active],
+            }
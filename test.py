@@ -163,6 +163,7 @@ def build_combined_dict():
                                 .setdefault(score_diff, {})[balls_strikes] = (stats_val, leverage_val, runs_val)
     return combined_dict
 
-# Example usage:
-combined = build_combined_dict()
+# Example usage (memory-maps the compiled artifact instead of re-parsing the source files):
+from getExpectedStats import load_win_expectancy_table
+combined = load_win_expectancy_table().as_nested_dict()
 print(combined[9][0][0][(0,0,0)][-5][(0,0)]) 
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, like main2 imports them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from getExpectedStats import MAX_SCORE_DIFF, WinExpectancyTable  # noqa: E402
+
+# (inning, home_away, outs, (b1, b2, b3), score_diff, (balls, strikes)): (won, total)
+STATS_LINES = [
+    '(1, 1, 0, (0, 0, 0), 0, (0, 0)): (55, 100)',
+    '(1, 0, 0, (0, 0, 0), 0, (0, 0)): (45, 100)',
+    '(1, 1, 1, (1, 0, 0), 1, (1, 2)): (30, 40)',
+    '(9, 1, 2, (0, 1, 1), -1, (3, 2)): (10, 50)',
+    '(12, 1, 0, (0, 0, 0), 0, (0, 0)): (7, 10)',
+]
+LEVERAGE_LINES = [
+    '"H",1,0,1,0,0.85',
+    '"V",1,0,1,0,0.86',
+    '"H",9,2,7,-1,3.10',
+]
+RUNS_LINES = [
+    '(0, (0, 0, 0), (0, 0)): [70, 20, 10]',
+    '(1, (1, 0, 0), (1, 2)): [50, 30, 20]',
+]
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    """Small stats, leverage and runs files in the formats of the real ones; returns their paths."""
+    paths = {}
+    for name, lines in (('stats', STATS_LINES), ('leverage', LEVERAGE_LINES), ('runs', RUNS_LINES)):
+        path = tmp_path / name
+        path.write_text('\n'.join(lines) + '\n')
+        paths[name] = str(path)
+    return paths
+
+
+@pytest.fixture
+def sparse_table():
+    """A table with win % in a handful of first-inning states, and leverage and runs everywhere."""
+    table = WinExpectancyTable()
+    table.win[0, 1, 0, 0, MAX_SCORE_DIFF, 0] = 0.55
+    table.win[0, 1, 0, 0, MAX_SCORE_DIFF + 1, 0] = 0.65
+    table.win[0, 0, 1, 1, MAX_SCORE_DIFF - 2, 5] = 0.30
+    table.leverage[...] = 1.2
+    table.runs[...] = 0.4
+    table.build_fallback()
+    return table
+
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from kalshi_async_client import AsyncKalshiClient
+from rate_limiter import RateLimiter
+from request_timing import endpoint_key
+
+BODY = b'{"ok": true}'
+RESPONSE = b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s' % (len(BODY), BODY)
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class SlowServer:
+    """Keep-alive HTTP server that answers every request after a delay and counts open connections.
+    The first requests are delayed by delays, in order, if given."""
+
+    def __init__(self, delay=0.05, delays=()):
+        self.delay = delay
+        self.delays = list(delays)
+        self.open = 0
+        self.max_open = 0
+        self.connections = 0
+        self.requests = []
+
+    async def handle(self, reader, writer):
+        self.open += 1
+        self.connections += 1
+        self.max_open = max(self.max_open, self.open)
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                self.requests.append(head.split(b' ')[1].decode())
+                await asyncio.sleep(self.delays.pop(0) if self.delays else self.delay)
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.open -= 1
+            writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.host = f'http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}'
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+
+
+def client_for(server, private_key, **options):
+    return AsyncKalshiClient(server.host, 'key-id', private_key, rate_limiter=RateLimiter(1000, 1000),
+                             cache_responses=False, **options)
+
+
+def test_pool_size_caps_concurrent_connections(private_key):
+    async def main():
+        async with SlowServer() as server:
+            client = client_for(server, private_key, pool_size=2)
+            try:
+                results = await asyncio.gather(*(client.get('/markets') for _ in range(8)))
+            finally:
+                await client.close()
+        return server, results
+
+    server, results = asyncio.run(main())
+    assert results == [{'ok': True}] * 8
+    assert server.max_open <= 2 and server.connections <= 2
+    assert len(server.requests) == 8
+
+
+def test_connections_are_kept_alive(private_key):
+    async def main():
+        async with SlowServer(delay=0) as server:
+            client = client_for(server, private_key, pool_size=4)
+            try:
+                for _ in range(5):
+                    await client.get('/markets')
+                stats = client.connection_stats()
+            finally:
+                await client.close()
+        return server, stats
+
+    server, stats = asyncio.run(main())
+    assert server.connections == 1
+    assert stats['open_connections'] == 1 and stats['responses'] == 5
+
+
+class NoSpareTokens(RateLimiter):
+    def try_acquire(self, method='GET'):
+        return False
+
+
+def hedged_get(private_key, delays, hedge_after, rate_limiter=None):
+    """One hedged GET against a server delaying its requests by delays; returns the result and client."""
+    async def main():
+        async with SlowServer(delay=0, delays=delays) as server:
+            client = client_for(server, private_key, hedge_reads=True)
+            if rate_limiter is not None:
+                client.rate_limiter = rate_limiter
+            for _ in range(client.latency.min_samples):
+                client.latency.record(endpoint_key('/markets'), hedge_after)
+            try:
+                result = await client.get('/markets')
+            finally:
+                await client.close()
+        return result, client, server
+
+    return asyncio.run(main())
+
+
+def test_hedge_that_answers_first_wins(private_key):
+    result, client, server = hedged_get(private_key, [0.5, 0], hedge_after=0.02)
+    assert result == {'ok': True} and len(server.requests) == 2
+    assert (client.hedges_fired, client.hedges_won, client.hedges_skipped) == (1, 1, 0)
+
+
+def test_hedge_that_answers_second_loses(private_key):
+    result, client, server = hedged_get(private_key, [0.1, 0.5], hedge_after=0.02)
+    assert result == {'ok': True} and len(server.requests) == 2
+    assert (client.hedges_fired, client.hedges_won, client.hedges_skipped) == (1, 0, 0)
+
+
+def test_fast_reads_are_not_hedged(private_key):
+    result, client, server = hedged_get(private_key, [0], hedge_after=1.0)
+    assert result == {'ok': True} and len(server.requests) == 1
+    assert (client.hedges_fired, client.hedges_won, client.hedges_skipped) == (0, 0, 0)
+
+
+def test_hedge_is_skipped_without_spare_rate_budget(private_key):
+    result, client, server = hedged_get(private_key, [0.1], hedge_after=0.02,
+                                        rate_limiter=NoSpareTokens(1000, 1000))
+    assert result == {'ok': True} and len(server.requests) == 1
+    assert (client.hedges_fired, client.hedges_won, client.hedges_skipped) == (0, 0, 1)
+    assert client.connection_stats()['hedges_skipped'] == 1
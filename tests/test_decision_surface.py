@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from decision_surface import ENTRY_BUFFER, Action, DecisionSurface
+
+# sparse_table has a home win % of 0.30 here: top of the first, runner on first, one out, down 2, 1-2
+STATE = (1, 0, 1, 1, -2, 1, 2)
+
+
+def quote(yes_bid, yes_ask, no_bid, no_ask):
+    return {'yes_bid': yes_bid, 'yes_ask': yes_ask, 'no_bid': no_bid, 'no_ask': no_ask}
+
+
+@pytest.fixture
+def surface(sparse_table):
+    return DecisionSurface(sparse_table)
+
+
+def test_thresholds_mirror_between_the_sides(surface):
+    index = surface.index(*STATE)
+    assert surface.yes_enter[index] == pytest.approx(30 - ENTRY_BUFFER)
+    assert surface.yes_exit[index] == pytest.approx(30)
+    assert surface.no_enter[index] == pytest.approx(70 - ENTRY_BUFFER)
+    assert surface.no_exit[index] == pytest.approx(70)
+
+
+def test_no_side_buys_only_below_its_entry_threshold(surface):
+    index = surface.index(*STATE)
+    # Effective no ask 2 * 60 - 58 = 62 clears 70 - 4
+    actions = surface.decide(index, quote(38, 42, 58, 60), 100, 1.0, 0, 0)
+    assert [(action.action, action.side, action.price) for action in actions] == [('buy', 'no', 60)]
+    assert actions[0].count > 0
+    # Effective no ask 68: above 66, so no buy. The pre-surface rule (0.70 < 0.72) bought here
+    assert surface.decide(index, quote(34, 38, 60, 64), 100, 1.0, 0, 0) == []
+
+
+def test_no_side_sells_held_contracts_above_its_exit_threshold(surface):
+    index = surface.index(*STATE)
+    assert surface.decide(index, quote(26, 29, 71, 74), 100, 1.0, 0, 5) == [Action('sell', 'no', 5, 71, 5 * 71 / 100)]
+    assert surface.decide(index, quote(27, 30, 70, 73), 100, 1.0, 0, 5) == []
+    # Nothing held, nothing sold
+    assert surface.decide(index, quote(26, 29, 71, 74), 100, 1.0, 0, 0) == []
+
+
+def test_yes_side_keeps_the_original_rules(surface):
+    index = surface.index(*STATE)
+    # Effective yes ask 2 * 22 - 20 = 24 clears 30 - 4
+    assert [action.side for action in surface.decide(index, quote(20, 22, 77, 80), 100, 1.0, 0, 0)] == ['yes']
+    assert surface.decide(index, quote(31, 33, 66, 69), 100, 1.0, 3, 0) == [Action('sell', 'yes', 3, 31, 3 * 31 / 100)]
+
+
+def test_states_without_data_are_never_traded(sparse_table):
+    table = type(sparse_table)(**{name: array.copy() for name, array in sparse_table.arrays().items()})
+    table.win[...] = np.nan
+    table.build_fallback()
+    surface = DecisionSurface(table)
+    index = surface.index(*STATE)
+    assert surface.decide(index, quote(1, 2, 1, 2), 100, 1.0, 5, 5) == []
+
+
+def test_contracts_scale_with_bankroll_and_confidence(surface):
+    index = surface.index(*STATE)
+    full = surface.contracts(index, 'no', 60, 1000, 1.0)
+    assert full > 0
+    assert surface.contracts(index, 'no', 60, 500, 1.0) == pytest.approx(full / 2, abs=1)
+    assert surface.contracts(index, 'no', 60, 1000, 0.5) == pytest.approx(full / 2, abs=1)
+    # No edge at or above our probability
+    assert surface.contracts(index, 'no', 70, 1000, 1.0) == 0
+    assert surface.rows_filled() == 1
@@ -0,0 +1,126 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import getExpectedStats
+from getExpectedStats import (DELTA_DTYPE, DELTA_SUFFIX, FALLBACK_WIN, append_deltas, compact_deltas, delta_log_lock,
+                              ingest_completed_game, load_win_expectancy_table, read_deltas, read_table_artifact)
+
+GAME = [(1, 0, 0, 0, 0, 0, 0), (1, 0, 0, 0, 0, 0, 1), (1, 0, 0, 0, 0, 0, 0), (1, 1, 0, 0, 0, 0, 0)]
+
+
+def load(artifact, source_files, **kwargs):
+    return load_win_expectancy_table(artifact, source_files['stats'], source_files['leverage'],
+                                     source_files['runs'], **kwargs)
+
+
+def test_ingest_counts_each_state_once_per_game(sparse_table):
+    deltas = sparse_table.ingest_completed_game(GAME, home_won=True)
+    assert len(deltas) == 3 and deltas['total'].tolist() == [1, 1, 1]
+    # Counts are from the batting side: the visitors bat in the top half and lost
+    assert deltas['won'].tolist() == [0, 0, 1]
+    assert sparse_table.total[0, 0, 0, 0, 30, 0] == 1
+    assert sparse_table.lookup(1, 0, 0, 0, 0, 0, 0)[0] == 1.0
+    assert sparse_table.lookup(1, 1, 0, 0, 0, 0, 0)[0] == 1.0
+
+
+def test_ingest_updates_existing_counts(tmp_path, source_files):
+    table = load(str(tmp_path / 'tables.bin'), source_files, writable=True)
+    table.ingest_completed_game([(1, 1, 0, 0, 0, 0, 0)], home_won=False)
+    # 55 of 100 plus a loss
+    assert table.lookup(1, 1, 0, 0, 0, 0, 0)[0] == pytest.approx(55 / 101)
+
+
+def test_deltas_are_logged_and_replayed_on_load(tmp_path, source_files):
+    artifact = str(tmp_path / 'tables.bin')
+    table = load(artifact, source_files, writable=True)
+    ingest_completed_game(GAME, True, table=table, artifact_path=artifact)
+    ingest_completed_game(GAME, False, table=table, artifact_path=artifact)
+    assert len(read_deltas(artifact + DELTA_SUFFIX)) == 6
+    reloaded = load(artifact, source_files)
+    assert reloaded.lookup(1, 0, 0, 0, 0, 0, 1)[0] == pytest.approx(0.5)
+    assert reloaded.lookup(1, 1, 0, 0, 0, 0, 0)[0] == pytest.approx(56 / 102)
+    # Replayed in a private mapping; the artifact itself is unchanged
+    assert np.isnan(read_table_artifact(artifact).win[0, 0, 0, 0, 30, 1])
+
+
+def test_read_only_table_is_rejected(tmp_path, source_files):
+    artifact = str(tmp_path / 'tables.bin')
+    with pytest.raises(ValueError):
+        ingest_completed_game(GAME, True, table=load(artifact, source_files), artifact_path=artifact)
+
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'tables.bin') + DELTA_SUFFIX
+    deltas = np.array([(5, 1, 1), (7, 0, 1)], dtype=DELTA_DTYPE)
+    append_deltas(deltas, path)
+    with open(path, 'ab') as file:
+        file.write(b'\x01\x02\x03')
+    np.testing.assert_array_equal(read_deltas(path), deltas)
+    assert len(read_deltas(str(tmp_path / 'missing'))) == 0
+
+
+def test_compaction_folds_the_log_into_the_artifact(tmp_path, source_files):
+    artifact = str(tmp_path / 'tables.bin')
+    table = load(artifact, source_files, writable=True)
+    ingest_completed_game(GAME, True, table=table, artifact_path=artifact)
+    expected = table.lookup(1, 0, 0, 0, 0, 0, 1)
+    assert compact_deltas(artifact) == 3
+    assert not os.path.exists(artifact + DELTA_SUFFIX)
+    assert compact_deltas(artifact) == 0
+    compacted = load(artifact, source_files)
+    assert compacted.metadata['compacted_deltas'] == 3
+    np.testing.assert_equal(compacted.lookup(1, 0, 0, 0, 0, 0, 1), expected)
+    # Fallback values are rebuilt around the new cells
+    win, _, _, flags = compacted.lookup_with_fallback(1, 0, 0, 0, 0, 0, 2)
+    assert win == 1.0 and flags & FALLBACK_WIN
+
+
+def test_source_change_drops_compacted_deltas(tmp_path, source_files, capsys):
+    artifact = str(tmp_path / 'tables.bin')
+    table = load(artifact, source_files, writable=True)
+    ingest_completed_game(GAME, True, table=table, artifact_path=artifact)
+    compact_deltas(artifact)
+    with open(source_files['stats'], 'a') as file:
+        file.write('(2, 1, 0, (0, 0, 0), 0, (0, 0)): (6, 10)\n')
+    rebuilt = load(artifact, source_files)
+    assert 'dropping 3 compacted game updates' in capsys.readouterr().out
+    assert np.isnan(rebuilt.win[0, 0, 0, 0, 30, 1])
+
+
+def test_appends_during_compaction_land_in_a_fresh_log(tmp_path, source_files, monkeypatch):
+    artifact = str(tmp_path / 'tables.bin')
+    table = load(artifact, source_files, writable=True)
+    ingest_completed_game(GAME, True, table=table, artifact_path=artifact)
+    late = np.array([(11, 1, 1)], dtype=DELTA_DTYPE)
+    appender = threading.Thread(target=append_deltas, args=(late, artifact + DELTA_SUFFIX))
+    write = getExpectedStats.write_table_artifact
+
+    def write_while_appending(*args, **kwargs):
+        appender.start()
+        appender.join(0.2)
+        # The append waits for the compaction instead of writing into the log being folded
+        assert appender.is_alive()
+        write(*args, **kwargs)
+
+    monkeypatch.setattr(getExpectedStats, 'write_table_artifact', write_while_appending)
+    assert compact_deltas(artifact) == 3
+    appender.join()
+    np.testing.assert_array_equal(read_deltas(artifact + DELTA_SUFFIX), late)
+    assert read_table_artifact(artifact).metadata['compacted_deltas'] == 3
+
+
+def test_loading_waits_for_a_compaction(tmp_path, source_files):
+    artifact = str(tmp_path / 'tables.bin')
+    table = load(artifact, source_files, writable=True)
+    ingest_completed_game(GAME, True, table=table, artifact_path=artifact)
+    loaded = []
+    with delta_log_lock(artifact + DELTA_SUFFIX):
+        loader = threading.Thread(target=lambda: loaded.append(load(artifact, source_files)))
+        loader.start()
+        loader.join(0.2)
+        assert loader.is_alive()
+    loader.join()
+    assert loaded[0].lookup(1, 0, 0, 0, 0, 0, 1)[0] == 1.0
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from getExpectedStats import _expected_margin_cached, calculate_expected_margin
+
+
+def games(count=300, seed=9):
+    rng = np.random.default_rng(seed)
+    home_spread = rng.choice([-2.5, -1.5, 1.5, 2.5], count)
+    odds = rng.integers(100, 400, (2, count)) * rng.choice([-1, 1], (2, count))
+    return home_spread, -home_spread, odds[0], odds[1]
+
+
+def test_vectorized_matches_scalar():
+    home_spread, away_spread, home_odds, away_odds = games()
+    margins = calculate_expected_margin(home_spread, away_spread, home_odds, away_odds)
+    assert margins.shape == home_spread.shape
+    for i in range(len(home_spread)):
+        expected = calculate_expected_margin(float(home_spread[i]), float(away_spread[i]), int(home_odds[i]),
+                                             int(away_odds[i]))
+        assert margins[i] == pytest.approx(expected)
+
+
+def test_std_dev_and_broadcasting():
+    margins = calculate_expected_margin(2.5, -2.5, [145, -120], [-188, 100], std_dev=4)
+    assert margins.tolist() == pytest.approx([calculate_expected_margin(2.5, -2.5, 145, -188, 4),
+                                              calculate_expected_margin(2.5, -2.5, -120, 100, 4)])
+
+
+def test_zero_dimensional_and_numpy_scalars_use_the_scalar_path():
+    expected = calculate_expected_margin(2.5, -2.5, 145, -188)
+    assert calculate_expected_margin(np.array(2.5), np.array(-2.5), np.array(145), np.array(-188)) == expected
+    _expected_margin_cached.cache_clear()
+    calculate_expected_margin(np.float64(2.5), np.float64(-2.5), np.int64(145), np.int64(-188))
+    calculate_expected_margin(2.5, -2.5, 145, -188)
+    assert _expected_margin_cached.cache_info().hits == 1
+
+
+def test_even_odds_return_the_line():
+    assert calculate_expected_margin(2.5, -2.5, -110, -110) == pytest.approx(-2.5)
+    assert calculate_expected_margin(np.array([2.5, -1.5]), np.array([-2.5, 1.5]), -110, -110).tolist() == \
+        pytest.approx([-2.5, 1.5])
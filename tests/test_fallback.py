@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from decision_surface import DecisionSurface
+from getExpectedStats import (DEFAULT_LEVERAGE, DEFAULT_WIN, FALLBACK_DEFAULT_LEVERAGE, FALLBACK_DEFAULT_RUNS,
+                              FALLBACK_DEFAULT_WIN, FALLBACK_LEVERAGE, FALLBACK_RUNS, FALLBACK_WIN,
+                              WinExpectancyTable)
+
+CHEAP = {'yes_bid': 1, 'yes_ask': 2, 'no_bid': 1, 'no_ask': 2}
+RICH = {'yes_bid': 98, 'yes_ask': 99, 'no_bid': 98, 'no_ask': 99}
+
+
+def test_populated_state_has_no_flags(sparse_table):
+    assert sparse_table.lookup_with_fallback(1, 1, 0, 0, 0, 0, 0) == pytest.approx((0.55, 1.2, 0.4, 0))
+
+
+def test_missing_state_takes_nearest_count_then_score_diff(sparse_table):
+    # Same score diff, next count over: the count axis is searched first
+    win, _, _, flags = sparse_table.lookup_with_fallback(1, 1, 0, 0, 0, 0, 1)
+    assert win == pytest.approx(0.55) and flags == FALLBACK_WIN
+    # Two runs up is nearer to +1 than to 0
+    win, _, _, flags = sparse_table.lookup_with_fallback(1, 1, 0, 0, 2, 0, 0)
+    assert win == pytest.approx(0.65) and flags == FALLBACK_WIN
+
+
+def test_every_state_is_filled(sparse_table):
+    assert not np.isnan(sparse_table.win_filled).any()
+    flags = sparse_table.fallback
+    assert ((flags & FALLBACK_WIN) != 0).tolist() == np.isnan(sparse_table.win).tolist()
+    assert not (flags & (FALLBACK_LEVERAGE | FALLBACK_RUNS | FALLBACK_DEFAULT_WIN)).any()
+
+
+def test_state_without_any_neighbour_is_flagged_default():
+    table = WinExpectancyTable()
+    table.runs[...] = 0.4
+    table.build_fallback()
+    assert table.lookup_with_fallback(5, 0, 1, 3, -2, 1, 1) == pytest.approx(
+        (DEFAULT_WIN, DEFAULT_LEVERAGE, 0.4,
+         FALLBACK_WIN | FALLBACK_DEFAULT_WIN | FALLBACK_LEVERAGE | FALLBACK_DEFAULT_LEVERAGE))
+    assert not (table.fallback & (FALLBACK_RUNS | FALLBACK_DEFAULT_RUNS)).any()
+
+
+def test_ingested_state_clears_its_flags():
+    table = WinExpectancyTable()
+    table.build_fallback()
+    table.ingest_completed_game([(1, 1, 0, 0, 0, 0, 0)], home_won=True)
+    win, _, _, flags = table.lookup_with_fallback(1, 1, 0, 0, 0, 0, 0)
+    assert win == 1.0 and not flags & (FALLBACK_WIN | FALLBACK_DEFAULT_WIN)
+    assert table.lookup_with_fallback(1, 1, 0, 0, 0, 0, 1)[3] & FALLBACK_DEFAULT_WIN
+
+
+def test_default_states_are_never_traded(sparse_table):
+    empty = WinExpectancyTable()
+    empty.build_fallback()
+    state = (3, 1, 1, 2, 1, 1, 1)
+    surface = DecisionSurface(empty)
+    index = surface.index(*state)
+    assert surface.decide(index, CHEAP, 1000, 1.0, 0, 0) == []
+    assert surface.decide(index, RICH, 1000, 1.0, 50, 50) == []
+    # The same state filled from a populated neighbour is traded
+    surface = DecisionSurface(sparse_table)
+    assert surface.decide(surface.index(*state), CHEAP, 1000, 1.0, 0, 0)
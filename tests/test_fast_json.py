@@ -0,0 +1,74 @@
+import asyncio
+import importlib.util
+import json
+import sys
+
+import numpy as np
+import pytest
+
+import fast_json
+from response_cache import ResponseCache
+
+EVENT = fast_json._sample_event()
+
+
+def load_backend(monkeypatch, blocked):
+    """A fresh copy of fast_json that cannot import the blocked packages."""
+    for name in blocked:
+        monkeypatch.setitem(sys.modules, name, None)
+    spec = importlib.util.spec_from_file_location('fast_json_copy', fast_json.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(params=['orjson', 'msgspec', 'json'])
+def backend(request, monkeypatch):
+    blocked = {'orjson': (), 'msgspec': ('orjson',), 'json': ('orjson', 'msgspec')}[request.param]
+    if request.param != 'json':
+        pytest.importorskip(request.param)
+    module = load_backend(monkeypatch, blocked)
+    assert module.BACKEND == request.param
+    return module
+
+
+def test_output_matches_compact_json_dumps(backend):
+    payload = dict(EVENT, note='Bronx – “Yankees”', teams={'home': 'NYY', 'away': 'BOS'}, tied=None, odds=0.55)
+    assert backend.dumps(payload) == json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+    assert backend.loads(backend.dumps_bytes(payload)) == payload
+    assert backend.loads(backend.dumps(payload)) == payload
+
+
+@pytest.mark.parametrize('malformed', [b'{"ticker": ', b'not json', b'{"a": 1}}', b'\xff\xfe'])
+def test_malformed_input_raises_decode_error(backend, malformed):
+    with pytest.raises(backend.DecodeError):
+        backend.loads(malformed)
+
+
+def test_active_backend_encodes_table_lookups():
+    payload = {'win': np.float64(0.55), 'index': np.int64(3), 'runs': np.array([1, 2]), 4: 'four'}
+    assert json.loads(fast_json.dumps(payload)) == {'win': 0.55, 'index': 3, 'runs': [1, 2], '4': 'four'}
+
+
+def test_malformed_write_body_clears_the_response_cache():
+    cache = ResponseCache()
+    cache.get_or_fetch('/markets/GAME-HOME', 1.0, lambda: {'market': 1})
+    cache.invalidate_write('{"ticker": ')
+    assert cache.stats()['entries'] == 0
+
+
+def test_websocket_helpers_send_and_receive_text():
+    class WebSocket:
+        def __init__(self):
+            self.frames = []
+
+        async def send_text(self, text):
+            self.frames.append(text)
+
+        async def receive_text(self):
+            return self.frames.pop(0)
+
+    websocket = WebSocket()
+    asyncio.run(fast_json.send_json(websocket, {'yes_ask': 57}))
+    assert websocket.frames == ['{"yes_ask":57}']
+    assert asyncio.run(fast_json.receive_json(websocket)) == {'yes_ask': 57}
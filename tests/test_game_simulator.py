@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from game_simulator import GameSimulator, SimulationResult, model_confidence, simulate_states
+from getExpectedStats import MAX_RUNS, N_COUNTS
+from markov_engine import MarkovWinEngine
+
+
+@pytest.fixture
+def distributions():
+    rng = np.random.default_rng(9)
+    pmfs = np.zeros((3, 8, N_COUNTS, MAX_RUNS))
+    pmfs[..., :5] = rng.dirichlet([6, 3, 2, 1, 1], (3, 8, N_COUNTS))
+    return pmfs
+
+
+STATES = np.array([
+    (1, 0, 0, 0, 0, 0, 0),
+    (5, 1, 1, 3, -2, 2, 1),
+    (9, 0, 2, 7, 1, 3, 2),
+    (9, 1, 0, 2, -1, 0, 2),
+    (11, 0, 1, 2, 0, 1, 0),
+])
+
+
+@pytest.mark.parametrize('state', STATES.tolist())
+def test_simulation_agrees_with_the_markov_engine(distributions, state):
+    result = GameSimulator(distributions, seed=1).simulate(*state, paths=20000)
+    expected = MarkovWinEngine(distributions).win_probability(*state)
+    assert result.paths == 20000
+    assert abs(result.mean - expected) < 4 * result.stderr + 1e-3
+
+
+def test_decided_games_have_no_spread(distributions):
+    # Home leads in the bottom of the ninth: every path is a win
+    result = GameSimulator(distributions, seed=1).simulate(9, 1, 0, 0, 2, 0, 0, paths=500)
+    assert result == SimulationResult(1.0, 0.0, 500)
+
+
+def test_simulate_many_matches_simulate(distributions):
+    means, stderrs = GameSimulator(distributions, seed=4).simulate_many(STATES, paths=300)
+    single = GameSimulator(distributions, seed=4)
+    for row, state in enumerate(STATES.tolist()):
+        result = single.simulate(*state, paths=300)
+        assert (means[row], stderrs[row]) == (result.mean, result.stderr)
+
+
+def test_sharded_batches_are_reproducible(distributions):
+    states = np.repeat(STATES, 3, axis=0)
+    local = simulate_states(states, paths=200, workers=1, shard_size=4, distributions=distributions, seed=7)
+    pooled = simulate_states(states, paths=200, workers=2, shard_size=4, distributions=distributions, seed=7)
+    np.testing.assert_array_equal(local[0], pooled[0])
+    np.testing.assert_array_equal(local[1], pooled[1])
+    assert local[0].shape == (len(states),)
+    empty = simulate_states(np.empty((0, 7)), distributions=distributions)
+    assert empty[0].size == 0 and empty[1].size == 0
+
+
+def test_model_confidence_falls_with_disagreement():
+    agreeing = SimulationResult(0.60, 0.005, 5000)
+    assert model_confidence(0.60, agreeing) == pytest.approx(0.9)
+    assert model_confidence(0.65, agreeing) == pytest.approx(0.4)
+    assert model_confidence(0.80, agreeing) == 0.0
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from KalshiClientsBaseV2ApiKey import KalshiClient
+from rate_limiter import RateLimiter
+from request_timing import endpoint_key
+
+
+class NoSpareTokens(RateLimiter):
+    def try_acquire(self, method='GET'):
+        return False
+
+
+@pytest.fixture(scope='module')
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def hedged_client(private_key, delays, hedge_after, rate_limiter=None):
+    """A hedging client whose GETs take delays, in order, and answer with the copy's number."""
+    client = KalshiClient('http://127.0.0.1:9', 'key-id', private_key, cache_responses=False, hedge_reads=True,
+                          rate_limiter=rate_limiter or RateLimiter(1000, 1000))
+    for _ in range(client.latency.min_samples):
+        client.latency.record(endpoint_key('/markets'), hedge_after)
+    sent = []
+    lock = threading.Lock()
+
+    def send_get(path, params):
+        with lock:
+            copy = len(sent)
+            sent.append(path)
+        time.sleep(delays[copy])
+        return {'copy': copy}
+
+    client._send_get = send_get
+    return client, sent
+
+
+def test_hedge_that_answers_first_wins(private_key):
+    client, sent = hedged_client(private_key, [0.5, 0], hedge_after=0.02)
+    assert client.get('/markets') == {'copy': 1} and len(sent) == 2
+    assert (client.hedges_fired, client.hedges_won, client.hedges_skipped) == (1, 1, 0)
+    client.close()
+
+
+def test_hedge_that_answers_second_loses(private_key):
+    client, sent = hedged_client(private_key, [0.1, 0.5], hedge_after=0.02)
+    assert client.get('/markets') == {'copy': 0} and len(sent) == 2
+    assert (client.hedges_fired, client.hedges_won, client.hedges_skipped) == (1, 0, 0)
+    client.close()
+
+
+def test_hedge_is_skipped_without_spare_rate_budget(private_key):
+    client, sent = hedged_client(private_key, [0.1], hedge_after=0.02, rate_limiter=NoSpareTokens(1000, 1000))
+    assert client.get('/markets') == {'copy': 0} and len(sent) == 1
+    assert client.hedge_stats()['hedges_skipped'] == 1 and client.hedges_fired == 0
+    client.close()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from getExpectedStats import FALLBACK_WIN, LOOKUP_COLUMNS, decode_bases, lookup_many
+
+
+def states(count=2000, seed=5):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(1, 3, count), rng.integers(0, 2, count), rng.integers(0, 3, count),
+                            rng.integers(0, 8, count), rng.integers(-3, 4, count), rng.integers(0, 4, count),
+                            rng.integers(0, 3, count)])
+
+
+def test_fallback_masks_match_scalar_lookups(sparse_table):
+    rows = states()
+    result = lookup_many(*rows.T, table=sparse_table, fallback=True)
+    raw = lookup_many(*rows.T, table=sparse_table)
+    assert not np.isnan(result.win).any()
+    assert result.missing.tolist() == np.isnan(raw.win).tolist()
+    assert ((result.fallback & FALLBACK_WIN) != 0).tolist() == result.missing.tolist()
+    assert not result.invalid.any()
+    for row, state in enumerate(rows):
+        win, leverage, runs, flags = sparse_table.lookup_with_fallback(*(int(field) for field in state))
+        assert (result.win[row], result.leverage[row], result.runs[row]) == (
+            np.float32(win), np.float32(leverage), np.float32(runs))
+        assert result.fallback[row] == flags
+        assert raw.missing[row] == np.isnan(sparse_table.lookup(*(int(field) for field in state))[0])
+
+
+def test_populated_states_are_not_missing(sparse_table):
+    result = lookup_many([1, 1, 1], [1, 1, 0], [0, 0, 1], [0, 0, 1], [0, 1, -2], [0, 0, 1], [0, 0, 2],
+                         table=sparse_table, fallback=True)
+    assert result.missing.tolist() == [False, False, False]
+    assert result.fallback.tolist() == [0, 0, 0]
+    np.testing.assert_allclose(result.win, [0.55, 0.65, 0.30], rtol=1e-6)
+
+
+def test_dataframe_and_occupancy_inputs(sparse_table):
+    rows = states(200, seed=6)
+    frame = pd.DataFrame(rows, columns=LOOKUP_COLUMNS)
+    from_frame = lookup_many(frame, table=sparse_table, fallback=True)
+    occupancy = np.array([decode_bases(mask) for mask in rows[:, 3]])
+    from_occupancy = lookup_many(rows[:, 0], rows[:, 1], rows[:, 2], occupancy, rows[:, 4], rows[:, 5], rows[:, 6],
+                                 table=sparse_table, fallback=True)
+    for field in ('win', 'leverage', 'runs', 'missing', 'fallback'):
+        np.testing.assert_array_equal(getattr(from_frame, field), getattr(from_occupancy, field))
+    assert lookup_many(frame, table=sparse_table).fallback is None
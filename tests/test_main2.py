@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main2
+from KalshiClientsBaseV2ApiKey import HttpError
+from getExpectedStats import MAX_SCORE_DIFF
+from speculative_decisions import Decision, order_payload
+
+STATE_MESSAGE = ('{"inning": 1, "isTop": false, "outs": 0, "bases": [false, false, false, false], '
+                 '"homeScores": 0, "awayScores": 0, "balls": 0, "strikes": 0}')
+
+
+@pytest.fixture
+def app_state(monkeypatch, sparse_table):
+    """main2 trading against sparse_table with a fixed quote and no exchange."""
+    monkeypatch.setattr(main2, 'table_registry', main2.TableRegistry(sparse_table))
+    monkeypatch.setattr(main2, 'decision_cache', main2.DecisionCache())
+    monkeypatch.setattr(main2, 'decision_surface', None)
+    quote = {'ticker': 'GAME-HOME', 'yes_bid': 40, 'yes_ask': 42, 'no_bid': 57, 'no_ask': 59}
+
+    async def current_market():
+        return quote, None
+
+    monkeypatch.setattr(main2, 'current_market', current_market)
+    return quote
+
+
+def test_x_decides_off_the_event_loop(app_state, monkeypatch):
+    threads, applied = [], []
+    decide = main2.decide
+
+    def recording_decide(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return decide(*args, **kwargs)
+
+    async def apply_decision(decision):
+        applied.append(decision)
+
+    monkeypatch.setattr(main2, 'decide', recording_decide)
+    monkeypatch.setattr(main2, 'apply_decision', apply_decision)
+    state = asyncio.run(main2.x(STATE_MESSAGE))
+    assert state == (1, 1, 0, 0, 0, 0, 0)
+    assert threads and threads[0] is not threading.main_thread()
+    assert applied[0].state == state
+    assert applied[0].win == pytest.approx(main2.table_registry.table.win[0, 1, 0, 0, MAX_SCORE_DIFF, 0])
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    reloads = []
+
+    async def reload(*args):
+        reloads.append(args)
+        return main2.table_registry.active
+
+    monkeypatch.setattr(main2, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(main2.table_registry, 'reload', reload)
+    return TestClient(main2.app), reloads
+
+
+def test_reload_requires_the_admin_token(admin_client, monkeypatch):
+    client, reloads = admin_client
+    assert client.post('/admin/reload-tables').status_code == 401
+    assert client.post('/admin/reload-tables', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    monkeypatch.setattr(main2, 'ADMIN_TOKEN', None)
+    assert client.post('/admin/reload-tables', headers={'Authorization': 'Bearer secret'}).status_code == 403
+    assert reloads == []
+
+
+def test_reload_only_loads_the_configured_artifact(admin_client):
+    client, reloads = admin_client
+    response = client.post('/admin/reload-tables', headers={'Authorization': 'Bearer secret'},
+                           json={'artifact_path': '/etc/passwd'})
+    assert response.status_code == 200 and response.json()['success']
+    assert reloads == [()]
+
+
+def test_surface_is_built_once_for_concurrent_callers(app_state, monkeypatch):
+    built = []
+    surface_class = main2.DecisionSurface
+
+    def slow_surface(table):
+        built.append(table)
+        time.sleep(0.05)
+        return surface_class(table)
+
+    monkeypatch.setattr(main2, 'DecisionSurface', slow_surface)
+    table = main2.table_registry.table
+    with ThreadPoolExecutor(4) as pool:
+        surfaces = list(pool.map(lambda _: main2.current_surface(table), range(4)))
+    assert len(built) == 1 and all(surface is surfaces[0] for surface in surfaces)
+
+
+def test_late_speculation_does_not_replace_the_next_one(app_state, monkeypatch):
+    stale, current = main2.decision_cache.begin(), main2.decision_cache.begin()
+    monkeypatch.setattr(main2, 'speculate', lambda state, *args: {state: f'from {state}'})
+    quote = app_state
+    main2.speculate_successors('next', quote, None, time.monotonic(), current)
+    main2.speculate_successors('previous', quote, None, time.monotonic(), stale)
+    context = (main2.balance, main2.yes_contracts, main2.no_contracts)
+    lookup = main2.decision_cache.lookup
+    assert lookup('next', context, main2.top_of_book(quote), main2.table_registry.version) == 'from next'
+    assert lookup('previous', context, main2.top_of_book(quote), main2.table_registry.version) is None
+
+
+def test_filled_orders_are_booked_before_a_rejection_is_raised(app_state, monkeypatch):
+    quote = app_state
+    orders = (('sell_no', order_payload('GAME-HOME', 'no', 'sell', 5, 57)),
+              ('buy_yes', order_payload('GAME-HOME', 'yes', 'buy', 10, 42)))
+    decision = Decision((1, 1, 0, 0, 0, 0, 0), 0.5, 1.0, 0.5, 1.0, 0, SimpleNamespace(mean=0.5, stderr=0.01), quote,
+                        orders, ((2.85, 0, -5), (-4.2, 10, 0)), 98.65, 10, 0)
+    rejection = HttpError('Bad Request', 400)
+
+    class Gateway:
+        async def submit_many(self, payloads):
+            return [{'order': payloads[0]}, rejection]
+
+    monkeypatch.setattr(main2, 'SUBMIT_ORDERS', True)
+    monkeypatch.setattr(main2, 'get_order_gateway', Gateway)
+    monkeypatch.setattr(main2, 'balance', 100)
+    monkeypatch.setattr(main2, 'yes_contracts', 0)
+    monkeypatch.setattr(main2, 'no_contracts', 5)
+    with pytest.raises(HttpError):
+        asyncio.run(main2.apply_decision(decision))
+    # The sale went through; the rejected buy changed nothing
+    assert (main2.balance, main2.yes_contracts, main2.no_contracts) == (pytest.approx(102.85), 0, 0)
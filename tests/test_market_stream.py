@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+import kalshi_market_stream
+from fast_json import dumps
+from kalshi_market_stream import MarketStream
+
+TICKER = 'KXMLBGAME-25JUL04BOSNYY-NYY'
+SNAPSHOT = {'type': 'orderbook_snapshot', 'sid': 1, 'seq': 1,
+            'msg': {'market_ticker': TICKER, 'yes': [[40, 10]], 'no': [[57, 10]]}}
+
+
+class FakeClient:
+    host = 'https://example.invalid/trade-api/v2'
+    key_id = 'key-id'
+
+    def sign_pss_text(self, text):
+        return 'signature'
+
+
+class FakeConnection:
+    """One websocket session replaying raw messages; the subscribe is acknowledged first."""
+
+    def __init__(self, messages):
+        self.messages = [{'type': 'subscribed', 'id': None, 'msg': {'sid': 1, 'channel': 'orderbook_delta'}}]
+        self.messages += messages
+        self.sent = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def __aiter__(self):
+        for message in self.messages:
+            yield dumps(message)
+        await asyncio.Event().wait()
+
+
+def test_unexpected_errors_are_logged_and_the_stream_reconnects(monkeypatch, caplog):
+    # A delta without its 'delta' field breaks the message handler
+    broken = {'type': 'orderbook_delta', 'sid': 1, 'seq': 2, 'msg': {'market_ticker': TICKER, 'side': 'yes',
+                                                                     'price': 40}}
+    sessions = [FakeConnection([SNAPSHOT, broken]), FakeConnection([SNAPSHOT])]
+    monkeypatch.setattr(kalshi_market_stream, 'connect', lambda url, **kwargs: sessions.pop(0))
+
+    async def main():
+        updated = asyncio.Event()
+        stream = MarketStream(FakeClient(), [TICKER], channels=('orderbook_delta',), reconnect_delay=0.001,
+                              on_update=lambda ticker: sessions or updated.set())
+        stream.start()
+        await asyncio.wait_for(updated.wait(), 5)
+        quote = stream.quote(TICKER)
+        await stream.stop()
+        return stream, quote
+
+    with caplog.at_level(logging.WARNING):
+        stream, quote = asyncio.run(main())
+    assert stream.reconnects == 1 and not sessions
+    assert quote['yes_bid'] == 40
+    failure = [record for record in caplog.records if 'Market stream failed' in record.getMessage()]
+    assert failure and failure[0].exc_info[0] is KeyError
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from getExpectedStats import MAX_RUNS, MAX_SCORE_DIFF, N_COUNTS, RUNS_DTYPE, TABLE_SHAPE
+from markov_engine import MarkovWinEngine, run_distributions
+
+
+@pytest.fixture
+def distributions():
+    """Random pmfs over 0-4 runs for every (outs, bases, count) state."""
+    rng = np.random.default_rng(8)
+    pmfs = np.zeros((3, 8, N_COUNTS, MAX_RUNS))
+    pmfs[..., :5] = rng.dirichlet([6, 3, 2, 1, 1], (3, 8, N_COUNTS))
+    return pmfs
+
+
+@pytest.fixture
+def engine(distributions):
+    return MarkovWinEngine(distributions)
+
+
+def test_half_inning_convolutions_are_memoized_pmfs(engine):
+    three = engine.runs_over_halves(3)
+    assert three.sum() == pytest.approx(1)
+    assert three is engine.runs_over_halves(3)
+    np.testing.assert_allclose(three, np.convolve(engine.runs_over_halves(2), engine.fresh_half))
+
+
+def test_symmetric_extra_innings_are_a_coin_flip(engine):
+    assert engine.extra_innings_win == pytest.approx(0.5)
+
+
+def test_bottom_of_the_ninth(engine, distributions):
+    current = distributions[1, 3, 4]  # one out, runners on first and second, 1-1
+    # Trailing by one: two runs win outright, one run ties and goes to extras
+    expected = current[2:].sum() + current[1] * engine.extra_innings_win
+    assert engine.win_probability(9, 1, 1, 3, -1, 1, 1) == pytest.approx(expected)
+    # Leading in the bottom of the ninth the game is already won
+    assert engine.win_probability(9, 1, 1, 3, 1, 1, 1) == 1.0
+    assert engine.win_probability(9, 1, 1, 3, -10, 1, 1) == 0.0
+
+
+def test_win_probability_rises_with_the_score_diff(engine):
+    wins = [engine.win_probability(5, 0, 1, 2, diff, 2, 1) for diff in range(-6, 7)]
+    assert np.all(np.diff(wins) > 0)
+    assert 0 < wins[0] < wins[-1] < 1
+
+
+def test_grid_matches_single_state_probabilities(engine):
+    grid = engine.win_grid()
+    assert grid.shape == TABLE_SHAPE and grid.dtype == np.float32
+    assert engine.win_grid() is grid
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        inning, home_away, outs, bases = rng.integers(1, 11), rng.integers(2), rng.integers(3), rng.integers(8)
+        diff, balls, strikes = rng.integers(-8, 9), rng.integers(4), rng.integers(3)
+        expected = engine.win_probability(inning, home_away, outs, bases, diff, balls, strikes)
+        cell = grid[inning - 1, home_away, outs, bases, diff + MAX_SCORE_DIFF, balls * 3 + strikes]
+        assert cell == pytest.approx(expected, abs=1e-6)
+
+
+def test_to_table_uses_the_grid_and_mean_runs(engine, distributions):
+    table = engine.to_table()
+    assert table.metadata['model'] == 'markov'
+    np.testing.assert_array_equal(table.win, engine.win_grid())
+    mean = (distributions[2, 5, 7] * np.arange(MAX_RUNS)).sum()
+    assert table.runs[3, 1, 2, 5, MAX_SCORE_DIFF, 7] == pytest.approx(mean)
+
+
+def test_run_distributions_normalize_and_require_every_state():
+    records = np.zeros(3 * 8 * N_COUNTS, dtype=RUNS_DTYPE)
+    outs, bases, count = np.unravel_index(np.arange(len(records)), (3, 8, N_COUNTS))
+    records['outs'], records['bases'] = outs, bases
+    records['balls'], records['strikes'] = count // 3, count % 3
+    records['runs'][:, :3] = [6, 3, 1]
+    pmfs = run_distributions(records)
+    np.testing.assert_allclose(pmfs[2, 7, 11, :3], [0.6, 0.3, 0.1])
+    with pytest.raises(ValueError, match="missing for 1 states"):
+        run_distributions(records[1:])
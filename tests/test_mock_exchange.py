@@ -0,0 +1,60 @@
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mock_kalshi_exchange import API_PREFIX, MockExchange, create_app
+
+TICKER = 'KXMLBGAME-25JUL04BOSNYY-NYY'
+ORDER_IDS = itertools.count()
+HEADERS = {'KALSHI-ACCESS-KEY': 'key-id', 'KALSHI-ACCESS-SIGNATURE': 'c2ln', 'KALSHI-ACCESS-TIMESTAMP': '0'}
+
+
+def order():
+    # Far below the simulated book, so it rests
+    return {'ticker': TICKER, 'client_order_id': f'order-{next(ORDER_IDS)}', 'type': 'limit', 'action': 'buy',
+            'side': 'yes', 'count': 1, 'yes_price': 1}
+
+
+@pytest.fixture
+def exchange():
+    return MockExchange(write_rate=2, walk_rate=0.001, seed=1)
+
+
+@pytest.fixture
+def client(exchange):
+    with TestClient(create_app(exchange), headers=HEADERS) as client:
+        yield client
+
+
+def create_batch(client, count, headers=None):
+    return client.post(API_PREFIX + '/portfolio/orders/batched', json={'orders': [order() for _ in range(count)]},
+                       headers=headers)
+
+
+def test_each_order_in_a_batch_takes_a_write_token(client, exchange):
+    assert create_batch(client, 2).status_code == 201
+    response = client.post(API_PREFIX + '/portfolio/orders', json=order())
+    assert response.status_code == 429 and float(response.headers['Retry-After']) > 0.3
+    assert response.json()['error']['code'] == 'too_many_requests'
+    assert exchange.throttled == 1 and len(exchange.orders) == 2
+    # Reads have their own bucket, and other keys their own buckets
+    assert client.get(API_PREFIX + '/portfolio/balance').status_code == 200
+    assert create_batch(client, 1, headers=dict(HEADERS, **{'KALSHI-ACCESS-KEY': 'other'})).status_code == 201
+
+
+def test_a_batch_larger_than_the_bucket_is_admitted_when_it_is_full(client, exchange):
+    response = create_batch(client, 5)
+    assert response.status_code == 201
+    assert [result['error'] for result in response.json()['orders']] == [None] * 5
+    # It still costs a token per order: the key waits the rest of the batch out
+    response = client.post(API_PREFIX + '/portfolio/orders', json=order())
+    assert response.status_code == 429 and float(response.headers['Retry-After']) > 1.5
+
+
+def test_each_cancel_in_a_batch_takes_a_write_token(client, exchange):
+    placed = create_batch(client, 2).json()['orders']
+    response = client.request('DELETE', API_PREFIX + '/portfolio/orders/batched',
+                              json={'ids': [result['order']['order_id'] for result in placed]})
+    assert response.status_code == 429
+    assert all(order['status'] == 'resting' for order in exchange.orders.values())
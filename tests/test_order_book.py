@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from decision_surface import DecisionSurface
+from order_book import SIDES, OrderBook
+
+
+def random_book(seed, levels=12):
+    rng = np.random.default_rng(seed)
+    snapshot = {}
+    for side in SIDES:
+        prices = rng.choice(np.arange(1, 100), size=levels, replace=False)
+        snapshot[side] = [[int(price), int(size)] for price, size in zip(prices, rng.integers(1, 40, levels))]
+    return OrderBook.from_snapshot('T', snapshot), snapshot
+
+
+def contracts(levels, reverse):
+    """One price per contract, cheapest first for asks (reverse=False) and highest first for bids."""
+    return [price for price, size in sorted(levels, reverse=reverse) for _ in range(size)]
+
+
+def brute_asks(snapshot, side):
+    other = 'no' if side == 'yes' else 'yes'
+    return contracts([[100 - price, size] for price, size in snapshot[other]], reverse=False)
+
+
+def brute_bids(snapshot, side):
+    return contracts(snapshot[side], reverse=True)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_fill_math_matches_walking_the_book(seed):
+    book, snapshot = random_book(seed)
+    for side in SIDES:
+        asks, bids = brute_asks(snapshot, side), brute_bids(snapshot, side)
+        for count in range(1, len(asks) + 2):
+            if count > len(asks):
+                assert book.buy_cost(side, count) is None and book.marginal_ask(side, count) is None
+                continue
+            assert book.buy_cost(side, count) == sum(asks[:count])
+            assert book.marginal_ask(side, count) == asks[count - 1]
+            assert book.vwap(side, count) == pytest.approx(sum(asks[:count]) / count)
+        for count in range(1, len(bids) + 2):
+            if count > len(bids):
+                assert book.sell_proceeds(side, count) is None and book.marginal_bid(side, count) is None
+                continue
+            assert book.sell_proceeds(side, count) == sum(bids[:count])
+            assert book.marginal_bid(side, count) == bids[count - 1]
+        for limit in range(0, 101):
+            assert book.available_to_buy(side, limit) == sum(price <= limit for price in asks)
+            assert book.available_to_sell(side, limit) == sum(price >= limit for price in bids)
+
+
+def test_deltas_track_the_best_prices():
+    book, snapshot = random_book(7)
+    rng = np.random.default_rng(7)
+    for _ in range(300):
+        side = SIDES[rng.integers(2)]
+        price = int(rng.integers(1, 100))
+        book.apply_delta(side, price, int(rng.integers(-30, 31)))
+        rebuilt = OrderBook.from_snapshot('T', book.snapshot())
+        assert book.quote() == rebuilt.quote()
+        for side in SIDES:
+            assert book.best_bid(side) == rebuilt.best_bid(side)
+            assert book.best_ask(side) == rebuilt.best_ask(side)
+            assert book.buy_cost(side, 5) == rebuilt.buy_cost(side, 5)
+    assert (book.bids['yes'] >= 0).all() and (book.bids['no'] >= 0).all()
+
+
+def test_empty_and_one_sided_books():
+    book = OrderBook.from_response('T', {'orderbook': {'yes': [[40, 10]], 'no': None}})
+    assert book.quote() == {'ticker': 'T', 'yes_bid': 40, 'no_bid': 0, 'yes_ask': 100, 'no_ask': 60}
+    assert book.buy_cost('yes', 1) is None
+    assert book.buy_cost('no', 10) == 600 and book.sell_proceeds('yes', 10) == 400
+    assert book.best_bid('no') is None and book.best_ask('yes') is None
+    book.apply_delta('yes', 40, -10)
+    assert book.quote()['no_ask'] == 100 and book.marginal_bid('yes', 1) is None
+
+
+def test_copy_is_independent():
+    book, _ = random_book(3)
+    copy = book.copy()
+    best = book.best_bid('yes')
+    copy.apply_delta('yes', best, -1000)
+    assert book.best_bid('yes') == best and copy.best_bid('yes') != best
+
+
+def test_depth_sizing_matches_brute_force(sparse_table):
+    surface = DecisionSurface(sparse_table)
+    index = surface.index(1, 1, 0, 0, 0, 0, 0)
+    for seed in range(5):
+        book, _ = random_book(seed, levels=30)
+        for side in SIDES:
+            for limit in (20, 45, 60):
+                best = 0
+                for price in range(1, limit + 1):
+                    offered = book.available_to_buy(side, price)
+                    wanted = surface.contracts(index, side, price, 500, 1.0)
+                    best = max(best, min(offered, wanted))
+                assert surface.depth_contracts(index, side, book, limit, 500, 1.0) == best
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from KalshiClientsBaseV2ApiKey import HttpError
+from order_gateway import OrderError, OrderGateway
+
+
+class FakeClient:
+    """Records calls; orders for ticker 'BAD' are rejected, and batch_error is raised by the batch endpoints."""
+
+    def __init__(self, batch_error=None, drop_last=False):
+        self.batch_error = batch_error
+        self.drop_last = drop_last
+        self.calls = []
+
+    async def batch_create_orders(self, orders):
+        self.calls.append(('batch_create', [order['ticker'] for order in orders]))
+        await asyncio.sleep(0)
+        if self.batch_error is not None:
+            raise self.batch_error
+        results = [{'error': {'code': 'invalid_order', 'message': 'rejected'}} if order['ticker'] == 'BAD'
+                   else {'order': {'ticker': order['ticker'], 'client_order_id': order['client_order_id']}}
+                   for order in orders]
+        return {'orders': results[:-1] if self.drop_last else results}
+
+    async def create_order(self, **order):
+        self.calls.append(('create', order['ticker']))
+        await asyncio.sleep(0)
+        if order['ticker'] == 'BAD':
+            raise HttpError('Bad Request', 400)
+        return {'order': {'ticker': order['ticker'], 'client_order_id': order['client_order_id']}}
+
+    async def batch_cancel_orders(self, order_ids):
+        self.calls.append(('batch_cancel', list(order_ids)))
+        return {'orders': [{'order': {'order_id': order_id, 'status': 'canceled'}} for order_id in order_ids]}
+
+    async def cancel_order(self, order_id):
+        self.calls.append(('cancel', order_id))
+        return {'order': {'order_id': order_id, 'status': 'canceled'}}
+
+
+def order(ticker, **fields):
+    return {'ticker': ticker, 'type': 'limit', 'action': 'buy', 'side': 'yes', 'count': 1, 'yes_price': 50,
+            'no_price': None, **fields}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_submits_share_one_batch():
+    client = FakeClient()
+    gateway = OrderGateway(client, window=0.01)
+
+    async def main():
+        return await asyncio.gather(*(gateway.submit(order(f'T{n}')) for n in range(5)))
+
+    results = run(main())
+    assert client.calls == [('batch_create', ['T0', 'T1', 'T2', 'T3', 'T4'])]
+    assert [result['order']['ticker'] for result in results] == ['T0', 'T1', 'T2', 'T3', 'T4']
+    assert gateway.stats()['order_batches'] == 1 and gateway.stats()['orders'] == 5
+
+
+def test_submit_many_splits_at_max_batch_and_fills_in_ids():
+    client = FakeClient()
+    gateway = OrderGateway(client, max_batch=3)
+    results = run(gateway.submit_many([order(f'T{n}') for n in range(7)]))
+    # A lone remainder goes out as a plain create_order
+    assert client.calls == [('batch_create', ['T0', 'T1', 'T2']), ('batch_create', ['T3', 'T4', 'T5']),
+                            ('create', 'T6')]
+    assert [result['order']['ticker'] for result in results] == [f'T{n}' for n in range(7)]
+    assert len({result['order']['client_order_id'] for result in results}) == 7
+
+
+def test_rejected_order_fails_only_its_caller():
+    gateway = OrderGateway(FakeClient())
+
+    async def main():
+        good = asyncio.ensure_future(gateway.submit(order('GOOD')))
+        bad = asyncio.ensure_future(gateway.submit(order('BAD')))
+        with pytest.raises(OrderError, match='rejected') as error:
+            await bad
+        assert error.value.request['ticker'] == 'BAD'
+        return await good
+
+    assert run(main())['order']['ticker'] == 'GOOD'
+    results = run(gateway.submit_many([order('A'), order('BAD'), order('B')]))
+    assert isinstance(results[1], OrderError)
+    assert results[0]['order']['ticker'] == 'A' and results[2]['order']['ticker'] == 'B'
+
+
+def test_missing_batch_entries_are_errors():
+    results = run(OrderGateway(FakeClient(drop_last=True)).submit_many([order('A'), order('B')]))
+    assert results[0]['order']['ticker'] == 'A'
+    assert isinstance(results[1], OrderError)
+
+
+def test_failed_batch_request_fans_out_to_every_caller():
+    error = HttpError('Internal Server Error', 500)
+    gateway = OrderGateway(FakeClient(batch_error=error))
+    results = run(gateway.submit_many([order('A'), order('B')]))
+    assert results == [error, error]
+    assert gateway.batching
+
+
+@pytest.mark.parametrize('status', [403, 404])
+def test_unavailable_batch_endpoint_falls_back_to_single_orders(status):
+    client = FakeClient(batch_error=HttpError('Forbidden', status))
+    gateway = OrderGateway(client)
+    results = run(gateway.submit_many([order('A'), order('BAD')]))
+    assert results[0]['order']['ticker'] == 'A'
+    assert isinstance(results[1], HttpError) and results[1].status == 400
+    assert not gateway.batching
+    run(gateway.submit_many([order('C'), order('D')]))
+    assert client.calls == [('batch_create', ['A', 'BAD']), ('create', 'A'), ('create', 'BAD'),
+                            ('create', 'C'), ('create', 'D')]
+
+
+def test_cancels_are_batched_separately():
+    client = FakeClient()
+    gateway = OrderGateway(client)
+
+    async def main():
+        return await asyncio.gather(gateway.cancel('o1'), gateway.cancel('o2'), gateway.submit(order('A')))
+
+    first, second, placed = run(main())
+    assert first['order']['order_id'] == 'o1' and second['order']['order_id'] == 'o2'
+    assert placed['order']['ticker'] == 'A'
+    assert sorted(call[0] for call in client.calls) == ['batch_cancel', 'create']
+    assert gateway.stats()['cancel_batches'] == 1
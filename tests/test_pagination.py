@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from KalshiClientsBaseV2ApiKey import ExchangeClient
+from kalshi_async_client import AsyncExchangeClient
+
+ROWS = [{'ticker': f'M{i}', 'volume': i} for i in range(7)]
+
+
+def page(limit, cursor):
+    start = int(cursor or 0)
+    rows = ROWS[start:start + limit]
+    return {'markets': rows, 'cursor': str(start + limit) if start + limit < len(ROWS) else ''}
+
+
+@pytest.fixture
+def client():
+    client = ExchangeClient('http://127.0.0.1:9', 'key-id', None)
+    client.calls = []
+
+    def get_markets(limit=None, cursor=None, **filters):
+        client.calls.append((cursor, filters))
+        return page(limit, cursor)
+
+    client.get_markets = get_markets
+    return client
+
+
+@pytest.fixture
+def async_client():
+    client = AsyncExchangeClient('http://127.0.0.1:9', 'key-id', None)
+    client.calls = []
+
+    async def get_markets(limit=None, cursor=None, **filters):
+        client.calls.append((cursor, filters))
+        await asyncio.sleep(0)
+        return page(limit, cursor)
+
+    client.get_markets = get_markets
+    yield client
+    asyncio.run(client.close())
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_follows_cursors_to_the_last_page(client, prefetch):
+    assert list(client.iter_markets(page_size=3, prefetch=prefetch, status='open')) == ROWS
+    assert client.calls == [(None, {'status': 'open'}), ('3', {'status': 'open'}), ('6', {'status': 'open'})]
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_max_items_stops_fetching(client, prefetch):
+    assert list(client.iter_markets(page_size=2, max_items=3, prefetch=prefetch)) == ROWS[:3]
+    # The second page has the last wanted row; no third page is requested, even ahead of time
+    assert [cursor for cursor, _ in client.calls] == [None, '2']
+
+
+def test_caller_stopping_early_stops_fetching(client):
+    rows = client.iter_markets(page_size=2, prefetch=False)
+    assert next(rows) == ROWS[0]
+    rows.close()
+    assert len(client.calls) == 1
+    # With prefetch, at most the page after the current one is requested
+    rows = client.iter_markets(page_size=2)
+    for row in rows:
+        if row == ROWS[2]:
+            break
+    rows.close()
+    assert len(client.calls) <= 3
+
+
+def test_batches(client):
+    batches = list(client.iter_markets(page_size=4, batches='numpy'))
+    assert [len(batch['ticker']) for batch in batches] == [4, 3]
+    np.testing.assert_array_equal(np.concatenate([batch['volume'] for batch in batches]), np.arange(7))
+    frames = list(client.iter_markets(page_size=4, max_items=5, batches='pandas'))
+    assert [len(frame) for frame in frames] == [4, 1] and list(frames[1]['ticker']) == ['M4']
+    with pytest.raises(ValueError, match='Unknown batch format'):
+        list(client.iter_markets(batches='arrow'))
+
+
+def test_async_iteration_stops_at_max_items(async_client):
+    async def collect(**options):
+        return [row async for row in async_client.iter_markets(**options)]
+
+    assert asyncio.run(collect(page_size=3)) == ROWS
+    async_client.calls.clear()
+    assert asyncio.run(collect(page_size=2, max_items=3)) == ROWS[:3]
+    assert [cursor for cursor, _ in async_client.calls] == [None, '2']
+
+
+def test_async_early_exit_cancels_the_prefetch(async_client):
+    async def first_row():
+        rows = async_client.iter_markets(page_size=2)
+        async for row in rows:
+            await rows.aclose()
+            return row
+
+    assert asyncio.run(first_row()) == ROWS[0]
+    assert len(async_client.calls) <= 2
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from getExpectedStats import (MAX_RUNS, decode_bases, parse_leverage_index, parse_runs_per_inning_balls_strikes_stats,
+                              parse_stats_with_balls_strikes, read_leverage_index,
+                              read_runs_per_inning_balls_strikes_stats, read_stats_with_balls_strikes,
+                              WinExpectancyTable)
+
+rng = np.random.default_rng(3)
+
+
+def stats_lines(count):
+    lines = []
+    for _ in range(count):
+        inning, half, outs, balls, strikes = (int(rng.integers(1, 14)), int(rng.integers(2)), int(rng.integers(3)),
+                                              int(rng.integers(4)), int(rng.integers(3)))
+        bases = tuple(int(b) for b in rng.integers(0, 2, 3))
+        total = int(rng.integers(1, 500))
+        lines.append(f'({inning}, {half}, {outs}, {bases}, {int(rng.integers(-12, 13))}, ({balls}, {strikes})): '
+                     f'({int(rng.integers(0, total + 1))}, {total})')
+    return lines
+
+
+def leverage_lines(count):
+    return [f'"{"H" if rng.integers(2) else "V"}",{int(rng.integers(1, 13))},{int(rng.integers(3))},'
+            f'{int(rng.integers(1, 9))},{int(rng.integers(-12, 13))},{rng.uniform(0, 5):.2f}' for _ in range(count)]
+
+
+def runs_lines():
+    lines = []
+    for outs in range(3):
+        for mask in range(8):
+            for balls in range(4):
+                for strikes in range(3):
+                    # Some rows run past MAX_RUNS
+                    length = int(rng.integers(3, MAX_RUNS + 6))
+                    counts = ', '.join(str(int(count)) for count in rng.integers(1, 1000, length))
+                    lines.append(f'({outs}, {decode_bases(mask)}, ({balls}, {strikes})): [{counts}]')
+    return lines
+
+
+def write(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_stats_parser_matches_legacy_reader(tmp_path):
+    # Duplicate states, including innings capped to 10, keep the last row like the dict did
+    path = write(tmp_path, 'stats', stats_lines(3000))
+    legacy = read_stats_with_balls_strikes(path)
+    records, stats = parse_stats_with_balls_strikes(path)
+    assert stats.rows_read == 3000 and stats.rows_rejected == 0
+    parsed = {}
+    for record in records:
+        key = (int(record['inning']), int(record['home_away']), int(record['outs']),
+               decode_bases(int(record['bases'])), int(record['score_diff']),
+               (int(record['balls']), int(record['strikes'])))
+        parsed[key] = record['win']
+    flattened = {(inning, half, outs, bases, diff, count): value
+                 for inning, halves in legacy.items() for half, outs_dict in halves.items()
+                 for outs, bases_dict in outs_dict.items() for bases, diffs in bases_dict.items()
+                 for diff, counts in diffs.items() for count, value in counts.items()}
+    assert parsed.keys() == flattened.keys()
+    for key, value in flattened.items():
+        assert parsed[key] == pytest.approx(value)
+
+
+def test_leverage_parser_matches_legacy_reader(tmp_path):
+    path = write(tmp_path, 'leverage', leverage_lines(2000))
+    legacy = read_leverage_index(path)
+    records, _ = parse_leverage_index(path)
+    parsed = {(int(r['inning']), int(r['home_away']), int(r['outs']), decode_bases(int(r['bases'])),
+               int(r['score_diff'])): r['leverage'] for r in records}
+    flattened = {(inning, half, outs, bases, diff): value
+                 for inning, halves in legacy.items() for half, outs_dict in halves.items()
+                 for outs, bases_dict in outs_dict.items() for bases, diffs in bases_dict.items()
+                 for diff, value in diffs.items()}
+    assert parsed == pytest.approx(flattened)
+
+
+def test_runs_parser_matches_legacy_reader(tmp_path):
+    path = write(tmp_path, 'runs', runs_lines())
+    legacy = read_runs_per_inning_balls_strikes_stats(path)
+    records, _ = parse_runs_per_inning_balls_strikes_stats(path)
+    assert len(records) == 3 * 8 * 12
+    for record in records:
+        expected = legacy[int(record['outs'])][decode_bases(int(record['bases']))][
+            (int(record['balls']), int(record['strikes']))]
+        assert record['expected_runs'] == pytest.approx(expected)
+    # Long rows are folded into the last bucket, so no count is lost
+    totals = [sum(int(count) for count in line.split('[')[1].rstrip(']').split(','))
+              for line in open(path).read().split('\n') if line]
+    assert records['runs'].sum(axis=1).tolist() == totals
+
+
+def test_malformed_lines_are_rejected(tmp_path):
+    path = write(tmp_path, 'stats', stats_lines(5) + ['not a row', '(1, 1, 0, (0, 0), 0, (0, 0)): (1, 2)'])
+    records, stats = parse_stats_with_balls_strikes(path)
+    assert len(records) == 5 and stats.rows_rejected == 2
+
+
+def test_capped_innings_pool_their_games(tmp_path):
+    stats = write(tmp_path, 'stats', ['(10, 1, 0, (0, 0, 0), 0, (0, 0)): (6, 10)',
+                                      '(11, 1, 0, (0, 0, 0), 0, (0, 0)): (3, 10)',
+                                      '(13, 0, 0, (0, 0, 0), 0, (0, 0)): (1, 4)',
+                                      '(12, 0, 0, (0, 0, 0), 0, (0, 0)): (0, 0)'])
+    table = WinExpectancyTable.from_records(parse_stats_with_balls_strikes(stats)[0],
+                                            parse_leverage_index(write(tmp_path, 'leverage', []))[0],
+                                            parse_runs_per_inning_balls_strikes_stats(write(tmp_path, 'runs', []))[0])
+    assert (table.won[9, 1, 0, 0, 30, 0], table.total[9, 1, 0, 0, 30, 0]) == (9, 20)
+    assert table.win[9, 1, 0, 0, 30, 0] == pytest.approx(0.45)
+    # The visitors' row: win % stays from the home side, and a 0-game row adds nothing
+    assert (table.won[9, 0, 0, 0, 30, 0], table.total[9, 0, 0, 0, 30, 0]) == (1, 4)
+    assert table.win[9, 0, 0, 0, 30, 0] == pytest.approx(0.75)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+from rate_limiter import (BACKGROUND, NORMAL, SAFETY_MARGIN, URGENT, RateLimiter, request_priority,
+                          retry_after_seconds)
+from request_timing import DeadlineExceeded
+
+
+def drained(rate=50.0):
+    """A limiter at exactly rate reads and writes per second, with both buckets empty."""
+    limiter = RateLimiter(rate, rate, margin=1.0)
+    for bucket in limiter.buckets.values():
+        bucket.drain(time.monotonic())
+    return limiter
+
+
+def test_rates_keep_a_safety_margin():
+    limiter = RateLimiter(20, 10)
+    assert limiter.buckets['read'].rate == pytest.approx(20 * SAFETY_MARGIN)
+    assert limiter.buckets['write'].capacity == pytest.approx(10 * SAFETY_MARGIN)
+
+
+def test_default_lanes():
+    limiter = RateLimiter()
+    assert limiter.lane_for('POST') == limiter.lane_for('DELETE') == URGENT
+    assert limiter.lane_for('GET') == NORMAL
+    with request_priority(BACKGROUND):
+        assert limiter.lane_for('POST') == BACKGROUND
+
+
+def test_waiters_are_served_by_lane_then_arrival():
+    limiter = drained()
+    served = []
+
+    async def request(name, lane, method='GET'):
+        with request_priority(lane):
+            await limiter.acquire_async(method)
+        served.append(name)
+
+    async def main():
+        # All queue up before the first token arrives, lowest priority first
+        await asyncio.gather(request('background 1', BACKGROUND), request('normal 1', NORMAL),
+                             request('background 2', BACKGROUND), request('urgent 1', URGENT),
+                             request('normal 2', NORMAL), request('urgent 2', URGENT))
+
+    asyncio.run(main())
+    assert served == ['urgent 1', 'urgent 2', 'normal 1', 'normal 2', 'background 1', 'background 2']
+    lanes = limiter.metrics()['read']['lanes']
+    assert lanes['urgent']['acquired'] == lanes['normal']['acquired'] == lanes['background']['acquired'] == 2
+
+
+def test_reads_and_writes_have_separate_buckets():
+    limiter = drained()
+    limiter.buckets['write'].tokens = 1
+    assert limiter.try_acquire('POST')
+    assert not limiter.try_acquire('POST')
+    assert not limiter.try_acquire('GET')
+
+
+def test_try_acquire_does_not_jump_the_queue():
+    limiter = drained(rate=5.0)
+
+    async def main():
+        waiting = asyncio.create_task(limiter.acquire_async('GET'))
+        await asyncio.sleep(0)
+        limiter.buckets['read'].tokens = 1
+        assert not limiter.try_acquire('GET')
+        await waiting
+
+    asyncio.run(main())
+
+
+def test_timeout_raises_and_leaves_the_queue():
+    limiter = drained(rate=1.0)
+    with pytest.raises(DeadlineExceeded):
+        limiter.acquire('GET', timeout=0.05)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(limiter.acquire_async('GET', timeout=0.05))
+    assert limiter.metrics()['read']['queued'] == 0
+
+
+def test_server_throttle_drains_for_retry_after():
+    limiter = RateLimiter(20, 10, margin=1.0)
+    limiter.record_server_throttle('GET', retry_after_seconds('0.5'))
+    assert limiter.buckets['read'].wait_time(time.monotonic()) == pytest.approx(0.55, abs=0.02)
+    assert limiter.buckets['write'].wait_time(time.monotonic()) == 0
+    limiter.record_server_throttle('POST')
+    assert limiter.buckets['write'].wait_time(time.monotonic()) == pytest.approx(0.2, abs=0.02)
+    assert limiter.metrics()['read']['server_throttles'] == 1
+
+
+@pytest.mark.parametrize('value, seconds', [('2', 2.0), ('0.25', 0.25), ('-1', 0.0), (None, None),
+                                            ('Wed, 21 Oct 2015 07:28:00 GMT', None)])
+def test_retry_after_seconds(value, seconds):
+    assert retry_after_seconds(value) == seconds
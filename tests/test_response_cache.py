@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from response_cache import ResponseCache, cache_key
+
+EVENT = '/events/KXMLBGAME-25JUL04BOSNYY'
+MARKET = '/markets/KXMLBGAME-25JUL04BOSNYY-NYY'
+
+
+def test_ttls_by_endpoint():
+    cache = ResponseCache()
+    assert cache.ttl_for(MARKET + '/orderbook') == 0.25
+    assert cache.ttl_for(EVENT + '?with_nested_markets=true') == 1.0
+    assert cache.ttl_for(MARKET) == 1.0
+    assert cache.ttl_for('/series/KXMLBGAME') == 60.0
+    assert cache.ttl_for('/markets/trades?limit=100') is None
+    assert cache.ttl_for('/portfolio/positions') is None
+    assert cache_key('/markets', {'b': 1, 'a': 2}) == cache_key('/markets', {'a': 2, 'b': 1}) != '/markets'
+
+
+def test_concurrent_threads_share_one_fetch():
+    cache = ResponseCache()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'event': 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch(EVENT, 1.0, fetch)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['misses'] + cache.stats()['coalesced'] < 5:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == [{'event': 1}] * 5
+    assert cache.get_or_fetch(EVENT, 1.0, fetch) == {'event': 1}
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'coalesced': 4, 'evictions': 0}
+
+
+def test_concurrent_tasks_share_one_fetch_and_errors_are_not_cached():
+    cache = ResponseCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ConnectionError('down')
+        return {'market': 2}
+
+    async def main():
+        failed = await asyncio.gather(*(cache.get_or_fetch_async(MARKET, 1.0, fetch) for _ in range(3)),
+                                      return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in failed)
+        return await asyncio.gather(*(cache.get_or_fetch_async(MARKET, 1.0, fetch) for _ in range(3)))
+
+    assert asyncio.run(main()) == [{'market': 2}] * 3
+    assert len(calls) == 2 and cache.stats()['coalesced'] == 4
+
+
+def test_cancelled_follower_does_not_cancel_the_shared_fetch():
+    cache = ResponseCache()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 'value'
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_fetch_async(MARKET, 1.0, fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_fetch_async(MARKET, 1.0, fetch))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == 'value'
+
+
+def test_a_write_during_a_fetch_keeps_the_stale_response_out():
+    cache = ResponseCache()
+
+    def fetch_racing_a_write():
+        # The order lands while the read is in flight, so the read may predate it
+        cache.invalidate_write('{"ticker": "KXMLBGAME-25JUL04BOSNYY-NYY"}')
+        return 'before the order'
+
+    assert cache.get_or_fetch(MARKET, 1.0, fetch_racing_a_write) == 'before the order'
+    assert cache.get_or_fetch(MARKET, 1.0, lambda: 'after the order') == 'after the order'
+    assert cache.get_or_fetch(MARKET, 1.0, lambda: 'cached') == 'after the order'
+
+
+def test_writes_drop_the_market_and_its_event_only():
+    cache = ResponseCache()
+    other = '/markets/KXMLBGAME-25JUL04LADSF-SF'
+    for key in (EVENT, MARKET, MARKET + '/orderbook', other):
+        cache.get_or_fetch(key, 10, lambda: key)
+    cache.invalidate_write(b'{"orders": [{"ticker": "KXMLBGAME-25JUL04BOSNYY-NYY"}]}')
+    assert cache.stats()['entries'] == 1
+    assert cache.get_or_fetch(other, 10, lambda: 'refetched') == other
+    # A write that names no ticker drops everything
+    cache.invalidate_write('not json')
+    assert cache.stats()['entries'] == 0
+
+
+def test_expiry_and_lru_eviction(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(max_entries=2)
+    cache.get_or_fetch('a', 1.0, lambda: 'a1')
+    cache.get_or_fetch('b', 5.0, lambda: 'b1')
+    now[0] += 2
+    assert cache.get_or_fetch('a', 1.0, lambda: 'a2') == 'a2'
+    assert cache.get_or_fetch('b', 5.0, lambda: 'b2') == 'b1'
+    cache.get_or_fetch('c', 5.0, lambda: 'c1')
+    # 'a' was used least recently
+    assert cache.get_or_fetch('a', 1.0, lambda: 'a3') == 'a3'
+    assert cache.stats()['evictions'] == 2
+
+
+def test_waiting_on_another_threads_fetch_times_out():
+    cache = ResponseCache()
+    release = threading.Event()
+    leader = threading.Thread(target=cache.get_or_fetch, args=(EVENT, 1.0, lambda: release.wait(5)))
+    leader.start()
+    while not cache.stats()['misses']:
+        time.sleep(0.001)
+    with pytest.raises(TimeoutError):
+        cache.get_or_fetch(EVENT, 1.0, lambda: 'unused', timeout=0.01)
+    release.set()
+    leader.join()
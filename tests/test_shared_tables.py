@@ -0,0 +1,61 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from getExpectedStats import MAX_SCORE_DIFF, WinExpectancyTable
+from shared_tables import (SharedTableChannel, attach_table, default_name, generation_name, load_table,
+                           publish_table)
+
+
+@pytest.fixture
+def segment_name(request):
+    return f'{default_name()}_{request.node.name[:20]}'
+
+
+def test_publish_and_attach(sparse_table, segment_name):
+    shm = publish_table(sparse_table, segment_name)
+    try:
+        table = attach_table(segment_name)
+        np.testing.assert_array_equal(table.win_filled, sparse_table.win_filled)
+        assert not table.win.flags.writeable
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_existing_segment_is_never_replaced(sparse_table, segment_name):
+    shm = publish_table(sparse_table, segment_name)
+    try:
+        with pytest.raises(FileExistsError, match='already exists'):
+            publish_table(sparse_table, segment_name)
+        np.testing.assert_array_equal(attach_table(segment_name).win_filled, sparse_table.win_filled)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_channel_shares_reloads_between_workers(sparse_table, segment_name):
+    shm = publish_table(sparse_table, segment_name)
+    shm.close()
+    channel = SharedTableChannel.create(segment_name)
+    try:
+        worker = SharedTableChannel(segment_name)
+        assert worker.generation() == 0
+        reloaded = WinExpectancyTable(**{name: array.copy() for name, array in sparse_table.arrays().items()})
+        reloaded.win[0, 1, 0, 0, MAX_SCORE_DIFF, 0] = 0.6
+        generation, table = channel.publish(reloaded)
+        assert generation == worker.generation() == 1
+        assert table.metadata['shm_generation'] == 1
+        np.testing.assert_array_equal(worker.attach(1).win, reloaded.win)
+        # The superseded generation is removed; attached copies stay readable
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=segment_name)
+        assert load_table(worker).win[0, 1, 0, 0, MAX_SCORE_DIFF, 0] == np.float32(0.6)
+        worker.close()
+    finally:
+        channel.close(unlink=True)
+    with pytest.raises(FileNotFoundError):
+        SharedTableChannel(segment_name)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=generation_name(segment_name, 1))
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from decision_surface import DecisionSurface
+from game_simulator import SimulationResult
+from getExpectedStats import valid_states
+from speculative_decisions import DecisionCache, speculate, successor_states, top_of_book
+
+QUOTE = {'ticker': 'GAME-HOME', 'yes_bid': 40, 'yes_ask': 42, 'no_bid': 57, 'no_ask': 59}
+
+
+def successors(state):
+    return dict((event, successor) for event, successor in successor_states(state))
+
+
+def test_successors_include_the_current_state():
+    state = (3, 0, 1, 0, 0, 1, 2)
+    events = successors(state)
+    # A foul with two strikes leaves the state as it was
+    assert events['unchanged'] == state
+    assert 'strike' not in events and events['ball'] == (3, 0, 1, 0, 0, 2, 2)
+    assert 'ball' not in successors((3, 0, 1, 0, 0, 3, 0))
+
+
+def test_plays_move_runners_and_score_for_the_batting_team():
+    loaded = (5, 1, 1, 7, 0, 3, 2)  # Home batting, bases loaded, one out
+    events = successors(loaded)
+    assert events['walk'] == (5, 1, 1, 7, 1, 0, 0)
+    assert events['home_run'] == (5, 1, 1, 0, 4, 0, 0)
+    assert events['single'] == (5, 1, 1, 7, 1, 0, 0)
+    assert events['flyout'] == (5, 1, 2, 3, 1, 0, 0)
+    # Two more outs end the inning, and the runs on the play do not count
+    assert events['double_play'] == (6, 0, 0, 0, 0, 0, 0)
+    # Visitors batting: their runs lower the home-minus-away diff
+    assert successors((5, 0, 0, 2, 0, 0, 0))['double'] == (5, 0, 0, 2, -1, 0, 0)
+
+
+def test_third_out_ends_the_half_inning():
+    assert successors((7, 0, 2, 5, 1, 0, 2))['strikeout'] == (7, 1, 0, 0, 1, 0, 0)
+    assert successors((7, 1, 2, 5, 1, 0, 2))['groundout'] == (8, 0, 0, 0, 1, 0, 0)
+
+
+@pytest.mark.parametrize('state', [(1, 0, 0, 0, 0, 0, 0), (9, 1, 2, 7, -1, 3, 2), (4, 0, 1, 1, 2, 2, 1)])
+def test_every_successor_is_a_table_state(state):
+    for _, (inning, home_away, outs, bases, _, balls, strikes) in successor_states(state):
+        assert valid_states(home_away, outs, bases, balls, strikes)
+
+
+class FixedSimulator:
+    def simulate(self, *state, paths):
+        return SimulationResult(0.6, 0.01, paths)
+
+
+def test_speculate_decides_each_distinct_successor(sparse_table):
+    state = (1, 1, 0, 0, 0, 0, 2)
+    decisions = speculate(state, DecisionSurface(sparse_table), FixedSimulator(), QUOTE, 100, 0, 0, 0.25, 10)
+    assert set(decisions) == {successor for _, successor in successor_states(state)}
+    assert decisions[state].state == state and decisions[state].quote is QUOTE
+
+
+def cache_with(decisions, cache=None, **overrides):
+    cache = cache or DecisionCache()
+    arguments = dict(context=(100, 0, 0), quoted_at=time.monotonic(), market=top_of_book(QUOTE), table_version=1)
+    arguments.update(overrides)
+    sequence = arguments.pop('sequence', None) or cache.begin()
+    assert cache.store(decisions, sequence=sequence, **arguments)
+    return cache
+
+
+def test_cache_hits_only_for_the_context_it_was_computed_with():
+    cache = cache_with({'state': 'decision'})
+    assert cache.lookup('state', (100, 0, 0), top_of_book(QUOTE), 1) == 'decision'
+    assert cache.lookup('other', (100, 0, 0), top_of_book(QUOTE), 1) is None
+    assert cache.lookup('state', (90, 1, 0), top_of_book(QUOTE), 1) is None
+    assert cache.lookup('state', (100, 0, 0), None, 1) is None
+    assert cache.lookup('state', (100, 0, 0), top_of_book({**QUOTE, 'yes_ask': 43}), 1) is None
+    assert cache.lookup('state', (100, 0, 0), top_of_book(QUOTE), 2) is None
+    assert (cache.hits, cache.misses) == (1, 5)
+    stale = cache_with({'state': 'decision'}, quoted_at=time.monotonic() - 10)
+    assert stale.lookup('state', (100, 0, 0), top_of_book(QUOTE), 1) is None
+
+
+def test_late_store_from_a_cancelled_speculation_is_dropped():
+    cache = DecisionCache()
+    cancelled = cache.begin()
+    current = cache.begin()
+    assert not cache.store({'state': 'stale'}, (100, 0, 0), time.monotonic(), top_of_book(QUOTE), 1, cancelled)
+    assert cache.lookup('state', (100, 0, 0), top_of_book(QUOTE), 1) is None
+    assert cache.store({'state': 'fresh'}, (100, 0, 0), time.monotonic(), top_of_book(QUOTE), 1, current)
+    assert cache.lookup('state', (100, 0, 0), top_of_book(QUOTE), 1) == 'fresh'
+
+
+def test_decisions_expire_when_the_next_speculation_begins():
+    cache = cache_with({'state': 'decision'})
+    cache.begin()
+    assert cache.lookup('state', (100, 0, 0), top_of_book(QUOTE), 1) is None
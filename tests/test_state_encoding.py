@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from decision_surface import DecisionSurface
+from getExpectedStats import (MAX_INNING, MAX_SCORE_DIFF, TABLE_SHAPE, InvalidStateError, WinExpectancyTable,
+                              decode_bases, encode_bases, lookup_many)
+
+OUT_OF_RANGE = [
+    (1, 0, 3, 0, 0, 0, 0),   # three outs would alias the next half-inning
+    (1, 0, 0, 0, 0, 0, 3),   # three strikes would read (balls + 1, 0)
+    (1, 0, 0, 0, 0, 4, 0),   # four balls would spill into the next row
+    (10, 1, 3, 0, 0, 0, 0),  # past the end of the table
+    (1, 2, 0, 0, 0, 0, 0),
+    (1, 0, 0, 8, 0, 0, 0),
+    (1, 0, -1, 0, 0, 0, 0),
+    (1, 0, 0, 0, 0, -1, 0),
+]
+
+
+def random_states(count, seed=0):
+    """Valid (inning, home_away, outs, bases, score_diff, balls, strikes) rows, as an (n, 7) array."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(1, 14, count), rng.integers(0, 2, count), rng.integers(0, 3, count),
+        rng.integers(0, 8, count), rng.integers(-40, 41, count), rng.integers(0, 4, count),
+        rng.integers(0, 3, count),
+    ])
+
+
+def test_state_index_matches_table_layout():
+    for state in random_states(500):
+        inning, home_away, outs, bases, score_diff, balls, strikes = (int(field) for field in state)
+        expected = (min(inning, MAX_INNING) - 1, home_away, outs, bases,
+                    max(-MAX_SCORE_DIFF, min(score_diff, MAX_SCORE_DIFF)) + MAX_SCORE_DIFF, balls * 3 + strikes)
+        index = WinExpectancyTable.state_index(inning, home_away, outs, bases, score_diff, balls, strikes)
+        assert np.unravel_index(index, TABLE_SHAPE) == expected
+
+
+def test_state_indices_matches_state_index():
+    states = random_states(1000, seed=1)
+    expected = [WinExpectancyTable.state_index(*(int(field) for field in state)) for state in states]
+    assert WinExpectancyTable.state_indices(*states.T).tolist() == expected
+    occupancy = np.array([decode_bases(mask) for mask in states[:, 3]])
+    with_occupancy = WinExpectancyTable.state_indices(states[:, 0], states[:, 1], states[:, 2], occupancy,
+                                                      states[:, 4], states[:, 5], states[:, 6])
+    assert with_occupancy.tolist() == expected
+
+
+def test_bases_round_trip():
+    for mask in range(8):
+        assert encode_bases(*decode_bases(mask)) == mask
+
+
+def test_innings_and_score_diffs_are_clamped():
+    index = WinExpectancyTable.state_index
+    assert index(14, 1, 0, 0, 0, 0, 0) == index(MAX_INNING, 1, 0, 0, 0, 0, 0)
+    assert index(0, 1, 0, 0, 0, 0, 0) == index(1, 1, 0, 0, 0, 0, 0)
+    assert index(1, 1, 0, 0, 99, 0, 0) == index(1, 1, 0, 0, MAX_SCORE_DIFF, 0, 0)
+    assert index(1, 1, 0, 0, -99, 0, 0) == index(1, 1, 0, 0, -MAX_SCORE_DIFF, 0, 0)
+
+
+@pytest.mark.parametrize('state', OUT_OF_RANGE)
+def test_out_of_range_state_raises(state, sparse_table):
+    with pytest.raises(InvalidStateError):
+        WinExpectancyTable.state_index(*state)
+    with pytest.raises(KeyError):
+        sparse_table.lookup_with_fallback(*state)
+    with pytest.raises(InvalidStateError):
+        DecisionSurface.index(*state)
+    with pytest.raises(InvalidStateError):
+        WinExpectancyTable.state_indices(*np.array([(1, 1, 0, 0, 0, 0, 0), state]).T)
+
+
+def test_lookup_many_masks_out_of_range_states(sparse_table):
+    valid = [(1, 1, 0, 0, 0, 0, 0), (1, 1, 0, 0, 1, 0, 0), (5, 0, 2, 3, -4, 2, 1)]
+    states = np.array(valid[:1] + OUT_OF_RANGE + valid[1:])
+    invalid = np.zeros(len(states), dtype=bool)
+    invalid[1:1 + len(OUT_OF_RANGE)] = True
+    for fallback in (False, True):
+        result = lookup_many(*states.T, table=sparse_table, fallback=fallback)
+        assert result.invalid.tolist() == invalid.tolist()
+        assert np.isnan(result.win[invalid]).all() and np.isnan(result.leverage[invalid]).all()
+        assert result.missing[invalid].all()
+        for row in np.flatnonzero(~invalid):
+            state = tuple(int(field) for field in states[row])
+            if fallback:
+                expected = sparse_table.lookup_with_fallback(*state)
+                assert result.fallback[row] == expected[3]
+            else:
+                expected = sparse_table.lookup(*state)
+            np.testing.assert_equal((result.win[row], result.leverage[row], result.runs[row]),
+                                    np.float32(expected[:3]))
+        if fallback:
+            assert (result.fallback[invalid] == 0).all()
+
+
+def test_ingest_skips_out_of_range_states(sparse_table):
+    deltas = sparse_table.ingest_completed_game([(1, 1, 0, 0, 0, 0, 0), (1, 1, 3, 0, 0, 0, 0)], home_won=True)
+    assert deltas['index'].tolist() == [WinExpectancyTable.state_index(1, 1, 0, 0, 0, 0, 0)]
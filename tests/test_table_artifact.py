@@ -0,0 +1,107 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+import getExpectedStats
+from getExpectedStats import (ARTIFACT_HEADER_SIZE, ARTIFACT_MAGIC, build_win_expectancy_table,
+                              load_win_expectancy_table, pack_table, read_table_artifact, unpack_table,
+                              write_table_artifact)
+
+
+def load(artifact, source_files, **kwargs):
+    return load_win_expectancy_table(artifact, source_files['stats'], source_files['leverage'],
+                                     source_files['runs'], **kwargs)
+
+
+def assert_same_table(actual, expected):
+    for name, array in expected.arrays().items():
+        np.testing.assert_array_equal(getattr(actual, name), array, err_msg=name)
+
+
+def test_pack_unpack_round_trip(sparse_table):
+    header, placed = pack_table(sparse_table, {'stats': 'abc'})
+    buffer = bytearray(max(offset + array.nbytes for offset, array in placed))
+    buffer[:len(header)] = header
+    for offset, array in placed:
+        assert offset % 64 == 0
+        buffer[offset:offset + array.nbytes] = array.tobytes()
+    table = unpack_table(buffer)
+    assert_same_table(table, sparse_table)
+    assert table.metadata['sources'] == {'stats': 'abc'}
+
+
+def test_write_and_map_artifact(tmp_path, sparse_table):
+    path = str(tmp_path / 'tables.bin')
+    write_table_artifact(sparse_table, path, {'stats': 'abc'})
+    table = read_table_artifact(path)
+    assert_same_table(table, sparse_table)
+    assert not table.win.flags.writeable
+    writable = read_table_artifact(path, writable=True)
+    writable.win[0, 0, 0, 0, 0, 0] = 0.9
+    # Copy-on-write: the file keeps its values
+    assert np.isnan(read_table_artifact(path).win[0, 0, 0, 0, 0, 0])
+
+
+def test_load_compiles_then_maps_the_artifact(tmp_path, source_files, monkeypatch):
+    artifact = str(tmp_path / 'tables.bin')
+    table = load(artifact, source_files)
+    assert_same_table(table, build_win_expectancy_table(source_files['stats'], source_files['leverage'],
+                                                        source_files['runs']))
+    assert table.lookup(1, 1, 0, 0, 0, 0, 0)[0] == pytest.approx(0.55)
+
+    def fail(*args):
+        raise AssertionError('recompiled an up-to-date artifact')
+    monkeypatch.setattr(getExpectedStats, 'compile_tables', fail)
+    assert_same_table(load(artifact, source_files), table)
+
+
+def test_changed_source_invalidates_the_artifact(tmp_path, source_files):
+    artifact = str(tmp_path / 'tables.bin')
+    before = load(artifact, source_files)
+    with open(source_files['stats'], 'a') as file:
+        file.write('(2, 1, 0, (0, 0, 0), 0, (0, 0)): (80, 100)\n')
+    after = load(artifact, source_files)
+    assert after.metadata['sources']['stats'] != before.metadata['sources']['stats']
+    assert after.lookup(2, 1, 0, 0, 0, 0, 0)[0] == pytest.approx(0.8)
+    assert read_table_artifact(artifact).lookup(2, 1, 0, 0, 0, 0, 0)[0] == pytest.approx(0.8)
+
+
+def test_artifact_from_another_version_is_rebuilt(tmp_path, source_files, capsys):
+    artifact = str(tmp_path / 'tables.bin')
+    load(artifact, source_files)
+    with open(artifact, 'r+b') as file:
+        (length,) = struct.unpack_from('<I', file.read(ARTIFACT_HEADER_SIZE), len(ARTIFACT_MAGIC))
+        file.seek(len(ARTIFACT_MAGIC) + 4)
+        header = json.loads(file.read(length))
+        header['version'] -= 1
+        old = json.dumps(header).encode('utf-8')
+        file.seek(len(ARTIFACT_MAGIC))
+        file.write(struct.pack('<I', len(old)) + old)
+    with pytest.raises(ValueError):
+        read_table_artifact(artifact)
+    table = load(artifact, source_files)
+    assert 'Ignoring artifact' in capsys.readouterr().out
+    assert table.lookup(1, 1, 0, 0, 0, 0, 0)[0] == pytest.approx(0.55)
+    read_table_artifact(artifact)
+
+
+def test_artifact_with_another_shape_is_rejected(sparse_table):
+    header, placed = pack_table(sparse_table, {})
+    (length,) = struct.unpack_from('<I', header, len(ARTIFACT_MAGIC))
+    start = len(ARTIFACT_MAGIC) + 4
+    fields = json.loads(header[start:start + length])
+    fields['shape'][0] += 1
+    changed = json.dumps(fields).encode('utf-8')
+    buffer = bytearray(max(offset + array.nbytes for offset, array in placed))
+    buffer[:start + len(changed)] = header[:len(ARTIFACT_MAGIC)] + struct.pack('<I', len(changed)) + changed
+    with pytest.raises(ValueError, match='shape'):
+        unpack_table(buffer)
+
+
+def test_not_an_artifact(tmp_path):
+    path = tmp_path / 'tables.bin'
+    path.write_bytes(b'\x00' * ARTIFACT_HEADER_SIZE)
+    with pytest.raises(ValueError):
+        read_table_artifact(str(path))
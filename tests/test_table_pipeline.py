@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from getExpectedStats import (MAX_SCORE_DIFF, parse_leverage_index, parse_runs_per_inning_balls_strikes_stats,
+                              read_stats_with_balls_strikes)
+from table_pipeline import (COLUMNS, build_tables, iter_game_chunks, write_leverage_file, write_runs_file,
+                            write_stats_file)
+
+# GAME_ID, INN_CT, BAT_HOME_ID, OUTS_CT, BALLS_CT, STRIKES_CT, AWAY_SCORE_CT, HOME_SCORE_CT, BASE1-3, EVENT_RUNS_CT
+AWAY_WIN = [  # The visitors score once in the top of the first and win 1-0
+    'G1,1,0,0,0,0,0,0,,,,0',
+    'G1,1,0,0,0,0,0,0,,,,0',
+    'G1,1,0,0,1,0,0,0,,,,0',
+    'G1,1,0,0,1,1,0,0,,,,0',
+    'G1,1,0,0,0,0,0,0,r1,,,1',
+    'G1,1,0,0,0,0,1,0,,r2,,0',
+    'G1,1,0,1,0,0,1,0,,r2,,0',
+    'G1,1,0,2,0,0,1,0,,r2,,0',
+    'G1,1,1,0,0,0,1,0,,,,0',
+    'G1,1,1,1,0,0,1,0,,,,0',
+    'G1,1,1,2,0,0,1,0,,,,0',
+]
+HOME_WIN = [  # The home team scores twice in the bottom of the first and wins 2-0
+    'G2,1,0,0,0,0,0,0,,,,0',
+    'G2,1,0,1,0,0,0,0,,,,0',
+    'G2,1,0,2,0,0,0,0,,,,0',
+    'G2,1,1,0,0,0,0,0,,,,2',
+    'G2,1,1,0,0,0,0,2,,,,0',
+    'G2,1,1,1,0,0,0,2,,,,0',
+    'G2,1,1,2,0,0,0,2,,,,0',
+]
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    (raw / 'a.csv').write_text('\n'.join([','.join(COLUMNS)] + AWAY_WIN + [row.replace('G2', 'G3')
+                                                                          for row in HOME_WIN]) + '\n')
+    (raw / 'b.csv').write_text('\n'.join([','.join(COLUMNS)] + HOME_WIN) + '\n')
+    (raw / 'notes.txt').write_text('not a play-by-play file')
+    return raw
+
+
+def test_chunks_hold_whole_games(raw_dir):
+    chunks = list(iter_game_chunks(str(raw_dir / 'a.csv'), chunksize=4))
+    assert sum(len(chunk) for chunk in chunks) == len(AWAY_WIN) + len(HOME_WIN)
+    games = [set(chunk['GAME_ID']) for chunk in chunks]
+    assert all(not first & second for first, second in zip(games, games[1:]))
+
+
+def test_counts_and_run_distributions(raw_dir):
+    won, total, runs, leverage = build_tables(str(raw_dir), workers=1, chunksize=5)
+    # Top of the first, nobody on, tied, 0-0: once per game although G1 repeats it; the visitors won G1 only
+    assert (won[0, 0, 0, 0, MAX_SCORE_DIFF, 0], total[0, 0, 0, 0, MAX_SCORE_DIFF, 0]) == (1, 3)
+    assert (won[0, 1, 0, 0, MAX_SCORE_DIFF, 0], total[0, 1, 0, 0, MAX_SCORE_DIFF, 0]) == (2, 2)
+    assert (won[0, 1, 0, 0, MAX_SCORE_DIFF - 1, 0], total[0, 1, 0, 0, MAX_SCORE_DIFF - 1, 0]) == (0, 1)
+    # Runs to the end of the half from 0 outs, nobody on, 0-0, one row per event
+    assert runs[0, 0, 0, :3].tolist() == [5, 2, 2]
+    assert runs[0, 0, 3, 1] == 1 and runs[0, 0, 4, 1] == 1
+    assert np.isfinite(leverage[0, 0, 0, 0, MAX_SCORE_DIFF]) and np.isnan(leverage[5]).all()
+
+
+def test_pool_and_chunking_do_not_change_the_result(raw_dir):
+    expected = build_tables(str(raw_dir), workers=1, chunksize=100)
+    for result in (build_tables(str(raw_dir), workers=2, chunksize=3), build_tables(str(raw_dir), workers=1,
+                                                                                     chunksize=2)):
+        for array, expected_array in zip(result, expected):
+            np.testing.assert_array_equal(array, expected_array)
+
+
+def test_written_files_round_trip_through_the_readers(raw_dir, tmp_path):
+    won, total, runs, leverage = build_tables(str(raw_dir), workers=1)
+    write_stats_file(won, total, str(tmp_path / 'stats'))
+    write_leverage_file(leverage, str(tmp_path / 'leverage'))
+    write_runs_file(runs, str(tmp_path / 'runs'))
+
+    stats = read_stats_with_balls_strikes(str(tmp_path / 'stats'))
+    assert stats[1][0][0][(0, 0, 0)][0][(0, 0)] == pytest.approx(1 - 1 / 3)
+    assert stats[1][1][0][(0, 0, 0)][-1][(0, 0)] == 0.0
+
+    records, _ = parse_leverage_index(str(tmp_path / 'leverage'))
+    assert len(records) == np.count_nonzero(~np.isnan(leverage))
+    for record in records:
+        cell = (record['inning'] - 1, record['home_away'], record['outs'], record['bases'],
+                record['score_diff'] + MAX_SCORE_DIFF)
+        assert record['leverage'] == pytest.approx(leverage[cell], abs=0.005)
+
+    records, _ = parse_runs_per_inning_balls_strikes_stats(str(tmp_path / 'runs'))
+    for record in records:
+        histogram = runs[record['outs'], record['bases'], record['balls'] * 3 + record['strikes']]
+        np.testing.assert_array_equal(record['runs'], histogram)
+
+
+def test_directory_without_csvs(tmp_path):
+    with pytest.raises(ValueError, match="No CSV files"):
+        build_tables(str(tmp_path))
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+
+import numpy as np
+import pytest
+
+from getExpectedStats import WinExpectancyTable
+from table_registry import TableRegistry, validate_table
+
+
+def empty_table():
+    table = WinExpectancyTable()
+    table.build_fallback()
+    return table
+
+
+def test_empty_initial_table_is_served_with_a_warning(caplog):
+    with caplog.at_level(logging.WARNING):
+        registry = TableRegistry(empty_table())
+    assert 'no populated states' in caplog.text
+    assert registry.version == 1
+
+
+def test_strict_validation_on_swap(sparse_table):
+    registry = TableRegistry(sparse_table)
+    with pytest.raises(ValueError, match='no populated states'):
+        registry.swap(empty_table())
+    assert registry.table is sparse_table and registry.version == 1
+
+
+@pytest.mark.parametrize('strict', [False, True])
+def test_broken_tables_are_always_rejected(sparse_table, strict):
+    unfilled = WinExpectancyTable(win=sparse_table.win)
+    out_of_range = WinExpectancyTable(**{name: array.copy() for name, array in sparse_table.arrays().items()})
+    out_of_range.win[0, 1, 0, 0, 30, 0] = 1.5
+    for table in (unfilled, out_of_range, 'not a table'):
+        with pytest.raises(ValueError):
+            validate_table(table, strict=strict)
+    with pytest.raises(ValueError):
+        TableRegistry(unfilled)
+
+
+def test_swap_keeps_held_versions_until_released(sparse_table):
+    registry = TableRegistry(empty_table())
+    with registry.acquire() as held:
+        version = registry.swap(sparse_table, 'new')
+        assert version.number == registry.version == 2
+        assert registry.table is sparse_table and held is not sparse_table
+        assert [retained['version'] for retained in registry.status()['retained']] == [1]
+    assert registry.status()['retained'] == []
+    assert registry.status()['active']['source'] == 'new'
+
+
+def test_reload_loads_validates_and_swaps(sparse_table):
+    loaded = []
+
+    def loader(source):
+        loaded.append(source)
+        if source == 'empty':
+            return empty_table()
+        return sparse_table
+
+    registry = TableRegistry(empty_table(), loader=loader, source='initial')
+    with pytest.raises(ValueError):
+        asyncio.run(registry.reload('empty'))
+    assert registry.version == 1
+    version = asyncio.run(registry.reload('tables.bin'))
+    assert version.number == registry.version == 2
+    assert registry.table is sparse_table and loaded == ['empty', 'tables.bin']
+    np.testing.assert_equal(registry.table.lookup(1, 1, 0, 0, 0, 0, 0)[0], np.float32(0.55))
+
+
+def test_custom_validator_is_told_when_to_be_strict(sparse_table):
+    calls = []
+    registry = TableRegistry(sparse_table, validator=lambda table, strict=True: calls.append(strict))
+    registry.swap(sparse_table)
+    assert calls == [False, True]
+
+
+def test_reload_validates_once(sparse_table):
+    calls = []
+    registry = TableRegistry(sparse_table, loader=lambda source: sparse_table,
+                             validator=lambda table, strict=True: calls.append(strict))
+    asyncio.run(registry.reload())
+    registry.swap(sparse_table, validated=True)
+    assert calls == [False, True] and registry.version == 3
+
+
+class FakeChannel:
+    """In-process stand-in for SharedTableChannel."""
+
+    def __init__(self, table):
+        self.name = 'fake'
+        self.tables = {0: table}
+
+    def generation(self):
+        return max(self.tables)
+
+    def attach(self, generation):
+        return self.tables[generation]
+
+    def publish(self, table):
+        generation = self.generation() + 1
+        self.tables[generation] = table
+        return generation, table
+
+
+def test_workers_follow_a_reload_through_the_channel(sparse_table):
+    channel = FakeChannel(empty_table())
+    reloading = TableRegistry(channel=channel, loader=lambda source: sparse_table, source='tables.bin')
+    other = TableRegistry(channel=channel)
+    assert reloading.table is other.table is channel.tables[0]
+
+    version = asyncio.run(reloading.reload())
+    assert version.number == 2 and reloading.table is sparse_table
+    assert other.table is channel.tables[0]
+    with other.acquire() as table:
+        assert table is sparse_table
+    assert other.version == 2
+    # Nothing new on the channel: acquiring again keeps the version
+    with other.acquire():
+        pass
+    with reloading.acquire():
+        pass
+    assert other.version == reloading.version == 2
+
+
+def test_failed_reload_is_not_published(sparse_table):
+    channel = FakeChannel(sparse_table)
+    registry = TableRegistry(channel=channel, loader=lambda source: empty_table())
+    with pytest.raises(ValueError):
+        asyncio.run(registry.reload())
+    assert channel.generation() == 0 and registry.version == 1